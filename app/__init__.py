@@ -10,17 +10,19 @@ from flask_cors import CORS
 from app.route.route_raw import main_bp
 from app.route.route_crud_bangunan import bangunan_bp
 from app.route.route_crud_hsbgn import hsbgn_bp
+from app.route.route_jobs import jobs_bp
+from app.route.route_metrics import metrics_bp
+from app.route.route_aal import aal_bp
+from app.route.route_scenario import scenario_bp
+from app.repository.repo_db_pool import install_pool_metrics
 
 # Visualization (direct-loss) blueprint
 from app.route.route_visualisasi_directloss import setup_visualisasi_routes
 from app.route.route_directloss import setup_join_routes
 from app.route.route_visualisasi_hazard import register_visualisasi_routes_hazard
 
-# (Optional) preload curves
-from app.repository.repo_kurva_gempa import get_reference_curves_gempa as load_gempa
-from app.repository.repo_kurva_gunungberapi import get_reference_curves_gunungberapi as load_gunung
-from app.repository.repo_kurva_longsor import get_reference_curves_longsor as load_longsor
-from app.repository.repo_kurva_banjir import get_reference_curves_banjir as load_banjir
+# cache kurva referensi (dipakai semua konsumen kurva)
+from app.service.service_curve_cache import warm_curve_cache
 
 # visualisasi kurva
 from app.route.route_visualisasi_kurva import disaster_curve_bp
@@ -33,12 +35,6 @@ from app.route.route_buffer_hazard import bp as buffer_disaster_bp
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Globals for curves
-REFERENCE_CURVES_GEMPA = {}
-REFERENCE_CURVES_GUNUNGBERAPI = {}
-REFERENCE_CURVES_LONGSOR = {}
-REFERENCE_CURVES_BANJIR = {}
-
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
@@ -60,6 +56,10 @@ def create_app():
     app.register_blueprint(bangunan_bp)
     app.register_blueprint(hsbgn_bp)
     app.register_blueprint(disaster_curve_bp)
+    app.register_blueprint(jobs_bp)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(aal_bp)
+    app.register_blueprint(scenario_bp)
     # Hapus pendaftaran langsung bencana_bp karena sudah didaftarkan via register_visualisasi_routes_hazard
     # app.register_blueprint(bencana_bp)
 
@@ -78,7 +78,8 @@ def create_app():
 
     # preload curves & check DB connection
     with app.app_context():
-        _load_reference_curves()
+        install_pool_metrics(db.engine)
+        warm_curve_cache()
         if app.debug:
             _check_db_connection()
 
@@ -90,35 +91,3 @@ def _check_db_connection():
         logger.info("✅ Database connected successfully")
     except Exception as e:
         logger.error(f"❌ Database connection failed: {e}")
-
-def _load_reference_curves():
-    global REFERENCE_CURVES_GEMPA, REFERENCE_CURVES_GUNUNGBERAPI
-    global REFERENCE_CURVES_LONGSOR, REFERENCE_CURVES_BANJIR
-
-    try:
-        REFERENCE_CURVES_GEMPA = load_gempa()
-        logger.info("✅ Gempa curves loaded")
-    except Exception as e:
-        logger.error(f"❌ Failed to load gempa curves: {e}")
-        REFERENCE_CURVES_GEMPA = {}
-
-    try:
-        REFERENCE_CURVES_GUNUNGBERAPI = load_gunung()
-        logger.info("✅ Gunung Berapi curves loaded")
-    except Exception as e:
-        logger.error(f"❌ Failed to load gunung berapi curves: {e}")
-        REFERENCE_CURVES_GUNUNGBERAPI = {}
-
-    try:
-        REFERENCE_CURVES_LONGSOR = load_longsor()
-        logger.info("✅ Longsor curves loaded")
-    except Exception as e:
-        logger.error(f"❌ Failed to load longsor curves: {e}")
-        REFERENCE_CURVES_LONGSOR = {}
-
-    try:
-        REFERENCE_CURVES_BANJIR = load_banjir()
-        logger.info("✅ Banjir curves loaded")
-    except Exception as e:
-        logger.error(f"❌ Failed to load banjir curves: {e}")
-        REFERENCE_CURVES_BANJIR = {}
@@ -22,6 +22,26 @@ class Config:
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Pool koneksi bersama (db.engine) untuk Flask-SQLAlchemy & repository
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))          # detik menunggu koneksi
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))        # detik
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'True').lower() in ['true', '1', 't']
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 0))  # 0 = tanpa batas
+
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        SQLALCHEMY_ENGINE_OPTIONS["connect_args"] = {
+            "options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+        }
+
     # Upload folder dengan path absolut untuk menghindari error
     BASE_DIR = os.path.abspath(os.path.dirname(__file__))
     UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', os.path.join(BASE_DIR, 'uploads'))
@@ -30,5 +50,97 @@ class Config:
     if not os.path.exists(UPLOAD_FOLDER):
         os.makedirs(UPLOAD_FOLDER)
 
+    # Registry jenis bencana (tabel, kolom, periode ulang, probabilitas AAL)
+    HAZARD_REGISTRY_PATH = os.getenv('HAZARD_REGISTRY_PATH', os.path.join(BASE_DIR, 'hazards.json'))
+
+    # Metode AAL: 'trapezoid' (integral kurva EP) atau 'discrete' (Σ loss × p)
+    AAL_METHOD = os.getenv('AAL_METHOD', 'trapezoid').lower()
+
+    # Backend pencarian titik bencana terdekat untuk hazard_assignment:
+    # 'postgis' (LATERAL KNN di database) atau 'kdtree' (cKDTree in-process)
+    HAZARD_MATCHER = os.getenv('HAZARD_MATCHER', 'postgis').lower()
+    # Matcher kdtree: detik antar pengecekan fingerprint titik intensitas
+    # sebelum pohon yang di-cache dipakai lagi (0 = cek setiap akses)
+    KDTREE_CACHE_TTL = float(os.getenv('KDTREE_CACHE_TTL', 30))
+
+    # Buffer COPY bulk loader: di memori sampai ukuran ini, lalu tumpah ke file
+    COPY_SPOOL_MAX_BYTES = int(os.getenv('COPY_SPOOL_MAX_BYTES', 64 * 1024 * 1024))
+
+    # Jumlah generasi hasil_proses_directloss / hasil_aal_provinsi lama
+    # yang disimpan untuk rollback instan
+    RESULT_GENERATIONS = int(os.getenv('RESULT_GENERATIONS', 3))
+
+    # Dump CSV debug (directloss_all.csv, AAL_per_provinsi_filtered.csv)
+    # secara asinkron ke debug_output/
+    DEBUG_CSV_DUMP = os.getenv('DEBUG_CSV_DUMP', 'False').lower() in ['true', '1', 't']
+
+    # Job runner untuk /process_join & /process_kurva_*:
+    # JOB_BROKER 'thread' (in-process) atau 'celery';
+    # JOB_STORE_URL 'memory' atau URL SQLAlchemy (misal sqlite:///jobs.db).
+    # Broker celery butuh store bersama (bukan 'memory').
+    JOB_BROKER = os.getenv('JOB_BROKER', 'thread').lower()
+    JOB_STORE_URL = os.getenv('JOB_STORE_URL', 'memory')
+    CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+
+    # Fan-out direct loss per bencana: jumlah thread (fetch + hitung loss) dan
+    # eksekutor chunk simulasi: 'process' (ProcessPoolExecutor) atau 'serial'
+    DIRECTLOSS_WORKERS = int(os.getenv('DIRECTLOSS_WORKERS', 4))
+    DIRECTLOSS_LOSS_EXECUTOR = os.getenv('DIRECTLOSS_LOSS_EXECUTOR', 'process').lower()
+
+    # Mode streaming process_join (memori konstan): baca bangunan + vulnerability
+    # per DIRECTLOSS_CHUNK_SIZE baris dengan server-side cursor
+    DIRECTLOSS_STREAMING = os.getenv('DIRECTLOSS_STREAMING', 'False').lower() in ['true', '1', 't']
+    DIRECTLOSS_CHUNK_SIZE = int(os.getenv('DIRECTLOSS_CHUNK_SIZE', 50000))
+
+    # Cache agregasi AAL per kota / poligon (detik, jumlah entri maksimum);
+    # dikosongkan juga setiap hasil direct loss / AAL ditulis ulang
+    AAL_CACHE_TTL = int(os.getenv('AAL_CACHE_TTL', 600))
+    AAL_CACHE_MAX_ENTRIES = int(os.getenv('AAL_CACHE_MAX_ENTRIES', 256))
+
+    # Simulasi Monte-Carlo (job "simulate"): jumlah tahun/event, seed, ukuran
+    # chunk bangunan & batch event (memori ~ batch × chunk), σ lognormal
+    # intensitas & CoV beta damage ratio default (bisa per bencana di hazards.json),
+    # dan periode ulang untuk PML / TVaR
+    SIM_EVENTS = int(os.getenv('SIM_EVENTS', 10000))
+    SIM_SEED = int(os.getenv('SIM_SEED', 12345))
+    SIM_CHUNK_SIZE = int(os.getenv('SIM_CHUNK_SIZE', 20000))
+    SIM_EVENT_BATCH = int(os.getenv('SIM_EVENT_BATCH', 1000))
+    SIM_INTENSITY_SIGMA = float(os.getenv('SIM_INTENSITY_SIGMA', 0.3))
+    SIM_DAMAGE_COV = float(os.getenv('SIM_DAMAGE_COV', 0.4))
+    SIM_RETURN_PERIODS = [
+        int(v) for v in os.getenv('SIM_RETURN_PERIODS', '10,50,100,250,500,1000').split(',') if v.strip()
+    ]
+
+    # Agregasi portofolio multi-bencana (kurva EP gabungan): jumlah sampel
+    # copula, ukuran chunk sampel, copula default (independent / comonotonic /
+    # gaussian / t), korelasi antar bencana default, derajat bebas copula t.
+    # Periode ulang output memakai SIM_RETURN_PERIODS
+    PORTFOLIO_SAMPLES = int(os.getenv('PORTFOLIO_SAMPLES', 100000))
+    PORTFOLIO_CHUNK_SIZE = int(os.getenv('PORTFOLIO_CHUNK_SIZE', 20000))
+    PORTFOLIO_COPULA = os.getenv('PORTFOLIO_COPULA', 'gaussian').lower()
+    PORTFOLIO_CORRELATION = float(os.getenv('PORTFOLIO_CORRELATION', 0.3))
+    PORTFOLIO_T_DOF = float(os.getenv('PORTFOLIO_T_DOF', 4))
+
+    # Skenario gempa (POST /api/scenario/gempa): tetangga & jarak maks interpolasi
+    # grid MMI (IDW), MMI minimum yang dianggap merusak, koefisien atenuasi
+    # MMI = a + b·M + c·log10(R) + d·R (R jarak hiposenter, km) & kedalaman default
+    SCENARIO_GRID_NEIGHBORS = int(os.getenv('SCENARIO_GRID_NEIGHBORS', 4))
+    SCENARIO_GRID_MAX_DISTANCE_M = float(os.getenv('SCENARIO_GRID_MAX_DISTANCE_M', 10000))
+    SCENARIO_MIN_MMI = float(os.getenv('SCENARIO_MIN_MMI', 5.0))
+    SCENARIO_GMPE_COEFFS = [
+        float(v) for v in os.getenv('SCENARIO_GMPE_COEFFS', '1.5,1.5,-3.0,-0.0015').split(',')
+    ]
+    SCENARIO_DEFAULT_DEPTH_KM = float(os.getenv('SCENARIO_DEFAULT_DEPTH_KM', 10))
+
+    # Mode LUT kurva fragility: sampel kurva ke grid seragam (resolusi awal,
+    # digandakan sampai error maks vs spline eksak ≤ CURVE_LUT_MAX_ERROR)
+    CURVE_LUT_ENABLED = os.getenv('CURVE_LUT_ENABLED', 'False').lower() in ['true', '1', 't']
+    CURVE_LUT_RESOLUTION = int(os.getenv('CURVE_LUT_RESOLUTION', 4097))
+    CURVE_LUT_MAX_ERROR = float(os.getenv('CURVE_LUT_MAX_ERROR', 1e-6))
+
+    # Cache kurva referensi: detik antar pengecekan fingerprint referensi_dmgratio_*
+    # (0 = cek setiap akses)
+    CURVE_CACHE_TTL = float(os.getenv('CURVE_CACHE_TTL', 30))
+
     # Opsi untuk debug mode
     DEBUG = os.getenv('DEBUG', 'False').lower() in ['true', '1', 't']
@@ -0,0 +1,68 @@
+import logging
+from flask import request, jsonify
+from app.service.service_aal import aggregate_kota, aggregate_polygon
+from app.service.service_portfolio import aggregate_portfolio
+
+logger = logging.getLogger(__name__)
+
+class AALController:
+    @staticmethod
+    def by_kota():
+        """
+        GET /api/aal?kota=...&provinsi=...
+        Direct loss & AAL bangunan satu kota, per bencana dan per kode_bangunan.
+        """
+        kota = request.args.get('kota')
+        if not kota:
+            return jsonify({"error": "kota required"}), 400
+        try:
+            return jsonify(aggregate_kota(kota, request.args.get('provinsi'))), 200
+        except Exception as e:
+            logger.error(f"Error agregasi AAL kota {kota}: {e}")
+            return jsonify({"error": "Terjadi kesalahan server"}), 500
+
+    @staticmethod
+    def aggregate():
+        """
+        POST /api/aal/aggregate
+        Body: GeoJSON Polygon / MultiPolygon (geometry, Feature, atau FeatureCollection).
+        Direct loss & AAL bangunan yang beririsan dengan poligon.
+        """
+        body = request.get_json(silent=True)
+        if not body:
+            return jsonify({"error": "Body GeoJSON wajib"}), 400
+        try:
+            return jsonify(aggregate_polygon(body)), 200
+        except ValueError as ve:
+            return jsonify({"error": str(ve)}), 400
+        except Exception as e:
+            logger.error(f"Error agregasi AAL poligon: {e}")
+            return jsonify({"error": "Terjadi kesalahan server"}), 500
+
+    @staticmethod
+    def portfolio():
+        """
+        POST /api/aal/portfolio
+        Body (opsional): {level: provinsi|nasional|kode_bangunan,
+        copula: independent|comonotonic|gaussian|t, correlation: ρ atau matriks,
+        dof, samples, seed, hazards, return_periods}.
+        Kurva EP gabungan multi-bencana dari direct loss tersimpan.
+        """
+        body = request.get_json(silent=True) or {}
+        try:
+            result = aggregate_portfolio(
+                level=body.get('level', request.args.get('level', 'provinsi')),
+                copula=body.get('copula', request.args.get('copula')),
+                correlation=body.get('correlation'),
+                dof=body.get('dof'),
+                samples=body.get('samples'),
+                seed=body.get('seed'),
+                hazards=body.get('hazards'),
+                return_periods=body.get('return_periods'),
+            )
+            return jsonify(result), 200
+        except ValueError as ve:
+            return jsonify({"error": str(ve)}), 400
+        except Exception as e:
+            logger.error(f"Error agregasi portofolio: {e}")
+            return jsonify({"error": "Terjadi kesalahan server"}), 500
@@ -1,6 +1,7 @@
 import logging
 from flask import request, jsonify
 from app.service.service_crud_bangunan import BangunanService
+from app.repository.repo_locks import LockBusy
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -70,6 +71,8 @@ class BangunanController:
             if ok:
                 return jsonify({"message": "Bangunan berhasil dihapus"}), 200
             return jsonify({"error": "Bangunan tidak ditemukan"}), 404
+        except LockBusy as lb:
+            return jsonify({"error": str(lb)}), 409
         except Exception as e:
             logger.error(f"Error saat menghapus bangunan: {e}")
             return jsonify({"error": "Terjadi kesalahan server"}), 500
@@ -145,9 +148,34 @@ class BangunanController:
             # service_crud_bangunan harus memiliki metode recalc_building
             result = BangunanService.recalc_building_directloss_and_aal(bangunan_id)
             return jsonify({"status": "success", "detail": result}), 200
+        except LockBusy as lb:
+            return jsonify({"error": str(lb)}), 409
         except ValueError as ve:
             logger.error(f"Error recalc (ValueError): {ve}")
             return jsonify({"error": str(ve)}), 400
         except Exception as e:
             logger.error(f"Error recalc bangunan: {e}")
             return jsonify({"error": "Terjadi kesalahan perhitungan ulang"}), 500
+
+    @staticmethod
+    def recalc_bulk():
+        """
+        POST /api/bangunan/recalc
+        Body: {"ids": ["BMN_...", "FS_...", ...]} (atau langsung list id).
+        Hitung ulang directloss & AAL untuk semua bangunan tsb sekaligus.
+        """
+        try:
+            data = request.get_json(silent=True)
+            ids = data.get("ids") if isinstance(data, dict) else data
+            if not isinstance(ids, list) or not ids:
+                return jsonify({"error": "Daftar ids wajib diisi"}), 400
+            result = BangunanService.recalc_buildings_directloss_and_aal(ids)
+            return jsonify({"status": "success", "detail": result}), 200
+        except LockBusy as lb:
+            return jsonify({"error": str(lb)}), 409
+        except ValueError as ve:
+            logger.error(f"Error recalc bulk (ValueError): {ve}")
+            return jsonify({"error": str(ve)}), 400
+        except Exception as e:
+            logger.error(f"Error recalc bulk bangunan: {e}")
+            return jsonify({"error": "Terjadi kesalahan perhitungan ulang"}), 500
@@ -1,6 +1,7 @@
 import logging
 from flask import request, jsonify
 from app.service.service_crud_hsbgn import HSBGNService
+from app.repository.repo_locks import LockBusy
 
 # Konfigurasi Logging
 logging.basicConfig(level=logging.INFO)
@@ -66,10 +67,27 @@ class HSBGNController:
             if updated_hsbgn:
                 return jsonify(updated_hsbgn), 200
             return jsonify({"error": "HSBGN tidak ditemukan"}), 404
+        except LockBusy as lb:
+            return jsonify({"error": str(lb)}), 409
         except Exception as e:
             loggerhsgbn.error(f"Error saat mengedit HSBGN ID {hsbgn_id}: {e}")
             return jsonify({"error": "Terjadi kesalahan server"}), 500
 
+    @staticmethod
+    def bulk_update():
+        """Mengedit banyak HSBGN sekaligus: body [{"id_kota": .., "hsbgn": ..}, ...]"""
+        try:
+            data = request.json
+            if not isinstance(data, list):
+                return jsonify({"error": "Body harus berupa list"}), 400
+            result = HSBGNService.bulk_update_hsbgn(data)
+            return jsonify(result), 200
+        except LockBusy as lb:
+            return jsonify({"error": str(lb)}), 409
+        except Exception as e:
+            loggerhsgbn.error(f"Error saat bulk update HSBGN: {e}")
+            return jsonify({"error": "Terjadi kesalahan server"}), 500
+
     @staticmethod
     def delete(hsbgn_id):
         """Menghapus data HSBGN"""
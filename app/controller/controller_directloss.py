@@ -1,5 +1,11 @@
-from flask import jsonify
-from app.service.service_directloss import process_all_disasters
+from flask import jsonify, request
+from app.service.service_directloss import (
+    process_all_disasters, process_subset, rollback_results, get_result_generations,
+    LAST_RUN_TIMINGS
+)
+from app.repository.repo_hazard_assignment import rebuild_assignments
+from app.repository.repo_locks import LockBusy
+from app.controller.controller_jobs import is_async_request, enqueue_job
 
 def home():
     """Endpoint utama API untuk mengecek apakah server berjalan."""
@@ -7,13 +13,91 @@ def home():
 
 
 def process_data():
-    """Mengambil data dari database, memprosesnya, dan menyimpannya kembali ke database & CSV"""
+    """
+    Mengambil data dari database, memprosesnya, dan menyimpannya kembali ke database (CSV debug opsional).
+    Query param opsional provinsi= / kota= → hanya hitung ulang bangunan tersebut
+    (lihat process_subset_data).
+    """
+    if request.args.get('provinsi') or request.args.get('kota'):
+        return process_subset_data()
+    stream = request.args.get('stream')
+    streaming = stream.lower() in ('1', 'true', 't') if stream else None
+    if is_async_request():
+        return enqueue_job("process_join", {"streaming": streaming})
     try:
-        result_path = process_all_disasters()
+        result_path = process_all_disasters(streaming=streaming)
         return jsonify({
             "status": "success",
-            "message": "Data berhasil diproses dan disimpan ke database & CSV",
-            "file_path": result_path
+            "message": "Data berhasil diproses dan disimpan ke database",
+            "file_path": result_path,
+            "timings": LAST_RUN_TIMINGS
         }), 200
+    except LockBusy as lb:
+        return jsonify({"error": str(lb)}), 409
+    except Exception as e:
+        return jsonify({"error": f"Processing error: {str(e)}"}), 500
+
+
+def process_subset_data():
+    """Hitung ulang direct loss & AAL provinsi untuk ?provinsi= dan/atau ?kota= saja."""
+    provinsi = request.args.get('provinsi')
+    kota = request.args.get('kota')
+    if is_async_request():
+        return enqueue_job("process_join", {"provinsi": provinsi, "kota": kota})
+    try:
+        result = process_subset(provinsi, kota)
+        return jsonify({
+            "status": "success",
+            "message": "Direct loss & AAL provinsi berhasil diperbarui",
+            **result,
+            "timings": LAST_RUN_TIMINGS
+        }), 200
+    except LockBusy as lb:
+        return jsonify({"error": str(lb)}), 409
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Processing error: {str(e)}"}), 500
+
+
+def process_assignment():
+    """
+    Bangun ulang tabel hazard_assignment (misal setelah tabel model_intensitas_*
+    di-reload). Query param opsional: hazard=gempa,banjir,...
+    """
+    hazard = request.args.get('hazard')
+    hazards = [h.strip() for h in hazard.split(',')] if hazard else None
+    try:
+        rebuild_assignments(hazards)
+        return jsonify({
+            "status": "success",
+            "message": "Penugasan bangunan ke titik bencana berhasil diperbarui",
+            "hazards": hazards or "all"
+        }), 200
+    except LockBusy as lb:
+        return jsonify({"error": str(lb)}), 409
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Processing error: {str(e)}"}), 500
+
+
+def rollback_data():
+    """Rollback instan hasil direct loss & AAL ke generasi sebelumnya."""
+    try:
+        restored = rollback_results()
+        return jsonify({"status": "success", "restored": restored}), 200
+    except LockBusy as lb:
+        return jsonify({"error": str(lb)}), 409
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Rollback error: {str(e)}"}), 500
+
+
+def list_generations_data():
+    """Daftar generasi hasil yang masih tersimpan."""
+    try:
+        return jsonify(get_result_generations()), 200
     except Exception as e:
         return jsonify({"error": f"Processing error: {str(e)}"}), 500
@@ -0,0 +1,55 @@
+import logging
+from flask import request, jsonify
+from app.service.service_jobs import get_job_manager, JobConflict
+
+logger = logging.getLogger(__name__)
+
+def is_async_request():
+    """True jika endpoint sinkron dipanggil dengan ?async=1 (jalankan sebagai job)."""
+    return request.args.get('async', '').lower() in ('1', 'true', 't', 'yes')
+
+def enqueue_job(kind, params=None):
+    """Enqueue job dan kembalikan response 202 berisi job_id (409 jika bentrok)."""
+    try:
+        job = get_job_manager().submit(kind, params)
+        return jsonify({"job_id": job["id"], "status": job["status"]}), 202
+    except JobConflict as jc:
+        return jsonify({
+            "error": "Job sejenis masih berjalan",
+            "job_id": str(jc)
+        }), 409
+
+class JobController:
+    @staticmethod
+    def submit(kind):
+        """
+        POST /api/jobs/<kind>
+        kind: process_join, process_kurva_gempa, process_kurva_banjir, ...,
+              simulate (body: n_events, seed, hazards, provinsi, return_periods)
+        """
+        try:
+            return enqueue_job(kind, request.get_json(silent=True) or {})
+        except ValueError as ve:
+            return jsonify({"error": str(ve)}), 400
+        except Exception as e:
+            logger.error(f"Error submit job {kind}: {e}")
+            return jsonify({"error": "Terjadi kesalahan server"}), 500
+
+    @staticmethod
+    def get(job_id):
+        job = get_job_manager().get(job_id)
+        if not job:
+            return jsonify({"error": "Job tidak ditemukan"}), 404
+        return jsonify(job), 200
+
+    @staticmethod
+    def list():
+        limit = request.args.get('limit', 50, type=int)
+        return jsonify(get_job_manager().list(limit)), 200
+
+    @staticmethod
+    def cancel(job_id):
+        job = get_job_manager().cancel(job_id)
+        if not job:
+            return jsonify({"error": "Job tidak ditemukan"}), 404
+        return jsonify(job), 200
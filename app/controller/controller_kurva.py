@@ -1,3 +1,4 @@
+import logging
 from flask import jsonify
 import pandas as pd
 
@@ -13,137 +14,148 @@ from app.models.models_database import (
     RawGunungBerapi, HasilProsesGunungBerapi
 )
 from app.extensions import db
-
-# ======================== GEMPA ========================
-def process_kurva_gempa():
+from app.repository.repo_hazard_assignment import rebuild_assignments, hazard_for_dmgr_table
+from app.repository.repo_bulk_copy import upsert_dataframe
+from app.repository.repo_intensitas import load_raw_intensity
+from app.repository.repo_locks import advisory_lock, LockBusy, RECOMPUTE_LOCK
+from app.service.service_directloss import noop_progress
+from app.controller.controller_jobs import is_async_request, enqueue_job
+
+logger = logging.getLogger(__name__)
+
+# ======================== PERSIAPAN INPUT PER BENCANA ========================
+def _prepare_gempa(df):
+    return df.rename(columns={
+        'mmi_500': 'MMI500',
+        'mmi_250': 'MMI250',
+        'mmi_100': 'MMI100'
+    })
+
+def _prepare_banjir(df):
+    return df.rename(columns={
+        'depth_100': 'depth_100',
+        'depth_50': 'depth_50',
+        'depth_25': 'depth_25'
+    })
+
+def _prepare_longsor(df):
+    df = df[['id_lokasi', 'mflux_5', 'mflux_2']].copy()
+    for col in ['mflux_5', 'mflux_2']:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+def _prepare_gunungberapi(df):
+    df = df[['id_lokasi', 'kpa_250', 'kpa_100', 'kpa_50']].copy()
+    for col in ['kpa_250', 'kpa_100', 'kpa_50']:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+# hazard → (model raw, model hasil, fungsi proses, persiapan input, nama raw, pesan sukses)
+KURVA_PIPELINES = {
+    "gempa": (RawGempa, HasilProsesGempa, process_gempa, _prepare_gempa,
+              "raw_gempa", "Gempa data successfully processed and saved to database"),
+    "banjir": (RawBanjir, HasilProsesBanjir, process_banjir, _prepare_banjir,
+               "raw_banjir", "Banjir data successfully processed and saved to database"),
+    "longsor": (RawLongsor, HasilProsesLongsor, process_longsor, _prepare_longsor,
+                "raw_longsor", "Longsor data successfully processed and saved to database"),
+    "gunungberapi": (RawGunungBerapi, HasilProsesGunungBerapi, process_gunungberapi,
+                     _prepare_gunungberapi, "raw_gunungberapi",
+                     "Gunung Berapi data successfully processed and saved to database"),
+}
+
+def run_kurva_pipeline(hazard, progress=None):
+    """
+    Jalankan pipeline kurva satu bencana (tanpa Flask response):
+    raw → interpolasi dmgratio → simpan → penugasan bangunan.
+    Mengembalikan jumlah baris hasil, atau None jika tabel raw kosong.
+    progress: callback opsional progress(stage, hazard=None, percent=None).
+    """
+    progress = progress or noop_progress
+    _, out_model, process_fn, prepare_fn, _, _ = KURVA_PIPELINES[hazard]
+
+    # satu pipeline per bencana; tabel dmgratio_* & hazard_assignment dibaca
+    # full recompute → tidak boleh ditulis selama full recompute berjalan
+    with advisory_lock(f"kurva_{hazard}"), advisory_lock(RECOMPUTE_LOCK, shared=True):
+        progress("load", hazard=hazard, percent=0)
+        # hanya id_lokasi + kolom intensitas (tanpa objek ORM / geom)
+        raw = load_raw_intensity(hazard)
+        if raw.empty:
+            return None
+
+        df = prepare_fn(raw)
+
+        progress("interpolate", hazard=hazard, percent=20)
+        output = process_fn(df)
+        output.to_csv(f"output_kurva_{hazard}.csv", index=False)
+
+        progress("save", hazard=hazard, percent=70)
+        save_to_database(output, out_model)
+    progress("done", hazard=hazard, percent=100)
+    return len(output)
+
+def _process_kurva(hazard):
+    _, _, _, _, raw_name, message = KURVA_PIPELINES[hazard]
+    if is_async_request():
+        return enqueue_job(f"process_kurva_{hazard}")
     try:
-        raw = RawGempa.query.all()
-        if not raw:
-            return jsonify({"error": "No data found in raw_gempa table"}), 404
-
-        df = pd.DataFrame([r.to_dict() for r in raw])
-        df.rename(columns={
-            'mmi_500': 'MMI500',
-            'mmi_250': 'MMI250',
-            'mmi_100': 'MMI100'
-        }, inplace=True)
-
-        output = process_gempa(df)
-        output.to_csv("output_kurva_gempa.csv", index=False)
-
-        save_to_database(output, HasilProsesGempa)
+        count = run_kurva_pipeline(hazard)
+        if count is None:
+            return jsonify({"error": f"No data found in {raw_name} table"}), 404
         return jsonify({
             "status": "success",
-            "message": "Gempa data successfully processed and saved to database",
-            "processed_data_count": len(output)
+            "message": message,
+            "processed_data_count": count
         })
 
+    except LockBusy as lb:
+        return jsonify({"error": str(lb)}), 409
     except Exception as e:
         return jsonify({"error": f"Processing error: {str(e)}"}), 500
 
 
-# ======================== BANJIR ========================
-def process_kurva_banjir():
-    try:
-        raw = RawBanjir.query.all()
-        if not raw:
-            return jsonify({"error": "No data found in raw_gempa table"}), 404
-
-        df = pd.DataFrame([r.to_dict() for r in raw])
-        df.rename(columns={
-            'depth_100': 'depth_100',
-            'depth_50': 'depth_50',
-            'depth_25': 'depth_25'
-        }, inplace=True)
-
-        output = process_banjir(df)
-        output.to_csv("output_kurva_banjir.csv", index=False)
-
-        save_to_database(output, HasilProsesBanjir)
-        return jsonify({
-            "status": "success",
-            "message": "Gempa data successfully processed and saved to database",
-            "processed_data_count": len(output)
-        })
+# ======================== GEMPA ========================
+def process_kurva_gempa():
+    return _process_kurva("gempa")
 
-    except Exception as e:
-        return jsonify({"error": f"Processing error: {str(e)}"}), 500
 
+# ======================== BANJIR ========================
+def process_kurva_banjir():
+    return _process_kurva("banjir")
 
 
 # ======================== LONGSOR ========================
 def process_kurva_longsor():
-    try:
-        raw = RawLongsor.query.all()
-        if not raw:
-            return jsonify({"error": "No data found in raw_longsor table"}), 404
-
-        df = pd.DataFrame([r.to_dict() for r in raw])
-        df = df[['id_lokasi', 'mflux_5', 'mflux_2']].copy()
-        for col in ['mflux_5', 'mflux_2']:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-
-        output = process_longsor(df)
-        output.to_csv("output_kurva_longsor.csv", index=False)
-
-        save_to_database(output, HasilProsesLongsor)
-        return jsonify({
-            "status": "success",
-            "message": "Longsor data successfully processed and saved to database",
-            "processed_data_count": len(output)
-        })
-
-    except Exception as e:
-        return jsonify({"error": f"Processing error: {str(e)}"}), 500
+    return _process_kurva("longsor")
 
 
 # ======================== GUNUNG BERAPI ========================
 def process_kurva_gunungberapi():
-    try:
-        raw = RawGunungBerapi.query.all()
-        if not raw:
-            return jsonify({"error": "No data found in raw_gunungberapi table"}), 404
-
-        df = pd.DataFrame([r.to_dict() for r in raw])
-        df = df[['id_lokasi', 'kpa_250', 'kpa_100', 'kpa_50']].copy()
-        for col in ['kpa_250', 'kpa_100', 'kpa_50']:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-
-        output = process_gunungberapi(df)
-        output.to_csv("output_kurva_gunungberapi.csv", index=False)
-
-        save_to_database(output, HasilProsesGunungBerapi)
-        return jsonify({
-            "status": "success",
-            "message": "Gunung Berapi data successfully processed and saved to database",
-            "processed_data_count": len(output)
-        })
-
-    except Exception as e:
-        return jsonify({"error": f"Processing error: {str(e)}"}), 500
+    return _process_kurva("gunungberapi")
 
 # ======================== FUNGSI SIMPAN DATABASE ========================
 def save_to_database(output_data, model_class, clear_old_data=True):
+    """
+    Satu-satunya jalur tulis tabel dmgratio_*: COPY ke temp table lalu
+    INSERT ... ON CONFLICT (id_lokasi) DO UPDATE. clear_old_data=True →
+    id_lokasi yang tidak ada di output ikut dihapus.
+    output_data: frame float64 dari service_kurva_* (dipakai langsung).
+    """
     try:
-        if clear_old_data:
-            db.session.query(model_class).delete()
-            db.session.commit()
-
-        output_data = output_data.astype(float)
+        cols = [c.name for c in model_class.__table__.columns if c.name in output_data.columns]
 
-        new_records = [
-            model_class(**row.to_dict())
-            for _, row in output_data.iterrows()
-        ]
+        n = upsert_dataframe(output_data, model_class, ["id_lokasi"], columns=cols,
+                             prune=clear_old_data)
 
-        db.session.bulk_save_objects(new_records)
-        db.session.commit()
+        logger.info(f"✅ {n} records saved to {model_class.__tablename__}")
 
-        print(f"✅ {len(new_records)} records saved to {model_class.__tablename__}")
+        # grid dmgratio berubah → penugasan bangunan untuk bencana ini dibangun ulang
+        hazard = hazard_for_dmgr_table(model_class.__tablename__)
+        if hazard:
+            rebuild_assignments([hazard])
 
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Error saving to database: {e}")
+        logger.error(f"❌ Error saving to database: {e}")
         raise
 
 
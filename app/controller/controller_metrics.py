@@ -0,0 +1,22 @@
+import logging
+from flask import request, jsonify
+from app.repository.repo_db_pool import pool_snapshot, POOL_METRICS
+
+logger = logging.getLogger(__name__)
+
+class MetricsController:
+    @staticmethod
+    def db_pool():
+        """
+        GET /api/metrics/db-pool
+        Status pool koneksi database + counter checkout/checkin/waktu tunggu.
+        Query param opsional reset=1 untuk mengosongkan counter setelah dibaca.
+        """
+        try:
+            snap = pool_snapshot()
+            if request.args.get('reset', '').lower() in ('1', 'true', 't'):
+                POOL_METRICS.reset()
+            return jsonify(snap), 200
+        except Exception as e:
+            logger.error(f"Error metrics db pool: {e}")
+            return jsonify({"error": "Terjadi kesalahan server"}), 500
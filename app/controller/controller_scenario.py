@@ -0,0 +1,30 @@
+import logging
+from flask import request, jsonify
+from app.service.service_scenario import scenario_losses
+
+logger = logging.getLogger(__name__)
+
+class ScenarioController:
+    @staticmethod
+    def gempa():
+        """
+        POST /api/scenario/gempa
+        - multipart: file=<GeoTIFF MMI>
+        - JSON: {"grid": [{"lon", "lat", "mmi"}, ...]}
+                atau {"epicenter": {"lon", "lat", "depth_km"}, "magnitude": M,
+                      "coefficients": [a, b, c, d] (opsional)}
+        Loss skenario per provinsi & kota (tanpa menulis tabel apa pun).
+        """
+        if 'file' in request.files:
+            footprint = {"geotiff": request.files['file'].read()}
+        else:
+            footprint = request.get_json(silent=True)
+            if not isinstance(footprint, dict):
+                return jsonify({"error": "Body JSON atau file GeoTIFF wajib"}), 400
+        try:
+            return jsonify(scenario_losses(footprint)), 200
+        except ValueError as ve:
+            return jsonify({"error": str(ve)}), 400
+        except Exception as e:
+            logger.error(f"Error skenario gempa: {e}")
+            return jsonify({"error": "Terjadi kesalahan server"}), 500
@@ -1,8 +1,12 @@
 # app/controller/controller_visualisasi_kurva.py
 
-from flask import jsonify
-from app.service.service_visualisasi_kurva import get_all_disaster_curves
+from flask import jsonify, request
+from app.service.service_curve_cache import get_disaster_curves
 
 def get_disaster_curves_controller():
-    data = get_all_disaster_curves()   # sekarang nested sesuai harapan frontend
-    return jsonify(data)
+    # versi = hash isi referensi_dmgratio_*; If-None-Match sama → 304 tanpa body
+    version, data = get_disaster_curves()   # nested sesuai harapan frontend
+    resp = jsonify(data)
+    resp.set_etag(version)
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp.make_conditional(request)
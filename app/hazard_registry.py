@@ -0,0 +1,123 @@
+# app/hazard_registry.py
+"""
+Registry jenis bencana: satu sumber untuk nama tabel, kolom vulnerability,
+pemilihan damage ratio, periode ulang dan probabilitas AAL.
+Dimuat sekali dari app/hazards.json (atau Config.HAZARD_REGISTRY_PATH).
+"""
+
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Optional, Tuple
+
+import numpy as np
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class ReturnPeriod:
+    scale: str            # periode ulang sebagai sufiks kolom, misal "500"
+    probability: float    # probabilitas tahunan terlampaui (1 / RP)
+
+@dataclass(frozen=True)
+class Hazard:
+    name: str
+    raw_table: str                    # model_intensitas_*
+    dmgr_table: str                   # dmgratio_*
+    prefix: str                       # sufiks intensitas, misal "mmi"
+    threshold_m: float                # jarak maks bangunan → titik intensitas
+    vulnerability_columns: Tuple[str, ...]
+    return_periods: Tuple[ReturnPeriod, ...]
+    damage_column: Optional[str] = None          # kolom damage ratio tetap
+    damage_by_floors: Tuple[str, ...] = field(default=())  # kolom per jumlah lantai
+    ordered_columns: bool = False     # dmgratio dipaksa naik sesuai urutan kolom (cummax)
+    curve_mode: str = "cubic"         # "cubic" (spline extrapolate) / "linear_tail"
+    intensity_sigma: Optional[float] = None   # simulasi: σ lognormal intensitas
+    damage_cov: Optional[float] = None        # simulasi: CoV beta damage ratio
+
+    @property
+    def scales(self):
+        return [rp.scale for rp in self.return_periods]
+
+    def vcols(self, s, h="h"):
+        """Ekspresi SELECT dmgratio_<kolom>_<prefix><s> AS nilai_y_... (alias tabel h)."""
+        return [
+            f"{h}.dmgratio_{c}_{self.prefix}{s} AS nilai_y_{c}_{self.prefix}{s}"
+            for c in self.vulnerability_columns
+        ]
+
+    def intensity_col(self, s):
+        """Kolom intensitas di tabel model_intensitas_*, misal mmi_500."""
+        return f"{self.prefix}_{s}"
+
+    def direct_loss_col(self, s):
+        return f"direct_loss_{self.name}_{s}"
+
+    def damage_ratio(self, values, floors, s):
+        """
+        Damage ratio per bangunan untuk periode ulang s.
+        values: {nilai_y_*: array}; floors: jumlah lantai (array int).
+        """
+        if self.damage_by_floors:
+            cols = [values[f"nilai_y_{c}_{self.prefix}{s}"] for c in self.damage_by_floors]
+            idx = np.clip(np.asarray(floors), 1, len(cols)) - 1
+            return np.choose(idx, cols)
+        return values[f"nilai_y_{self.damage_column}_{self.prefix}{s}"]
+
+def _parse(item):
+    rps = tuple(
+        ReturnPeriod(str(rp["scale"]), float(rp["probability"]))
+        for rp in item["return_periods"]
+    )
+    hazard = Hazard(
+        name=item["name"],
+        raw_table=item["raw_table"],
+        dmgr_table=item["dmgr_table"],
+        prefix=item["prefix"],
+        threshold_m=float(item["threshold_m"]),
+        vulnerability_columns=tuple(str(c) for c in item["vulnerability_columns"]),
+        return_periods=rps,
+        damage_column=item.get("damage_column"),
+        damage_by_floors=tuple(str(c) for c in item.get("damage_by_floors", ())),
+        ordered_columns=bool(item.get("ordered_columns", False)),
+        curve_mode=item.get("curve_mode", "cubic"),
+        intensity_sigma=item.get("intensity_sigma"),
+        damage_cov=item.get("damage_cov"),
+    )
+    if not hazard.damage_column and not hazard.damage_by_floors:
+        raise ValueError(f"Hazard {hazard.name}: damage_column atau damage_by_floors wajib")
+    if hazard.curve_mode not in ("cubic", "linear_tail"):
+        raise ValueError(f"Hazard {hazard.name}: curve_mode tidak dikenal: {hazard.curve_mode}")
+    return hazard
+
+def load_registry(path=None):
+    """Baca registry dari JSON → {nama: Hazard} (urutan sesuai file)."""
+    path = path or Config.HAZARD_REGISTRY_PATH
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    registry = {}
+    for item in data["hazards"]:
+        hazard = _parse(item)
+        registry[hazard.name] = hazard
+    logger.info(f"✅ Hazard registry: {', '.join(registry)}")
+    return registry
+
+HAZARDS = load_registry()
+
+def get_hazard(name):
+    try:
+        return HAZARDS[name]
+    except KeyError:
+        raise ValueError(f"Jenis bencana tidak dikenal: {name}")
+
+def aal_periods():
+    """{<bencana>_<periode ulang>: probabilitas} untuk semua bencana."""
+    return {
+        f"{h.name}_{rp.scale}": rp.probability
+        for h in HAZARDS.values() for rp in h.return_periods
+    }
+
+def direct_loss_columns():
+    return [h.direct_loss_col(s) for h in HAZARDS.values() for s in h.scales]
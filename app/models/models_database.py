@@ -319,3 +319,35 @@ class BanjirReferenceCurve(db.Model):
     tipe_kurva = db.Column(db.String(10), nullable=False)
     x = db.Column(db.Float, nullable=False)
     y = db.Column(db.Float, nullable=False)
+
+
+# Penugasan bangunan → titik intensitas terdekat (per jenis bencana)
+class HazardAssignment(db.Model):
+    __tablename__ = 'hazard_assignment'
+
+    id_bangunan = db.Column(db.String(50), primary_key=True)
+    hazard      = db.Column(db.String(20), primary_key=True, index=True)
+    id_lokasi   = db.Column(db.Integer, nullable=False, index=True)
+    distance_m  = db.Column(db.Float)
+
+    def to_dict(self):
+        return {col.name: getattr(self, col.name) for col in self.__table__.columns}
+
+# AAL per bangunan (integral kurva EP per bencana + total)
+class HasilAALBangunan(db.Model):
+    __tablename__ = 'hasil_aal_bangunan'
+
+    id_bangunan   = db.Column(db.String(50), primary_key=True)
+    # index TRIM(LOWER(provinsi/kota)) dibuat di migrasi 8d2b6f0e4a71
+    provinsi      = db.Column(db.String(255))
+    kota          = db.Column(db.String(255))
+    kode_bangunan = db.Column(db.String(20))
+
+    aal_gempa        = db.Column(db.Float, default=0)
+    aal_banjir       = db.Column(db.Float, default=0)
+    aal_longsor      = db.Column(db.Float, default=0)
+    aal_gunungberapi = db.Column(db.Float, default=0)
+    aal_total        = db.Column(db.Float, default=0)
+
+    def to_dict(self):
+        return {col.name: getattr(self, col.name) for col in self.__table__.columns}
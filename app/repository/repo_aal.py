@@ -0,0 +1,72 @@
+# app/repository/repo_aal.py
+
+import logging
+import pandas as pd
+from sqlalchemy import text
+from app.extensions import db
+from app.hazard_registry import HAZARDS, direct_loss_columns
+from app.repository.repo_db_pool import timed_connect
+from app.repository.repo_directloss import name_match
+
+logger = logging.getLogger(__name__)
+
+# Poligon GeoJSON (EPSG:4326) sebagai ekspresi konstan → planner bisa memakai
+# index GiST bangunan_copy.geom untuk operator &&
+POLYGON_SQL = "ST_SetSRID(ST_GeomFromGeoJSON(:geojson), 4326)"
+
+def kota_filter(kota, provinsi=None):
+    where = [name_match("b.kota", "kota")]
+    params = {"kota": kota}
+    if provinsi:
+        where.append(name_match("b.provinsi", "provinsi"))
+        params["provinsi"] = provinsi
+    return " AND ".join(where), params
+
+def polygon_filter(geojson):
+    """Pre-filter bbox (&&, index) lalu uji geometri tepat (ST_Intersects)."""
+    where = f"b.geom && {POLYGON_SQL} AND ST_Intersects(b.geom, {POLYGON_SQL})"
+    return where, {"geojson": geojson}
+
+def aggregate_by_kode(where, params):
+    """
+    SUM direct loss & AAL per kode_bangunan untuk bangunan yang lolos 'where'.
+    Satu baris per kode_bangunan: jumlah_bangunan, direct_loss_*, aal_*.
+    """
+    dl_sql = ", ".join(f"SUM(d.{c}) AS {c}" for c in direct_loss_columns())
+    aal_cols = [f"aal_{name}" for name in HAZARDS] + ["aal_total"]
+    aal_sql = ", ".join(f"SUM(ab.{c}) AS {c}" for c in aal_cols)
+    sql = text(f"""
+        SELECT
+          COALESCE(ab.kode_bangunan, LOWER(b.kode_bangunan), LOWER(SPLIT_PART(b.id_bangunan, '_', 1))) AS kode_bangunan,
+          COUNT(*) AS jumlah_bangunan,
+          {dl_sql},
+          {aal_sql}
+        FROM bangunan_copy b
+        JOIN hasil_proses_directloss d USING (id_bangunan)
+        LEFT JOIN hasil_aal_bangunan ab USING (id_bangunan)
+        WHERE {where}
+        GROUP BY 1
+        ORDER BY 1
+    """)
+    with timed_connect(db.engine) as conn:
+        rows = conn.execute(sql, params).mappings().all()
+    return [dict(r) for r in rows]
+
+def group_direct_losses():
+    """
+    SUM direct_loss_* per (provinsi, kode_bangunan) dari hasil tersimpan.
+    Satu query agregat; level nasional / kode_bangunan diturunkan dari sini.
+    """
+    dl_sql = ", ".join(f"SUM(d.{c}) AS {c}" for c in direct_loss_columns())
+    sql = text(f"""
+        SELECT
+          COALESCE(b.provinsi, '') AS provinsi,
+          COALESCE(LOWER(b.kode_bangunan), LOWER(SPLIT_PART(b.id_bangunan, '_', 1))) AS kode_bangunan,
+          COUNT(*) AS jumlah_bangunan,
+          {dl_sql}
+        FROM bangunan_copy b
+        JOIN hasil_proses_directloss d USING (id_bangunan)
+        GROUP BY 1, 2
+    """)
+    with timed_connect(db.engine) as conn:
+        return pd.read_sql(sql, conn)
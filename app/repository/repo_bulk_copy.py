@@ -0,0 +1,168 @@
+# app/repository/repo_bulk_copy.py
+
+import logging
+import tempfile
+import pandas as pd
+from sqlalchemy import Integer
+from app.config import Config
+from app.extensions import db
+from app.repository.repo_shadow_table import create_shadow, publish_shadows
+
+logger = logging.getLogger(__name__)
+
+def _resolve_table(table):
+    """Terima nama tabel, Table SQLAlchemy, atau model ORM → (nama, Table|None)."""
+    if hasattr(table, "__table__"):
+        table = table.__table__
+    if hasattr(table, "columns"):
+        return table.name, table
+    return str(table), None
+
+def _prepare_frame(df, columns, table_obj):
+    """Pilih kolom & rapikan tipe agar teks CSV bisa diterima COPY."""
+    out = df[columns].copy()
+    if table_obj is not None:
+        for col in columns:
+            if col in table_obj.c and isinstance(table_obj.c[col].type, Integer):
+                if pd.api.types.is_float_dtype(out[col]):
+                    out[col] = out[col].round().astype("Int64")
+    return out
+
+def write_csv_buffer(df, columns, table_obj=None):
+    """Tulis DataFrame ke buffer CSV (memori, tumpah ke disk jika besar)."""
+    buf = tempfile.SpooledTemporaryFile(
+        max_size=Config.COPY_SPOOL_MAX_BYTES, mode="w+", newline=""
+    )
+    _prepare_frame(df, columns, table_obj).to_csv(
+        buf, index=False, header=False, na_rep=""
+    )
+    buf.seek(0)
+    return buf
+
+def _copy_into(cur, table_name, df, columns, table_obj):
+    col_sql = ", ".join(columns)
+    with write_csv_buffer(df, columns, table_obj) as buf:
+        cur.copy_expert(
+            f"COPY {table_name} ({col_sql}) FROM STDIN WITH (FORMAT csv, NULL '')",
+            buf
+        )
+    return len(df)
+
+def copy_dataframe(df, table, columns=None, truncate=False, staging=False,
+                   connection=None, target=None):
+    """
+    Stream DataFrame ke tabel Postgres via COPY ... FROM STDIN.
+
+    - truncate=True : kosongkan tabel dulu, dalam transaksi yang sama
+    - staging=True  : tulis ke tabel bayangan (LIKE tabel) lalu di akhir
+                      ditukar dengan tabel asli lewat RENAME (pembaca tidak
+                      pernah melihat tabel setengah jadi)
+    - connection    : Connection SQLAlchemy yang sedang dipakai (misal
+                      db.session.connection()); commit diserahkan ke pemanggil
+    - target        : nama tabel tujuan lain dengan struktur sama
+                      (misal tabel bayangan dari repo_shadow_table)
+
+    Mengembalikan jumlah baris yang ditulis.
+    """
+    table_name, table_obj = _resolve_table(table)
+    columns = list(columns) if columns is not None else list(df.columns)
+    if target is not None:
+        table_name = target
+
+    if staging:
+        shadow = create_shadow(table_name)
+        n = copy_dataframe(df, table, columns, target=shadow)
+        publish_shadows([table_name], keep=0)
+        return n
+
+    if connection is not None:
+        cur = connection.connection.cursor()
+        try:
+            if truncate:
+                cur.execute(f"TRUNCATE {table_name}")
+            return _copy_into(cur, table_name, df, columns, table_obj)
+        finally:
+            cur.close()
+
+    conn = db.engine.raw_connection()
+    cur = conn.cursor()
+    try:
+        if truncate:
+            cur.execute(f"TRUNCATE {table_name}")
+        n = _copy_into(cur, table_name, df, columns, table_obj)
+        conn.commit()
+        logger.info(f"✅ COPY {n} baris ke {table_name}")
+        return n
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"❌ COPY ke {table_name} gagal: {e}")
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+def upsert_dataframe(df, table, key_columns, columns=None, connection=None, prune=False):
+    """
+    Upsert DataFrame lewat COPY ke temp table lalu
+    INSERT ... ON CONFLICT (key_columns) DO UPDATE dalam satu transaksi.
+    connection: Connection SQLAlchemy milik pemanggil (commit diserahkan ke
+    pemanggil); default koneksi raw baru yang langsung di-commit.
+    prune=True : baris tabel yang kuncinya tidak ada di df ikut dihapus
+                 (isi akhir = df, tanpa TRUNCATE / lock eksklusif)
+    Mengembalikan jumlah baris yang di-upsert.
+    """
+    table_name, table_obj = _resolve_table(table)
+    columns = list(columns) if columns is not None else list(df.columns)
+    key_columns = list(key_columns)
+    tmp = f"tmp_upsert_{table_name}"
+    col_sql = ", ".join(columns)
+    updates = [c for c in columns if c not in key_columns]
+    set_sql = ", ".join(f"{c} = EXCLUDED.{c}" for c in updates)
+    conflict = f"DO UPDATE SET {set_sql}" if updates else "DO NOTHING"
+    key_match = " AND ".join(f"s.{c} = t.{c}" for c in key_columns)
+
+    def _run(cur):
+        cur.execute(f"DROP TABLE IF EXISTS {tmp}")
+        cur.execute(
+            f"CREATE TEMP TABLE {tmp} ON COMMIT DROP AS "
+            f"SELECT {col_sql} FROM {table_name} WITH NO DATA"
+        )
+        n = _copy_into(cur, tmp, df, columns, table_obj)
+        cur.execute(f"ANALYZE {tmp}")
+        cur.execute(
+            f"INSERT INTO {table_name} ({col_sql}) SELECT {col_sql} FROM {tmp} "
+            f"ON CONFLICT ({', '.join(key_columns)}) {conflict}"
+        )
+        if prune:
+            cur.execute(
+                f"DELETE FROM {table_name} t "
+                f"WHERE NOT EXISTS (SELECT 1 FROM {tmp} s WHERE {key_match})"
+            )
+            if cur.rowcount:
+                logger.info(f"🧹 {cur.rowcount} baris usang dihapus dari {table_name}")
+        cur.execute(f"DROP TABLE {tmp}")
+        return n
+
+    if df.empty:
+        return 0
+    if connection is not None:
+        cur = connection.connection.cursor()
+        try:
+            return _run(cur)
+        finally:
+            cur.close()
+
+    conn = db.engine.raw_connection()
+    cur = conn.cursor()
+    try:
+        n = _run(cur)
+        conn.commit()
+        logger.info(f"✅ Upsert {n} baris ke {table_name}")
+        return n
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"❌ Upsert ke {table_name} gagal: {e}")
+        raise
+    finally:
+        cur.close()
+        conn.close()
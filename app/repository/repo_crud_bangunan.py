@@ -3,6 +3,7 @@
 from sqlalchemy import insert
 from app.models.models_database import Bangunan
 from app.extensions import db
+from app.repository.repo_hazard_assignment import refresh_assignments, delete_assignments
 
 class BangunanRepository:
     # Daftar kolom non-geom untuk SELECT — ditambahkan jumlah_lantai
@@ -79,16 +80,20 @@ class BangunanRepository:
         return [r[0] for r in rows]
 
     @staticmethod
-    def create(data):
+    def create(data, refresh_assignment=True):
         """
         INSERT record baru hanya untuk kolom non-geom.
         Postgres akan generate geom otomatis.
+        refresh_assignment=False dipakai saat insert massal
+        (penugasan bencana di-refresh sekali di akhir).
         """
         # hanya ambil field yang sudah didefinisikan
         insert_data = {f: data[f] for f in BangunanRepository._fields if f in data}
         stmt = insert(Bangunan).values(**insert_data)
         db.session.execute(stmt)
         db.session.commit()
+        if refresh_assignment:
+            refresh_assignments([insert_data["id_bangunan"]])
         # kembalikan hasil SELECT tanpa geom
         return BangunanRepository.get_by_id(insert_data["id_bangunan"])
 
@@ -103,9 +108,13 @@ class BangunanRepository:
         # jangan override id_bangunan atau geom
         data.pop("id_bangunan", None)
         data.pop("geom", None)
+        moved = "lon" in data or "lat" in data
         for k, v in data.items():
             setattr(b, k, v)
         db.session.commit()
+        # lokasi berubah → titik bencana terdekat ikut berubah
+        if moved:
+            refresh_assignments([bangunan_id])
         return BangunanRepository.get_by_id(bangunan_id)
 
     @staticmethod
@@ -118,4 +127,5 @@ class BangunanRepository:
             return False
         db.session.delete(b)
         db.session.commit()
+        delete_assignments([bangunan_id])
         return True
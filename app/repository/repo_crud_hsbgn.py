@@ -27,14 +27,17 @@ class HSBGNRepository:
         return new_hsbgn
 
     @staticmethod
-    def update(hsbgn_id, data):
-        """Memperbarui data HSBGN berdasarkan ID"""
+    def update(hsbgn_id, data, commit=True):
+        """Memperbarui data HSBGN berdasarkan ID (commit=False: commit oleh pemanggil)"""
         # gunakan filter string untuk mencocokkan id_kota
         hsbgn = HSBGN.query.filter(HSBGN.id_kota == str(hsbgn_id)).first()
         if hsbgn:
             for key, value in data.items():
                 setattr(hsbgn, key, value)
-            db.session.commit()
+            if commit:
+                db.session.commit()
+            else:
+                db.session.flush()
             return hsbgn
         return None
 
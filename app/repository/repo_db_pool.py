@@ -0,0 +1,102 @@
+# app/repository/repo_db_pool.py
+
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from sqlalchemy import event
+from app.extensions import db
+
+logger = logging.getLogger(__name__)
+
+class PoolMetrics:
+    """Counter pool koneksi (checkout, checkin, koneksi baru, waktu tunggu)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.connects = 0
+            self.checkouts = 0
+            self.checkins = 0
+            self.invalidated = 0
+            self.timed_acquisitions = 0
+            self.wait_total_s = 0.0
+            self.wait_max_s = 0.0
+            self.acquire_timeouts = 0
+
+    def incr(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.timed_acquisitions += 1
+            self.wait_total_s += seconds
+            self.wait_max_s = max(self.wait_max_s, seconds)
+
+    def to_dict(self):
+        with self._lock:
+            n = self.timed_acquisitions
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidated": self.invalidated,
+                "timed_acquisitions": n,
+                "wait_avg_ms": round(1000 * self.wait_total_s / n, 3) if n else 0.0,
+                "wait_max_ms": round(1000 * self.wait_max_s, 3),
+                "acquire_timeouts": self.acquire_timeouts,
+            }
+
+POOL_METRICS = PoolMetrics()
+_INSTALLED = set()
+
+def install_pool_metrics(engine):
+    """Pasang listener event pool pada engine (sekali per engine)."""
+    if id(engine) in _INSTALLED:
+        return
+    pool = engine.pool
+    event.listen(pool, "connect", lambda *a: POOL_METRICS.incr("connects"))
+    event.listen(pool, "checkout", lambda *a: POOL_METRICS.incr("checkouts"))
+    event.listen(pool, "checkin", lambda *a: POOL_METRICS.incr("checkins"))
+    event.listen(pool, "invalidate", lambda *a: POOL_METRICS.incr("invalidated"))
+    _INSTALLED.add(id(engine))
+    logger.info(f"✅ Pool metrics aktif ({pool.__class__.__name__})")
+
+@contextmanager
+def timed_connect(engine=None):
+    """
+    engine.connect() yang mencatat lama menunggu koneksi dari pool
+    (termasuk saat pool penuh dan harus antre sampai pool_timeout).
+    """
+    engine = engine or db.engine
+    t0 = time.perf_counter()
+    try:
+        conn = engine.connect()
+    except Exception as e:
+        if e.__class__.__name__ == "TimeoutError":
+            POOL_METRICS.incr("acquire_timeouts")
+        raise
+    POOL_METRICS.record_wait(time.perf_counter() - t0)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+def pool_snapshot(engine=None):
+    """Status pool saat ini + counter kumulatif."""
+    engine = engine or db.engine
+    pool = engine.pool
+    snap = {"pool_class": pool.__class__.__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        fn = getattr(pool, name, None)
+        if callable(fn):
+            snap[name] = fn()
+    snap["max_overflow"] = getattr(pool, "_max_overflow", None)
+    snap["timeout"] = getattr(pool, "_timeout", None)
+    snap["status"] = pool.status()
+    snap["metrics"] = POOL_METRICS.to_dict()
+    return snap
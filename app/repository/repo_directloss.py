@@ -2,141 +2,247 @@
 
 import os
 import pandas as pd
-from sqlalchemy import create_engine, text
-from app.config import Config
+from sqlalchemy import text
+from app.extensions import db
+from app.repository.repo_db_pool import timed_connect
+from app.hazard_registry import HAZARDS
 
 # Direktori Debug (opsional)
 DEBUG_DIR = os.path.join(os.getcwd(), "debug_output")
 os.makedirs(DEBUG_DIR, exist_ok=True)
 
 def get_db_connection():
-    """Membuat koneksi ke database PostgreSQL."""
+    """
+    Engine PostgreSQL bersama (db.engine) dengan pool dari
+    Config.SQLALCHEMY_ENGINE_OPTIONS; butuh app context.
+    """
     try:
-        return create_engine(Config.SQLALCHEMY_DATABASE_URI)
+        return db.engine
     except Exception as e:
         raise ConnectionError(f"❌ Gagal terhubung ke database: {e}")
 
-def get_bangunan_data():
-    """Mengambil data bangunan lengkap."""
-    query = text("""
-        SELECT
+# Kolom bangunan yang dipakai pipeline direct loss (tanpa geom / nama / alamat)
+BANGUNAN_LOSS_COLS = """
             b.id_bangunan,
-            b.geom,
             b.luas,
-            b.nama_gedung,
-            b.alamat,
             b.kode_bangunan,
             b.provinsi,
             b.kota,
             b.jumlah_lantai,
-            COALESCE(k.hsbgn, 0.0) AS hsbgn
+            COALESCE(k.hsbgn, 0.0) AS hsbgn"""
+
+def name_match(column, param):
+    """
+    Perbandingan nama wilayah tanpa beda huruf besar / spasi tepi; dipakai
+    semua filter provinsi / kota agar setiap endpoint mencocokkan nama sama.
+    """
+    return f"TRIM(LOWER({column})) = TRIM(LOWER(:{param}))"
+
+def scope_filter(provinsi=None, kota=None):
+    """
+    Klausa WHERE (alias bangunan: b) + parameter untuk membatasi proses ke
+    satu provinsi dan/atau kota. Tanpa argumen → ("", {}) = semua bangunan.
+    """
+    conds, params = [], {}
+    if provinsi:
+        conds.append(name_match("b.provinsi", "provinsi"))
+        params["provinsi"] = provinsi
+    if kota:
+        conds.append(name_match("b.kota", "kota"))
+        params["kota"] = kota
+    return ("WHERE " + " AND ".join(conds) if conds else ""), params
+
+def get_bangunan_data(where="", params=None):
+    """Mengambil data bangunan yang dibutuhkan perhitungan direct loss."""
+    query = text(f"""
+        SELECT{BANGUNAN_LOSS_COLS}
         FROM bangunan_copy b
-        LEFT JOIN kota k ON b.kota = k.kota;
+        LEFT JOIN kota k ON b.kota = k.kota
+        {where};
     """)
     engine = get_db_connection()
-    with engine.connect() as conn:
-        return pd.read_sql(query, conn)
+    with timed_connect(engine) as conn:
+        return pd.read_sql(query, conn, params=params or {})
 
-def get_all_disaster_data():
+def get_directloss_frame(where="", params=None, connection=None):
+    """
+    Direct loss tersimpan + provinsi & kode_bangunan (untuk hitung ulang AAL).
+    where/params: filter bangunan (lihat scope_filter).
+    connection: pakai koneksi pemanggil (misal dalam transaksi yang sama).
     """
-    Untuk tiap jenis bencana:
-     - Filter titik intensitas dalam 'threshold' (meter via geography)
-     - Cari nearest dengan KNN (<->) di geography
-     - Ambil nilai vulnerability via dmgratio_*
-    """
-    def vcols_gempa(pre, s):
-        return [
-            f"h.dmgratio_cr_{pre}{s}         AS nilai_y_cr_{pre}{s}",
-            f"h.dmgratio_mcf_{pre}{s}        AS nilai_y_mcf_{pre}{s}",
-            f"h.dmgratio_mur_{pre}{s}        AS nilai_y_mur_{pre}{s}",
-            f"h.dmgratio_lightwood_{pre}{s}  AS nilai_y_lightwood_{pre}{s}",
-        ]
-
-    def vcols_banjir(pre, s):
-        return [
-            f"h.dmgratio_1_{pre}{s} AS nilai_y_1_{pre}{s}",
-            f"h.dmgratio_2_{pre}{s} AS nilai_y_2_{pre}{s}",
-        ]
-
-    mapping = {
-        "gempa": {
-            "raw":      "model_intensitas_gempa",
-            "dmgr":     "dmgratio_gempa",
-            "prefix":   "mmi",
-            "scales":   ["500","250","100"],
-            "threshold": 9500,
-            "vcols":    vcols_gempa
-        },
-        "banjir": {
-            "raw":      "model_intensitas_banjir",
-            "dmgr":     "dmgratio_banjir_copy",
-            "prefix":   "depth",
-            "scales":   ["100","50","25"],
-            "threshold": 700,
-            "vcols":    vcols_banjir
-        },
-        "longsor": {
-            "raw":      "model_intensitas_longsor",
-            "dmgr":     "dmgratio_longsor",
-            "prefix":   "mflux",
-            "scales":   ["5","2"],
-            "threshold": 700,
-            "vcols":    vcols_gempa
-        },
-        "gunungberapi": {
-            "raw":      "model_intensitas_gunungberapi",
-            "dmgr":     "dmgratio_gunungberapi",
-            "prefix":   "kpa",
-            "scales":   ["250","100","50"],
-            "threshold": 550,
-            "vcols":    vcols_gempa
-        }
-    }
+    query = text(f"""
+        SELECT
+            b.provinsi,
+            COALESCE(b.kode_bangunan, LOWER(split_part(b.id_bangunan, '_', 1))) AS kode_bangunan,
+            d.*
+        FROM hasil_proses_directloss d
+        JOIN bangunan_copy b USING (id_bangunan)
+        {where};
+    """)
+    if connection is not None:
+        return pd.read_sql(query, connection, params=params or {}).drop(columns=["id_bangunan"])
+    engine = get_db_connection()
+    with timed_connect(engine) as conn:
+        return pd.read_sql(query, conn, params=params or {}).drop(columns=["id_bangunan"])
+
+# Jumlah kandidat KNN (geometry) yang dicek ulang jaraknya dalam meter
+KNN_CANDIDATES = 8
+# Meter per derajat lintang (dipakai untuk bounding box pre-filter)
+METERS_PER_DEGREE = 111319.9
+
+def nearest_hazard_sql(cfg, candidates=KNN_CANDIDATES):
+    """
+    Subquery LATERAL (alias bangunan: b) yang mengembalikan id_lokasi dan
+    distance_m titik bencana terdekat yang punya baris dmgratio_*:
+     - pre-filter kandidat dengan bounding box (&&) + KNN geometry (<->)
+       sehingga GiST index pada r.geom terpakai
+     - jarak meter (geography) hanya dihitung untuk kandidat tersebut
+    """
+    thr = cfg.threshold_m
+    dy = thr / METERS_PER_DEGREE
+    return f"""(
+              SELECT
+                h.id_lokasi,
+                ST_Distance(h.geom::geography, b.geom::geography) AS distance_m
+              FROM (
+                SELECT r.geom, h.id_lokasi
+                FROM {cfg.raw_table} r
+                JOIN {cfg.dmgr_table} h USING (id_lokasi)
+                WHERE r.geom && ST_Expand(
+                  b.geom,
+                  {dy} / GREATEST(cos(radians(ST_Y(b.geom))), 0.01),
+                  {dy}
+                )
+                ORDER BY r.geom <-> b.geom
+                LIMIT {candidates}
+              ) h
+              WHERE ST_DWithin(h.geom::geography, b.geom::geography, {thr})
+              ORDER BY distance_m
+              LIMIT 1
+            )"""
+
+def _hazard_join_parts(names):
+    """(kolom nilai_y_*, LEFT JOIN hazard_assignment ⋈ dmgratio_*) untuk bencana 'names'."""
+    joins, outer_cols = [], []
+    for name in names:
+        cfg = HAZARDS[name]
+        a, h = f"a_{name}", f"h_{name}"
+        for s in cfg.scales:
+            outer_cols.extend(cfg.vcols(s, h))
+        joins.append(f"""
+        LEFT JOIN hazard_assignment {a}
+          ON {a}.id_bangunan = b.id_bangunan AND {a}.hazard = '{name}'
+        LEFT JOIN {cfg.dmgr_table} {h}
+          ON {h}.id_lokasi = {a}.id_lokasi""")
+
+    return ",\n          ".join(outer_cols), "".join(joins)
 
+def _disaster_data_sql(names, where=""):
+    """SELECT id_bangunan + kolom vulnerability untuk bencana 'names' (via hazard_assignment)."""
+    outer_sql, join_sql = _hazard_join_parts(names)
+    return f"""
+        SELECT
+          b.id_bangunan,
+          {outer_sql}
+        FROM bangunan_copy b
+        {join_sql}
+        {where};
+    """
+
+def get_all_disaster_data():
+    """
+    Ambil nilai vulnerability semua jenis bencana dalam satu query:
+     - titik intensitas terdekat per bangunan sudah tersimpan di
+       hazard_assignment (lihat repo_hazard_assignment)
+     - sehingga cukup equi-join ke dmgratio_* per bencana
+    Hasil: satu DataFrame kolomnar ber-index id_bangunan (NaN jika tidak ada
+    titik dalam threshold).
+    """
     engine = get_db_connection()
-    all_data = {}
-
-    with engine.connect() as conn:
-        for name, cfg in mapping.items():
-            raw_table  = cfg["raw"]
-            dmgr_table = cfg["dmgr"]
-            pre        = cfg["prefix"]
-            scales     = cfg["scales"]
-            threshold  = cfg["threshold"]
-            make_vcols = cfg["vcols"]
-
-            subq_parts = []
-            sel_parts  = []
-            for s in scales:
-                for expr in make_vcols(pre, s):
-                    subq_parts.append(expr)
-                    alias = expr.split(" AS ")[1]
-                    sel_parts.append(f"near.{alias}")
-
-            subq_cols   = ",\n       ".join(subq_parts)
-            outer_cols  = ",\n  ".join(sel_parts)
-
-            sql = f"""
-                SELECT
-                  b.id_bangunan,
-                  {outer_cols}
-                FROM bangunan_copy b
-                JOIN LATERAL (
-                  SELECT
-                    {subq_cols}
-                  FROM {raw_table} r
-                  JOIN {dmgr_table} h USING(id_lokasi)
-                  WHERE ST_DWithin(
-                    b.geom::geography,
-                    r.geom::geography,
-                    {threshold}
-                  )
-                  ORDER BY b.geom::geography <-> r.geom::geography
-                  LIMIT 1
-                ) AS near ON TRUE;
-            """
-
-            df = pd.read_sql(text(sql), conn)
-            all_data[name] = df
-
-    return all_data
+    with timed_connect(engine) as conn:
+        df = pd.read_sql(text(_disaster_data_sql(HAZARDS)), conn)
+
+    return df.set_index('id_bangunan')
+
+def iter_directloss_input(chunksize, engine=None):
+    """
+    Stream bangunan + vulnerability semua bencana dalam SATU join
+    (bangunan_copy ⋈ kota ⋈ hazard_assignment ⋈ dmgratio_*) lewat
+    server-side cursor, urut id_bangunan, per 'chunksize' baris.
+    Hanya kolom yang dibutuhkan yang diambil, sehingga memori per chunk
+    tetap konstan berapa pun jumlah bangunannya.
+    """
+    outer_sql, join_sql = _hazard_join_parts(HAZARDS)
+    sql = f"""
+        SELECT{BANGUNAN_LOSS_COLS},
+          {outer_sql}
+        FROM bangunan_copy b
+        LEFT JOIN kota k ON b.kota = k.kota
+        {join_sql}
+        ORDER BY b.id_bangunan;
+    """
+
+    engine = engine or get_db_connection()
+    with timed_connect(engine) as conn:
+        conn = conn.execution_options(stream_results=True, max_row_buffer=chunksize)
+        for chunk in pd.read_sql(text(sql), conn, chunksize=chunksize):
+            yield chunk
+
+def get_disaster_data(name, engine=None, where="", params=None):
+    """
+    Sama seperti get_all_disaster_data tetapi hanya untuk satu bencana,
+    supaya tiap bencana bisa diambil paralel (satu koneksi pool per thread).
+    engine: engine bersama; default get_db_connection().
+    where/params: filter bangunan (lihat scope_filter).
+    """
+    if name not in HAZARDS:
+        raise ValueError(f"Jenis bencana tidak dikenal: {name}")
+    engine = engine or get_db_connection()
+    with timed_connect(engine) as conn:
+        df = pd.read_sql(text(_disaster_data_sql([name], where)), conn, params=params or {})
+
+    return df.set_index('id_bangunan')
+
+def get_simulation_input(names=None, where="", params=None, engine=None):
+    """
+    Input simulasi Monte-Carlo: kolom bangunan (BANGUNAN_LOSS_COLS) +
+    intensitas titik yang ditugaskan (hazard_assignment ⋈ model_intensitas_*)
+    sebagai intensitas_<bencana>_<skala>; NaN jika bangunan tidak terpapar.
+    """
+    names = list(HAZARDS) if names is None else list(names)
+    cols, joins = [], []
+    for name in names:
+        cfg = HAZARDS[name]
+        a, r = f"a_{name}", f"r_{name}"
+        cols.extend(
+            f"{r}.{cfg.intensity_col(s)} AS intensitas_{name}_{s}" for s in cfg.scales
+        )
+        joins.append(f"""
+        LEFT JOIN hazard_assignment {a}
+          ON {a}.id_bangunan = b.id_bangunan AND {a}.hazard = '{name}'
+        LEFT JOIN {cfg.raw_table} {r}
+          ON {r}.id_lokasi = {a}.id_lokasi""")
+    sql = f"""
+        SELECT{BANGUNAN_LOSS_COLS},
+          {", ".join(cols)}
+        FROM bangunan_copy b
+        LEFT JOIN kota k ON b.kota = k.kota
+        {"".join(joins)}
+        {where}
+    """
+    with timed_connect(engine or get_db_connection()) as conn:
+        return pd.read_sql(text(sql), conn, params=params or {})
+
+def get_bangunan_points(where="", params=None, engine=None):
+    """Kolom bangunan (BANGUNAN_LOSS_COLS) + lon/lat geom untuk skenario kejadian."""
+    sql = f"""
+        SELECT{BANGUNAN_LOSS_COLS},
+          ST_X(b.geom) AS lon,
+          ST_Y(b.geom) AS lat
+        FROM bangunan_copy b
+        LEFT JOIN kota k ON b.kota = k.kota
+        {where}
+    """
+    with timed_connect(engine or get_db_connection()) as conn:
+        return pd.read_sql(text(sql), conn, params=params or {})
+
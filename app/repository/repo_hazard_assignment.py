@@ -0,0 +1,133 @@
+# app/repository/repo_hazard_assignment.py
+
+import logging
+from sqlalchemy import text
+from app.config import Config
+from app.extensions import db
+from app.models.models_database import HazardAssignment
+from app.hazard_registry import HAZARDS
+from app.repository.repo_directloss import nearest_hazard_sql
+from app.repository.repo_bulk_copy import copy_dataframe
+from app.repository.repo_locks import advisory_lock, RECOMPUTE_LOCK
+from app.repository.repo_hazard_matcher import (
+    match_kdtree, load_building_coords, reset_tree_cache
+)
+
+logger = logging.getLogger(__name__)
+
+def _insert_sql(name, cfg, where=""):
+    """INSERT ... SELECT nearest-neighbour untuk satu jenis bencana."""
+    return text(f"""
+        INSERT INTO hazard_assignment (id_bangunan, hazard, id_lokasi, distance_m)
+        SELECT b.id_bangunan, '{name}', near.id_lokasi, near.distance_m
+        FROM bangunan_copy b
+        JOIN LATERAL {nearest_hazard_sql(cfg)} AS near ON TRUE
+        {where}
+    """)
+
+def _use_kdtree():
+    return Config.HAZARD_MATCHER == "kdtree"
+
+def _insert_rows(df):
+    """Tulis hasil matcher in-process (DataFrame) ke hazard_assignment."""
+    if df.empty:
+        return 0
+    # koneksi session yang sama: DELETE sebelumnya belum di-commit
+    return copy_dataframe(
+        df, HazardAssignment,
+        columns=["id_bangunan", "hazard", "id_lokasi", "distance_m"],
+        connection=db.session.connection()
+    )
+
+def _hazards(hazards=None):
+    names = list(HAZARDS) if hazards is None else list(hazards)
+    unknown = [h for h in names if h not in HAZARDS]
+    if unknown:
+        raise ValueError(f"Jenis bencana tidak dikenal: {', '.join(unknown)}")
+    return names
+
+@advisory_lock(RECOMPUTE_LOCK, shared=True)
+def rebuild_assignments(hazards=None):
+    """
+    Hitung ulang seluruh penugasan untuk jenis bencana tertentu
+    (default: semua). Dipakai saat tabel intensitas / dmgratio di-reload.
+    Tidak boleh berjalan selama full recompute (LockBusy).
+    """
+    names = _hazards(hazards)
+    try:
+        if _use_kdtree():
+            reset_tree_cache(names)
+            matched = match_kdtree(load_building_coords(), names)
+        for name in names:
+            db.session.execute(
+                text("DELETE FROM hazard_assignment WHERE hazard = :hazard"),
+                {"hazard": name}
+            )
+            if _use_kdtree():
+                count = _insert_rows(matched[matched["hazard"] == name])
+            else:
+                count = db.session.execute(_insert_sql(name, HAZARDS[name])).rowcount
+            logger.info(f"✅ hazard_assignment {name}: {count} bangunan")
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"❌ Gagal rebuild hazard_assignment: {e}")
+        raise
+
+def refresh_assignments(bangunan_ids):
+    """
+    Hitung ulang penugasan hanya untuk bangunan tertentu
+    (setelah insert / update lokasi bangunan).
+    """
+    ids = [str(i) for i in bangunan_ids]
+    if not ids:
+        return
+    try:
+        db.session.execute(
+            text("DELETE FROM hazard_assignment WHERE id_bangunan = ANY(:ids)"),
+            {"ids": ids}
+        )
+        if _use_kdtree():
+            _insert_rows(match_kdtree(load_building_coords(ids)))
+        else:
+            for name, cfg in HAZARDS.items():
+                db.session.execute(
+                    _insert_sql(name, cfg, "WHERE b.id_bangunan = ANY(:ids)"),
+                    {"ids": ids}
+                )
+        db.session.commit()
+        logger.debug(f"🔧 hazard_assignment diperbarui untuk {len(ids)} bangunan")
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"❌ Gagal refresh hazard_assignment: {e}")
+        raise
+
+def delete_assignments(bangunan_ids):
+    """Hapus penugasan untuk bangunan yang dihapus."""
+    ids = [str(i) for i in bangunan_ids]
+    if not ids:
+        return
+    db.session.execute(
+        text("DELETE FROM hazard_assignment WHERE id_bangunan = ANY(:ids)"),
+        {"ids": ids}
+    )
+    db.session.commit()
+
+def ensure_assignments():
+    """
+    Pastikan tabel penugasan sudah terisi; dibangun sekali jika masih kosong.
+    Setelah itu tabel dijaga lewat refresh_assignments / rebuild_assignments.
+    """
+    filled = db.session.execute(
+        text("SELECT EXISTS (SELECT 1 FROM hazard_assignment)")
+    ).scalar()
+    if not filled:
+        logger.info("📥 hazard_assignment kosong, membangun penugasan awal...")
+        rebuild_assignments()
+
+def hazard_for_dmgr_table(table_name):
+    """Cari nama bencana berdasarkan tabel dmgratio_* (None jika tidak ada)."""
+    for name, cfg in HAZARDS.items():
+        if cfg.dmgr_table == table_name:
+            return name
+    return None
@@ -0,0 +1,179 @@
+# app/repository/repo_hazard_matcher.py
+
+import time
+import logging
+import threading
+import numpy as np
+import pandas as pd
+from pyproj import Geod
+from scipy.spatial import cKDTree
+from sqlalchemy import text
+
+from app.config import Config
+from app.repository.repo_db_pool import timed_connect
+from app.repository.repo_intensitas import load_raw_intensity
+from app.hazard_registry import HAZARDS
+from app.repository.repo_directloss import (
+    KNN_CANDIDATES, nearest_hazard_sql, get_db_connection
+)
+
+logger = logging.getLogger(__name__)
+
+# Radius rata-rata bumi (m) untuk koordinat 3D; jarak akhir tetap dihitung
+# di elipsoid WGS84 seperti geography PostGIS
+EARTH_RADIUS_M = 6371008.8
+GEOD = Geod(ellps="WGS84")
+
+# Cache pohon per bencana: {nama: {"fingerprint", "checked", "tree":
+# (cKDTree|None, id_lokasi, lon, lat)}}. Fingerprint isi tabel dicek ulang
+# paling sering tiap Config.KDTREE_CACHE_TTL detik, jadi worker lain ikut
+# memakai titik baru setelah tabel intensitas / dmgratio di-reload
+_TREES = {}
+_TREES_LOCK = threading.Lock()
+
+def to_xyz(lon, lat):
+    """Lon/lat (derajat) → koordinat kartesius 3D di bola (meter)."""
+    lon_r = np.radians(np.asarray(lon, dtype=float))
+    lat_r = np.radians(np.asarray(lat, dtype=float))
+    cos_lat = np.cos(lat_r)
+    return EARTH_RADIUS_M * np.column_stack(
+        (cos_lat * np.cos(lon_r), cos_lat * np.sin(lon_r), np.sin(lat_r))
+    )
+
+def chord(meters):
+    """Jarak busur (m) → panjang tali busur (m) pada bola."""
+    return 2 * EARTH_RADIUS_M * np.sin(meters / (2 * EARTH_RADIUS_M))
+
+def tree_fingerprint(name):
+    """
+    Versi titik pohon bencana 'name' (titik raw ber-geom yang punya baris
+    dmgratio): jumlah, id_lokasi maksimum, dan jumlah hash id + koordinat
+    (tidak bergantung urutan); berubah setiap ada titik yang berubah.
+    """
+    cfg = HAZARDS[name]
+    sql = text(f"""
+        SELECT COUNT(*) AS n, MAX(r.id_lokasi) AS max_id,
+               COALESCE(SUM(hashtextextended(
+                 r.id_lokasi || ':' || ST_X(r.geom) || ':' || ST_Y(r.geom), 0
+               )), 0) AS h
+        FROM {cfg.raw_table} r
+        JOIN {cfg.dmgr_table} d USING (id_lokasi)
+        WHERE r.geom IS NOT NULL
+    """)
+    with timed_connect(get_db_connection()) as conn:
+        row = conn.execute(sql).first()
+    return f"{row.n}-{row.max_id}-{row.h}"
+
+def get_tree(name):
+    """
+    cKDTree lon/lat titik intensitas (yang punya dmgratio), di-cache per
+    fingerprint isi tabel; dibangun ulang hanya jika fingerprint berubah.
+    """
+    now = time.monotonic()
+    with _TREES_LOCK:
+        entry = _TREES.get(name)
+        if entry and now - entry["checked"] < Config.KDTREE_CACHE_TTL:
+            return entry["tree"]
+
+    fp = tree_fingerprint(name)
+    with _TREES_LOCK:
+        entry = _TREES.get(name)
+        if entry and entry["fingerprint"] == fp:
+            entry["checked"] = now
+            return entry["tree"]
+
+    pts = load_raw_intensity(name, columns=[], coords=True, with_dmgr=True)
+    lon, lat = pts["lon"].to_numpy(), pts["lat"].to_numpy()
+    tree = cKDTree(to_xyz(lon, lat)) if len(pts) else None
+    entry = {"fingerprint": fp, "checked": now,
+             "tree": (tree, pts["id_lokasi"].to_numpy(), lon, lat)}
+    with _TREES_LOCK:
+        _TREES[name] = entry
+    logger.info(f"🌳 cKDTree {name}: {len(pts)} titik (versi {fp})")
+    return entry["tree"]
+
+def reset_tree_cache(hazards=None):
+    """Buang pohon yang sudah di-cache (misal setelah tabel intensitas di-reload)."""
+    with _TREES_LOCK:
+        for name in (list(_TREES) if hazards is None else hazards):
+            _TREES.pop(name, None)
+
+def load_building_coords(bangunan_ids=None):
+    """Ambil id_bangunan + lon/lat dari geom bangunan (opsional difilter id)."""
+    where = "WHERE b.id_bangunan = ANY(:ids)" if bangunan_ids is not None else ""
+    sql = text(f"""
+        SELECT b.id_bangunan, ST_X(b.geom) AS lon, ST_Y(b.geom) AS lat
+        FROM bangunan_copy b
+        {where}
+    """)
+    params = {"ids": [str(i) for i in bangunan_ids]} if bangunan_ids is not None else {}
+    with timed_connect(get_db_connection()) as conn:
+        return pd.read_sql(sql, conn, params=params)
+
+def match_kdtree(buildings, hazards=None):
+    """
+    Cari titik intensitas terdekat dalam threshold untuk semua bangunan sekaligus.
+     - satu query(k, distance_upper_bound) per bencana sebagai pre-filter kandidat
+     - jarak kandidat dihitung ulang di elipsoid WGS84 (setara ::geography)
+    Input: DataFrame (id_bangunan, lon, lat).
+    Output: DataFrame (id_bangunan, hazard, id_lokasi, distance_m).
+    """
+    names = list(HAZARDS) if hazards is None else list(hazards)
+    cols = ["id_bangunan", "hazard", "id_lokasi", "distance_m"]
+    if buildings.empty:
+        return pd.DataFrame(columns=cols)
+
+    b_lon = buildings["lon"].to_numpy(dtype=float)
+    b_lat = buildings["lat"].to_numpy(dtype=float)
+    xyz = to_xyz(b_lon, b_lat)
+    ids_b = buildings["id_bangunan"].to_numpy()
+
+    frames = []
+    for name in names:
+        tree, ids_lok, p_lon, p_lat = get_tree(name)
+        if tree is None:
+            continue
+        thr = HAZARDS[name].threshold_m
+        k = min(KNN_CANDIDATES, tree.n)
+        # sedikit dilebarkan: tali busur bola vs jarak elipsoid
+        _, idx = tree.query(xyz, k=k, distance_upper_bound=chord(thr) * 1.01)
+        idx = idx.reshape(len(xyz), k)
+
+        valid = idx < tree.n
+        safe = np.where(valid, idx, 0)
+        _, _, dist = GEOD.inv(
+            np.repeat(b_lon, k), np.repeat(b_lat, k),
+            p_lon[safe].ravel(), p_lat[safe].ravel()
+        )
+        dist = dist.reshape(len(xyz), k)
+        dist = np.where(valid & (dist <= thr), dist, np.inf)
+
+        best = np.argmin(dist, axis=1)
+        best_dist = dist[np.arange(len(xyz)), best]
+        hit = np.isfinite(best_dist)
+        frames.append(pd.DataFrame({
+            "id_bangunan": ids_b[hit],
+            "hazard":      name,
+            "id_lokasi":   ids_lok[safe[hit, best[hit]]].astype(int),
+            "distance_m":  best_dist[hit],
+        }))
+        logger.debug(f"🌳 {name}: {hit.sum()} / {len(xyz)} bangunan dalam {thr} m")
+
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=cols)
+
+def match_postgis(bangunan_ids=None, hazards=None):
+    """Jalur SQL (LATERAL KNN) yang sama dengan hazard_assignment, tanpa menulis tabel."""
+    names = list(HAZARDS) if hazards is None else list(hazards)
+    where = "WHERE b.id_bangunan = ANY(:ids)" if bangunan_ids is not None else ""
+    params = {"ids": [str(i) for i in bangunan_ids]} if bangunan_ids is not None else {}
+    frames = []
+    with timed_connect(get_db_connection()) as conn:
+        for name in names:
+            sql = text(f"""
+                SELECT b.id_bangunan, '{name}' AS hazard, near.id_lokasi, near.distance_m
+                FROM bangunan_copy b
+                JOIN LATERAL {nearest_hazard_sql(HAZARDS[name])} AS near ON TRUE
+                {where}
+            """)
+            frames.append(pd.read_sql(sql, conn, params=params))
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,76 @@
+# app/repository/repo_intensitas.py
+"""
+Loader kolom intensitas mentah (model_intensitas_*) tanpa objek ORM.
+
+Hanya kolom yang diminta yang dibaca, lewat COPY (SELECT ...) TO STDOUT
+(CSV) ke buffer lalu langsung di-parse pandas per kolom; geom tidak pernah
+di-decode di Python (lon/lat diambil dengan ST_X / ST_Y di server).
+"""
+
+import tempfile
+import logging
+
+import pandas as pd
+from sqlalchemy import inspect
+
+from app.config import Config
+from app.hazard_registry import HAZARDS
+from app.repository.repo_db_pool import timed_connect
+from app.repository.repo_directloss import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# {tabel: set kolom} (struktur tabel raw tidak berubah selama proses hidup)
+_TABLE_COLUMNS = {}
+
+def intensity_columns(name):
+    """Kolom intensitas bencana di tabel raw, misal ['mmi_500', 'mmi_250', 'mmi_100']."""
+    cfg = HAZARDS[name]
+    return [cfg.intensity_col(s) for s in cfg.scales]
+
+def table_columns(table):
+    if table not in _TABLE_COLUMNS:
+        _TABLE_COLUMNS[table] = {c["name"] for c in inspect(get_db_connection()).get_columns(table)}
+    return _TABLE_COLUMNS[table]
+
+def copy_query_frame(sql, numeric=()):
+    """Hasil SELECT → DataFrame lewat COPY ... TO STDOUT (kolom 'numeric' dibaca float)."""
+    buf = tempfile.SpooledTemporaryFile(
+        max_size=Config.COPY_SPOOL_MAX_BYTES, mode="w+", newline=""
+    )
+    with buf, timed_connect(get_db_connection()) as conn:
+        cur = conn.connection.cursor()
+        try:
+            cur.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER true, NULL '')", buf)
+        finally:
+            cur.close()
+        buf.seek(0)
+        return pd.read_csv(buf, dtype={c: "float64" for c in numeric})
+
+def load_raw_intensity(name, columns=None, coords=False, with_dmgr=False):
+    """
+    DataFrame id_lokasi + kolom intensitas (default semua periode ulang
+    bencana 'name'); coords=True → tambah lon, lat dari geom;
+    with_dmgr=True → hanya titik yang punya baris di tabel dmgratio_*.
+    """
+    cfg = HAZARDS.get(name)
+    if cfg is None:
+        raise ValueError(f"Jenis bencana tidak dikenal: {name}")
+    columns = intensity_columns(name) if columns is None else list(columns)
+    unknown = [c for c in columns if c not in table_columns(cfg.raw_table)]
+    if unknown:
+        raise ValueError(f"Kolom tidak ada di {cfg.raw_table}: {', '.join(unknown)}")
+
+    select = ["r.id_lokasi"] + [f"r.{c}" for c in columns]
+    where = []
+    if coords:
+        select += ["ST_X(r.geom) AS lon", "ST_Y(r.geom) AS lat"]
+        where.append("r.geom IS NOT NULL")
+    join = f"JOIN {cfg.dmgr_table} h USING (id_lokasi)" if with_dmgr else ""
+    sql = (
+        f"SELECT {', '.join(select)} FROM {cfg.raw_table} r {join} "
+        f"{'WHERE ' + ' AND '.join(where) if where else ''}"
+    )
+    df = copy_query_frame(sql, numeric=columns + (["lon", "lat"] if coords else []))
+    logger.info(f"📥 {cfg.raw_table}: {len(df)} titik × {len(columns)} kolom")
+    return df
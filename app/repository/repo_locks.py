@@ -0,0 +1,123 @@
+# app/repository/repo_locks.py
+"""
+Advisory lock Postgres yang dipakai bersama oleh job runner, endpoint
+sinkron, dan penulis hasil inkremental.
+
+ - advisory_lock(name): eksklusif (full recompute, kurva, simulasi, rollback)
+ - advisory_lock(name, shared=True): penulis inkremental (process_subset,
+   recalc / hapus bangunan, propagasi HSBGN) boleh jalan bersamaan satu
+   sama lain, tetapi tidak selama lock eksklusif dengan nama sama dipegang
+
+Lock tidak menunggu: jika bentrok langsung LockBusy (controller → 409).
+Bisa dipakai sebagai context manager maupun decorator.
+Re-entrant per thread, jadi pipeline yang dijalankan job (yang sudah
+memegang lock-nya) boleh memanggil fungsi yang mengambil lock yang sama.
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+
+from sqlalchemy import text
+from app.extensions import db
+
+logger = logging.getLogger(__name__)
+
+# Lock hasil direct loss / AAL: eksklusif untuk full recompute (tabel bayangan
+# + publish_shadows), shared untuk semua penulis inkremental tabel hasil
+RECOMPUTE_LOCK = "full_recompute"
+
+
+class LockBusy(Exception):
+    """Lock sedang dipegang proses / request lain."""
+
+    def __init__(self, name):
+        super().__init__(f"Lock '{name}' sedang dipakai proses lain")
+        self.name = name
+
+
+# {nama lock: mode} yang dipegang thread ini
+_held = threading.local()
+
+# Database non-Postgres (test / SQLite): lock hanya berlaku di proses ini
+_local_locks = {}
+_local_guard = threading.Lock()
+
+
+def _held_locks():
+    if not hasattr(_held, "locks"):
+        _held.locks = {}
+    return _held.locks
+
+
+def _acquire_local(name, shared):
+    with _local_guard:
+        mode, count = _local_locks.get(name, (None, 0))
+        if count and not (shared and mode == "shared"):
+            raise LockBusy(name)
+        _local_locks[name] = ("shared" if shared else "exclusive", count + 1)
+
+
+def _release_local(name):
+    with _local_guard:
+        mode, count = _local_locks[name]
+        if count > 1:
+            _local_locks[name] = (mode, count - 1)
+        else:
+            del _local_locks[name]
+
+
+def _acquire_pg(name, shared):
+    fn = "pg_try_advisory_lock_shared" if shared else "pg_try_advisory_lock"
+    conn = db.engine.connect()
+    try:
+        acquired = bool(conn.execute(text(f"SELECT {fn}(hashtext(:n))"), {"n": name}).scalar())
+        conn.commit()  # lock level sesi, jangan biarkan transaksi menggantung
+    except Exception:
+        conn.close()
+        raise
+    if not acquired:
+        conn.close()
+        raise LockBusy(name)
+    return conn
+
+
+def _release_pg(conn, name, shared):
+    fn = "pg_advisory_unlock_shared" if shared else "pg_advisory_unlock"
+    try:
+        conn.execute(text(f"SELECT {fn}(hashtext(:n))"), {"n": name})
+        conn.commit()
+    finally:
+        conn.close()
+
+
+@contextmanager
+def advisory_lock(name, shared=False):
+    """
+    Pegang lock 'name' selama blok berjalan; LockBusy jika bentrok.
+    Thread yang sudah memegang lock eksklusif boleh mengambilnya lagi
+    (eksklusif atau shared); shared → shared juga re-entrant.
+    """
+    held = _held_locks()
+    mode = held.get(name)
+    if mode == "exclusive" or (mode == "shared" and shared):
+        yield
+        return
+    if mode == "shared":
+        # upgrade shared → eksklusif di thread yang sama akan deadlock
+        raise LockBusy(name)
+
+    conn = None
+    if db.engine.dialect.name == "postgresql":
+        conn = _acquire_pg(name, shared)
+    else:
+        _acquire_local(name, shared)
+    held[name] = "shared" if shared else "exclusive"
+    try:
+        yield
+    finally:
+        del held[name]
+        if conn is not None:
+            _release_pg(conn, name, shared)
+        else:
+            _release_local(name)
@@ -0,0 +1,98 @@
+# app/repository/repo_shadow_table.py
+
+import logging
+from datetime import datetime
+from app.config import Config
+from app.extensions import db
+
+logger = logging.getLogger(__name__)
+
+SHADOW_SUFFIX = "__shadow"
+GEN_MARK      = "__gen_"
+
+def shadow_name(table):
+    return f"{table}{SHADOW_SUFFIX}"
+
+def _list_generations(cur, table):
+    cur.execute(
+        """
+        SELECT tablename FROM pg_tables
+        WHERE schemaname = current_schema()
+          AND tablename LIKE %s
+        ORDER BY tablename DESC
+        """,
+        (f"{table}{GEN_MARK}%".replace("_", r"\_"),)
+    )
+    return [r[0] for r in cur.fetchall()]
+
+def _run(fn):
+    """Jalankan fn(cur) dalam satu transaksi di koneksi raw terpisah."""
+    conn = db.engine.raw_connection()
+    cur = conn.cursor()
+    try:
+        result = fn(cur)
+        conn.commit()
+        return result
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+def create_shadow(table):
+    """Buat (ulang) tabel bayangan kosong dengan struktur & index sama seperti tabel asli."""
+    shadow = shadow_name(table)
+    def fn(cur):
+        cur.execute(f"DROP TABLE IF EXISTS {shadow}")
+        cur.execute(f"CREATE TABLE {shadow} (LIKE {table} INCLUDING ALL)")
+    _run(fn)
+    logger.debug(f"🔧 Shadow table {shadow} dibuat")
+    return shadow
+
+def drop_shadow(table):
+    _run(lambda cur: cur.execute(f"DROP TABLE IF EXISTS {shadow_name(table)}"))
+
+def publish_shadows(tables, keep=None):
+    """
+    Terbitkan semua tabel bayangan dalam SATU transaksi:
+      tabel   → tabel__gen_<timestamp>   (versi lama disimpan)
+      shadow  → tabel
+    Generasi lama di luar 'keep' terbaru dihapus (keep=0: tidak disimpan).
+    """
+    keep = Config.RESULT_GENERATIONS if keep is None else keep
+    stamp = datetime.now().strftime("%Y%m%d%H%M%S%f")
+
+    def fn(cur):
+        for table in tables:
+            gen = f"{table}{GEN_MARK}{stamp}"
+            cur.execute(f"ALTER TABLE {table} RENAME TO {gen}")
+            cur.execute(f"ALTER TABLE {shadow_name(table)} RENAME TO {table}")
+            for old in _list_generations(cur, table)[keep:]:
+                cur.execute(f"DROP TABLE {old}")
+    _run(fn)
+    logger.info(f"✅ Published {', '.join(tables)} (generasi {stamp})")
+    return stamp
+
+def list_generations(table):
+    """Daftar generasi tersimpan (terbaru dulu)."""
+    return _run(lambda cur: _list_generations(cur, table))
+
+def rollback_generation(tables):
+    """
+    Kembalikan tabel ke generasi sebelumnya (terbaru yang tersimpan),
+    untuk semua tabel dalam satu transaksi. Versi aktif dibuang.
+    """
+    def fn(cur):
+        restored = {}
+        for table in tables:
+            gens = _list_generations(cur, table)
+            if not gens:
+                raise ValueError(f"Tidak ada generasi tersimpan untuk {table}")
+            cur.execute(f"DROP TABLE {table}")
+            cur.execute(f"ALTER TABLE {gens[0]} RENAME TO {table}")
+            restored[table] = gens[0][len(table) + len(GEN_MARK):]
+        return restored
+    restored = _run(fn)
+    logger.info(f"↩️ Rollback hasil ke generasi {restored}")
+    return restored
@@ -2,6 +2,7 @@
 
 from sqlalchemy import text
 from app.extensions import db
+from app.models.models_database import HasilAALBangunan
 import logging
 import sys
 import os
@@ -64,9 +65,15 @@ class GedungRepository:
                    'kota',    COALESCE(b.kota, '')
                  )
               || to_jsonb(d)
+              -- AAL per bangunan (aal_<bencana>, aal_total)
+              || COALESCE(
+                   to_jsonb(ab) - 'id_bangunan' - 'provinsi' - 'kota' - 'kode_bangunan',
+                   '{{}}'::jsonb
+                 )
           ) AS f
           FROM bangunan_copy b
           JOIN hasil_proses_directloss d USING(id_bangunan)
+          LEFT JOIN hasil_aal_bangunan ab USING(id_bangunan)
           WHERE {" AND ".join(where)}
         ) sub;
         """
@@ -153,6 +160,34 @@ class GedungRepository:
         row = db.session.execute(text(sql), {"provinsi": provinsi}).mappings().first()
         return dict(row) if row else None
 
+    @staticmethod
+    def fetch_aal_kota(provinsi=None, kota=None):
+        where = ["1=1"]
+        params = {}
+
+        if provinsi:
+            where.append("TRIM(LOWER(provinsi)) = TRIM(LOWER(:provinsi))")
+            params["provinsi"] = provinsi
+
+        if kota:
+            where.append("TRIM(LOWER(kota)) = TRIM(LOWER(:kota))")
+            params["kota"] = kota
+
+        aal_cols = ", ".join(
+            f"SUM({c}) AS {c}" for c in HasilAALBangunan.__table__.columns.keys()
+            if c.startswith("aal_")
+        )
+        sql = f"""
+        SELECT provinsi, kota, COUNT(*) AS jumlah_bangunan, {aal_cols}
+        FROM hasil_aal_bangunan
+        WHERE {" AND ".join(where)}
+        GROUP BY provinsi, kota
+        ORDER BY provinsi, kota
+        """
+        logger.debug("fetch_aal_kota SQL:\n%s", sql)
+        rows = db.session.execute(text(sql), params).mappings().all()
+        return [dict(r) for r in rows]
+
     @staticmethod
     def stream_directloss_csv():
         copy_sql = """
@@ -1,33 +1,16 @@
-from app.models.models_database import RawGempa, RawBanjir, RawLongsor, RawGunungBerapi
-from app import db
-from geoalchemy2.shape import to_shape
+import pandas as pd
+from app.repository.repo_intensitas import load_raw_intensity
 
 class IntensitasRepo:
     @staticmethod
     def get_points_by_bencana(bencana, kolom):
-        model_map = {
-            'gempa': RawGempa,
-            'banjir': RawBanjir,
-            'longsor': RawLongsor,
-            'gunungberapi': RawGunungBerapi
-        }
-
-        model = model_map.get(bencana)
-        if not model:
-            return []
-
+        """
+        DataFrame id_lokasi, x, y, <kolom> titik intensitas (kosong jika
+        bencana / kolom tidak dikenal). Dibaca kolom per kolom tanpa ORM.
+        """
         try:
-            results = db.session.query(model).all()
-            points = []
-            for row in results:
-                geom = to_shape(row.geom)
-                points.append({
-                    'id_lokasi': row.id_lokasi,
-                    'x': geom.x,
-                    'y': geom.y,
-                    kolom: getattr(row, kolom, None)
-                })
-            return points
+            df = load_raw_intensity(bencana, [kolom], coords=True)
+            return df.rename(columns={'lon': 'x', 'lat': 'y'})[['id_lokasi', 'x', 'y', kolom]]
         except Exception as e:
             print(f"[ERROR] Gagal mengambil data {bencana}: {e}")
-            return []
+            return pd.DataFrame(columns=['id_lokasi', 'x', 'y', kolom])
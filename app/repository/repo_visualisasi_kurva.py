@@ -1,3 +1,5 @@
+from sqlalchemy import text
+from app.extensions import db
 from app.models.models_database import (
     GempaReferenceCurve,
     BanjirReferenceCurve,
@@ -19,3 +21,28 @@ def get_disaster_data(disaster_type):
 
     rows = model.query.order_by(model.x.asc()).all()
     return [(row.x, row.y) for row in rows]
+
+REFERENCE_MODELS = {
+    "gempa": GempaReferenceCurve,
+    "banjir": BanjirReferenceCurve,
+    "gunungberapi": GunungBerapiReferenceCurve,
+    "longsor": LongsorReferenceCurve,
+}
+
+def reference_fingerprints():
+    """
+    Hash isi tabel referensi_dmgratio_* per bencana (md5 seluruh baris urut
+    id_referensi) dalam satu query; berubah setiap ada baris yang berubah.
+    """
+    parts = [
+        f"""
+        SELECT '{name}' AS hazard, COUNT(*) AS n,
+               md5(COALESCE(string_agg(
+                 id_referensi || ':' || tipe_kurva || ':' || x || ':' || y,
+                 ',' ORDER BY id_referensi
+               ), '')) AS fp
+        FROM {model.__tablename__}"""
+        for name, model in REFERENCE_MODELS.items()
+    ]
+    rows = db.session.execute(text(" UNION ALL ".join(parts))).fetchall()
+    return {r.hazard: f"{r.n}-{r.fp}" for r in rows}
@@ -0,0 +1,14 @@
+from flask import Blueprint
+from app.controller.controller_aal import AALController
+
+aal_bp = Blueprint("aal_bp", __name__, url_prefix="/api/aal")
+
+aal_bp.add_url_rule(
+    "", view_func=AALController.by_kota, methods=["GET"]
+)
+aal_bp.add_url_rule(
+    "/aggregate", view_func=AALController.aggregate, methods=["POST"]
+)
+aal_bp.add_url_rule(
+    "/portfolio", view_func=AALController.portfolio, methods=["POST"]
+)
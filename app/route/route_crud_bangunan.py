@@ -44,6 +44,13 @@ bangunan_bp.add_url_rule(
     methods=["POST"]
 )
 
+# Recalc directloss & AAL untuk banyak bangunan sekaligus
+bangunan_bp.add_url_rule(
+    "/bangunan/recalc",
+    view_func=BangunanController.recalc_bulk,
+    methods=["POST"]
+)
+
 # Recalc directloss & AAL untuk satu bangunan
 bangunan_bp.add_url_rule(
     "/bangunan/<string:bangunan_id>/recalc",
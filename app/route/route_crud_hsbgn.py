@@ -30,6 +30,11 @@ hsbgn_bp.add_url_rule(
     view_func=HSBGNController.update,
     methods=["PUT"]
 )
+hsbgn_bp.add_url_rule(
+    "/bulk",
+    view_func=HSBGNController.bulk_update,
+    methods=["PUT"]
+)
 hsbgn_bp.add_url_rule(
     "/<string:hsbgn_id>",
     view_func=HSBGNController.delete,
@@ -1,8 +1,14 @@
-from app.controller.controller_directloss import home, process_data
+from app.controller.controller_directloss import (
+    home, process_data, process_assignment,
+    rollback_data, list_generations_data
+)
 
 def setup_join_routes(app):
     """
     Menetapkan rute API untuk pemrosesan data.
     """
     app.add_url_rule('/', 'home', home, methods=['GET'])
-    app.add_url_rule('/process_join', 'process_data', process_data, methods=['GET'])
+    app.add_url_rule('/process_join', 'process_data', process_data, methods=['GET', 'POST'])
+    app.add_url_rule('/process_assignment', 'process_assignment', process_assignment, methods=['GET', 'POST'])
+    app.add_url_rule('/process_join/generations', 'list_generations_data', list_generations_data, methods=['GET'])
+    app.add_url_rule('/process_join/rollback', 'rollback_data', rollback_data, methods=['POST'])
@@ -0,0 +1,17 @@
+from flask import Blueprint
+from app.controller.controller_jobs import JobController
+
+jobs_bp = Blueprint("jobs_bp", __name__, url_prefix="/api/jobs")
+
+jobs_bp.add_url_rule(
+    "", view_func=JobController.list, methods=["GET"]
+)
+jobs_bp.add_url_rule(
+    "/<string:kind>", view_func=JobController.submit, methods=["POST"]
+)
+jobs_bp.add_url_rule(
+    "/<string:job_id>", view_func=JobController.get, methods=["GET"]
+)
+jobs_bp.add_url_rule(
+    "/<string:job_id>", view_func=JobController.cancel, methods=["DELETE"]
+)
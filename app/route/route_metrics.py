@@ -0,0 +1,8 @@
+from flask import Blueprint
+from app.controller.controller_metrics import MetricsController
+
+metrics_bp = Blueprint("metrics_bp", __name__, url_prefix="/api/metrics")
+
+metrics_bp.add_url_rule(
+    "/db-pool", view_func=MetricsController.db_pool, methods=["GET"]
+)
@@ -0,0 +1,8 @@
+from flask import Blueprint
+from app.controller.controller_scenario import ScenarioController
+
+scenario_bp = Blueprint("scenario_bp", __name__, url_prefix="/api/scenario")
+
+scenario_bp.add_url_rule(
+    "/gempa", view_func=ScenarioController.gempa, methods=["POST"]
+)
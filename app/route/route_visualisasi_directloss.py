@@ -49,6 +49,18 @@ def aal_data():
             data[k] = 0.0
     return jsonify(data)
 
+@gedung_bp.route('/aal-kota', methods=['GET'])
+def aal_kota():
+    """Jumlah AAL per bangunan (hasil_aal_bangunan) per provinsi & kota."""
+    prov = request.args.get('provinsi')
+    kota = request.args.get('kota')
+    rows = GedungService.get_aal_kota(prov, kota)
+    for row in rows:
+        for k, v in row.items():
+            if isinstance(v, float) and (math.isnan(v) or math.isinf(v)):
+                row[k] = 0.0
+    return jsonify(rows)
+
 # — CSV download endpoints (tanpa filter) —
 @gedung_bp.route('/gedung/download', methods=['GET'])
 def download_directloss():
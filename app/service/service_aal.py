@@ -0,0 +1,191 @@
+# app/service/service_aal.py
+"""
+Engine AAL (Average Annual Loss) dari kurva exceedance-probability (EP).
+
+Per bangunan & bencana, titik kurva adalah (p_i, L_i) untuk tiap periode ulang
+di hazard registry (p = 1 / RP). AAL = ∫ L dp:
+ - 'trapezoid': integral trapesium di antara titik-titik kurva, ditambah
+   persegi panjang 0..p_rarest dengan loss periode ulang terbesar; tidak ada
+   kontribusi di atas p yang paling sering (loss di luar data dianggap 0)
+ - 'discrete' : Σ L_i × p_i (metode lama)
+Karena integral linear terhadap L, keduanya bisa dinyatakan sebagai bobot per
+periode ulang (rp_weights), sehingga rollup provinsi cukup Σ direct_loss × bobot.
+
+Agregasi kota / poligon (aggregate_kota, aggregate_polygon) menjumlahkan
+direct loss & AAL per bangunan; hasilnya di-cache per kota / hash poligon.
+"""
+
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from app.config import Config
+from app.hazard_registry import HAZARDS
+from app.repository.repo_aal import aggregate_by_kode, kota_filter, polygon_filter
+
+def _method(method=None):
+    method = (method or Config.AAL_METHOD).lower()
+    if method not in ("trapezoid", "discrete"):
+        raise ValueError(f"AAL_METHOD tidak dikenal: {method}")
+    return method
+
+def ep_weights(probabilities, method=None):
+    """
+    Bobot AAL per titik kurva (urutan sama dengan input).
+    trapezoid, p terurut naik p_1 < ... < p_n:
+      w_1 = p_1 + (p_2 - p_1) / 2
+      w_i = (p_{i+1} - p_{i-1}) / 2
+      w_n = (p_n - p_{n-1}) / 2
+    """
+    p = np.asarray(probabilities, dtype=float)
+    if _method(method) == "discrete" or len(p) == 1:
+        return p.copy()
+    order = np.argsort(p)
+    ps = p[order]
+    w = np.empty_like(ps)
+    w[0] = ps[0] + (ps[1] - ps[0]) / 2
+    w[1:-1] = (ps[2:] - ps[:-2]) / 2
+    w[-1] = (ps[-1] - ps[-2]) / 2
+    out = np.empty_like(w)
+    out[order] = w
+    return out
+
+def rp_weights(method=None):
+    """{<bencana>_<periode ulang>: bobot AAL} untuk semua bencana di registry."""
+    weights = {}
+    for hazard in HAZARDS.values():
+        w = ep_weights([rp.probability for rp in hazard.return_periods], method)
+        for rp, wi in zip(hazard.return_periods, w):
+            weights[f"{hazard.name}_{rp.scale}"] = float(wi)
+    return weights
+
+def building_aal(losses, method=None):
+    """
+    AAL per bangunan dari kolom direct loss (vektor, jutaan baris sekaligus).
+    losses: mapping kolom direct_loss_<bencana>_<rp> → array (DataFrame juga bisa).
+    Mengembalikan {"aal_<bencana>": array, ..., "aal_total": array}.
+    """
+    method = _method(method)
+    out, total = {}, None
+    for hazard in HAZARDS.values():
+        rps = sorted(hazard.return_periods, key=lambda rp: rp.probability)
+        p = np.array([rp.probability for rp in rps])
+        L = np.column_stack([
+            np.nan_to_num(np.asarray(losses[hazard.direct_loss_col(rp.scale)], dtype=float))
+            for rp in rps
+        ])
+        if method == "trapezoid":
+            # titik (0, L_rarest) menutup ekor langka sebagai persegi panjang
+            x = np.concatenate(([0.0], p))
+            y = np.concatenate((L[:, :1], L), axis=1)
+            aal = np.trapezoid(y, x=x, axis=1)
+        else:
+            aal = L @ p
+        out[f"aal_{hazard.name}"] = aal
+        total = aal if total is None else total + aal
+    out["aal_total"] = total
+    return out
+
+
+# ======================== AGREGASI KOTA / POLIGON ========================
+# Cache hasil agregasi: {kunci: (waktu simpan, hasil)}
+_AGG_CACHE = OrderedDict()
+_AGG_LOCK = threading.Lock()
+
+def invalidate_aal_cache():
+    """Kosongkan cache agregasi (dipanggil setiap hasil direct loss / AAL berubah)."""
+    with _AGG_LOCK:
+        _AGG_CACHE.clear()
+
+def _cached(key, compute):
+    now = time.monotonic()
+    with _AGG_LOCK:
+        hit = _AGG_CACHE.get(key)
+        if hit and now - hit[0] < Config.AAL_CACHE_TTL:
+            _AGG_CACHE.move_to_end(key)
+            return {**hit[1], "cached": True}
+    result = compute()
+    with _AGG_LOCK:
+        _AGG_CACHE[key] = (now, result)
+        while len(_AGG_CACHE) > Config.AAL_CACHE_MAX_ENTRIES:
+            _AGG_CACHE.popitem(last=False)
+    return {**result, "cached": False}
+
+def _summarize(rows):
+    """Baris per kode_bangunan → ringkasan per bencana, per kode_bangunan, dan total."""
+    def _v(row, col):
+        return float(row.get(col) or 0.0)
+
+    def _block(rowset):
+        out = {}
+        for hazard in HAZARDS.values():
+            out[hazard.name] = {
+                "direct_loss": {
+                    s: sum(_v(r, hazard.direct_loss_col(s)) for r in rowset)
+                    for s in hazard.scales
+                },
+                "aal": sum(_v(r, f"aal_{hazard.name}") for r in rowset),
+            }
+        return out
+
+    return {
+        "jumlah_bangunan": int(sum(r["jumlah_bangunan"] for r in rows)),
+        "aal_total": sum(_v(r, "aal_total") for r in rows),
+        "by_hazard": _block(rows),
+        "by_kode_bangunan": {
+            r["kode_bangunan"]: {
+                "jumlah_bangunan": int(r["jumlah_bangunan"]),
+                "aal_total": _v(r, "aal_total"),
+                "by_hazard": _block([r]),
+            }
+            for r in rows
+        },
+    }
+
+def normalize_polygon(geojson):
+    """
+    Terima geometry Polygon/MultiPolygon, Feature, atau FeatureCollection
+    → (geometry GeoJSON, hash sha1 bentuk kanoniknya).
+    """
+    if isinstance(geojson, str):
+        geojson = json.loads(geojson)
+    if not isinstance(geojson, dict):
+        raise ValueError("Body harus GeoJSON Polygon / MultiPolygon")
+    if geojson.get("type") == "Feature":
+        geojson = geojson.get("geometry") or {}
+    elif geojson.get("type") == "FeatureCollection":
+        polys = []
+        for feat in geojson.get("features") or []:
+            geom = normalize_polygon(feat)[0]
+            coords = geom["coordinates"]
+            polys.extend(coords if geom["type"] == "MultiPolygon" else [coords])
+        if not polys:
+            raise ValueError("FeatureCollection tidak berisi poligon")
+        geojson = {"type": "MultiPolygon", "coordinates": polys}
+    if geojson.get("type") not in ("Polygon", "MultiPolygon") or not geojson.get("coordinates"):
+        raise ValueError("Geometri harus Polygon / MultiPolygon")
+    geom = {"type": geojson["type"], "coordinates": geojson["coordinates"]}
+    canonical = json.dumps(geom, sort_keys=True, separators=(",", ":"))
+    return geom, hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+def aggregate_kota(kota, provinsi=None):
+    """Agregasi direct loss & AAL bangunan di satu kota (opsional dibatasi provinsi)."""
+    key = ("kota", kota.strip().lower(), (provinsi or "").strip().lower())
+
+    def _compute():
+        where, params = kota_filter(kota, provinsi)
+        return {"kota": kota, "provinsi": provinsi, **_summarize(aggregate_by_kode(where, params))}
+    return _cached(key, _compute)
+
+def aggregate_polygon(geojson):
+    """Agregasi direct loss & AAL bangunan yang beririsan dengan poligon GeoJSON."""
+    geom, digest = normalize_polygon(geojson)
+
+    def _compute():
+        where, params = polygon_filter(json.dumps(geom))
+        return {"polygon_hash": digest, **_summarize(aggregate_by_kode(where, params))}
+    return _cached(("polygon", digest), _compute)
@@ -1,4 +1,3 @@
-import math
 import time
 import random
 import io
@@ -7,9 +6,14 @@ import csv
 import pandas as pd
 from app.extensions import db
 from app.repository.repo_crud_bangunan import BangunanRepository
-from app.models.models_database import HasilProsesDirectLoss, HasilAALProvinsi
 from app.repository.repo_directloss import get_bangunan_data
-from app.service.service_directloss import recalc_building_directloss_and_aal  # << import baru
+from app.repository.repo_hazard_assignment import refresh_assignments
+from app.repository.repo_locks import advisory_lock, RECOMPUTE_LOCK
+from app.service.service_directloss import (
+    recalc_building_directloss_and_aal, recalc_buildings_directloss_and_aal,
+    remove_buildings_directloss_and_aal
+)
+from app.service.service_aal import invalidate_aal_cache
 
 class BangunanService:
     @staticmethod
@@ -30,58 +34,22 @@ class BangunanService:
 
     @staticmethod
     def delete_bangunan(bangunan_id, prov):
-        kode_bgn = (
-                bangunan_id.split('_')[0].lower()
-        )
-        old = db.session.query(HasilProsesDirectLoss).filter_by(id_bangunan=bangunan_id).one_or_none()
-        dl_cols = [
-            "direct_loss_gempa_500",
-            "direct_loss_gempa_250",
-            "direct_loss_gempa_100",
-            "direct_loss_banjir_100",
-            "direct_loss_banjir_50",
-            "direct_loss_banjir_25",
-            "direct_loss_longsor_5",
-            "direct_loss_longsor_2",
-            "direct_loss_gunungberapi_250",
-            "direct_loss_gunungberapi_100",
-            "direct_loss_gunungberapi_50",
-        ]
-
-        # 3) Build old_vals as a dict of { column_name: value }
-        if old:
-            old_vals = { col: getattr(old, col) or 0.0 for col in dl_cols }
-        else:
-            # if there's no existing record, default everything to 0
-            old_vals = { col: 0.0 for col in dl_cols }
-        if old:
-            db.session.delete(old)
-            db.session.commit()
-        BangunanRepository.delete(bangunan_id)
-        periods = {
-        "gempa_500":0.02,"gempa_250":0.04,"gempa_100":0.10,
-        "banjir_100":0.05,"banjir_50":0.10,"banjir_25":0.20,
-        "gunungberapi_250":0.01,"gunungberapi_100":0.03,"gunungberapi_50":0.05,
-        "longsor_5":0.02,"longsor_2":0.04
-        }
-
-        aal_row = db.session.query(HasilAALProvinsi)\
-                    .filter_by(provinsi=prov).one_or_none()
-        if not aal_row:
-            raise RuntimeError(f"AALProvinsi untuk '{prov}' tidak ditemukan")
-
-        for key,p in periods.items():
-            dis,sc = key.split("_")
-            dlc = f"direct_loss_{dis}_{sc}"
-            delta  = - old_vals.get(dlc,0)
-            delta_aal = float(delta * (-math.log(1-p)))
-            col_tax = f"aal_{dis}_{sc}_{kode_bgn}"
-            col_tot = f"aal_{dis}_{sc}_total"
-            setattr(aal_row,col_tax, float(getattr(aal_row,col_tax,0)+delta_aal))
-            setattr(aal_row,col_tot, float(getattr(aal_row,col_tot,0)+delta_aal))
-        db.session.commit()
-        return {"deleted": "The Bangunan HAs deleted"}
-
+        """
+        Hapus bangunan beserta direct loss-nya; kontribusinya di
+        hasil_aal_provinsi dikurangi dengan bobot AAL yang sama seperti
+        process_join (hazard registry). Provinsi diambil dari data bangunan;
+        'prov' dari route dipertahankan demi kompatibilitas URL.
+        Ditolak (LockBusy) selama full recompute berjalan.
+        """
+        with advisory_lock(RECOMPUTE_LOCK, shared=True):
+            try:
+                remove_buildings_directloss_and_aal([bangunan_id], db.session.connection())
+                ok = BangunanRepository.delete(bangunan_id)
+            except Exception:
+                db.session.rollback()
+                raise
+        invalidate_aal_cache()
+        return ok
 
     @staticmethod
     def generate_unique_id(taxonomy: str) -> str:
@@ -116,7 +84,7 @@ class BangunanService:
         """
         text = file_storage.stream.read().decode("utf-8")
         reader = csv.DictReader(io.StringIO(text))
-        created = 0
+        created_ids = []
 
         for row in reader:
             # trim all inputs
@@ -146,10 +114,12 @@ class BangunanService:
             }
 
             # insert record (geom akan di-generate di Postgres)
-            BangunanRepository.create(data)
-            created += 1
+            BangunanRepository.create(data, refresh_assignment=False)
+            created_ids.append(data["id_bangunan"])
 
-        return {"created": created}
+        # penugasan bencana untuk semua bangunan baru sekaligus
+        refresh_assignments(created_ids)
+        return {"created": len(created_ids)}
 
     # ====================================================================
     # Metode baru: recalc Direct Loss & AAL untuk satu bangunan spesifik
@@ -165,3 +135,8 @@ class BangunanService:
             raise ValueError(f"Bangunan '{bangunan_id}' tidak ditemukan")
         # panggil service_directloss yang melakukan perhitungan ulang
         return recalc_building_directloss_and_aal(bangunan_id)
+
+    @staticmethod
+    def recalc_buildings_directloss_and_aal(bangunan_ids):
+        """Recalc Direct Loss & AAL untuk banyak bangunan dalam satu batch."""
+        return recalc_buildings_directloss_and_aal(bangunan_ids)
@@ -1,4 +1,11 @@
+import logging
+from app.extensions import db
 from app.repository.repo_crud_hsbgn import HSBGNRepository
+from app.service.service_directloss import propagate_hsbgn_changes, process_subset
+from app.service.service_aal import invalidate_aal_cache
+from app.repository.repo_locks import advisory_lock, RECOMPUTE_LOCK
+
+logger = logging.getLogger(__name__)
 
 class HSBGNService:
     @staticmethod
@@ -24,9 +31,75 @@ class HSBGNService:
 
     @staticmethod
     def update_hsbgn(hsbgn_id, data):
-        """Memperbarui HSBGN"""
-        hsbgn = HSBGNRepository.update(hsbgn_id, data)
-        return hsbgn.to_dict() if hsbgn else None
+        """Memperbarui HSBGN (hasil direct loss & AAL ikut diperbarui)"""
+        result = HSBGNService.bulk_update_hsbgn([{**data, "id_kota": hsbgn_id}])
+        return result["updated"][0] if result["updated"] else None
+
+    @staticmethod
+    def bulk_update_hsbgn(items):
+        """
+        Perbarui banyak HSBGN sekaligus. items: [{"id_kota": .., "hsbgn": .., ...}].
+        Dalam satu transaksi: tulis tabel kota lalu skalakan direct loss & AAL
+        tersimpan dengan faktor baru/lama (propagate_hsbgn_changes). Kota yang
+        nilai lamanya 0 (atau namanya berganti) dihitung ulang lewat
+        process_subset setelah commit; kegagalannya tidak membatalkan update
+        HSBGN yang sudah tersimpan, tetapi dilaporkan di 'recompute_error'
+        (kota → pesan). Seluruhnya memegang lock RECOMPUTE_LOCK (shared):
+        selama full recompute berjalan langsung LockBusy sebelum ada yang ditulis.
+        """
+        updated, not_found, changes, recompute = [], [], {}, []
+        with advisory_lock(RECOMPUTE_LOCK, shared=True):
+            try:
+                for item in items:
+                    item = dict(item)
+                    hsbgn_id = item.pop("id_kota", None)
+                    before = HSBGNRepository.get_by_id(hsbgn_id) if hsbgn_id is not None else None
+                    if not before:
+                        not_found.append(hsbgn_id)
+                        continue
+                    old_kota, old_val = before.kota, float(before.hsbgn or 0)
+                    hsbgn = HSBGNRepository.update(hsbgn_id, item, commit=False)
+                    new_val = float(hsbgn.hsbgn or 0)
+                    updated.append(hsbgn.to_dict())
+
+                    if hsbgn.kota != old_kota:
+                        recompute.append(old_kota)
+                        recompute.append(hsbgn.kota)
+                    elif new_val != old_val:
+                        if old_val == 0:
+                            recompute.append(old_kota)
+                        else:
+                            # kota sama muncul dua kali: pakai nilai lama pertama
+                            prev = changes.get(old_kota)
+                            changes[old_kota] = (old_kota, prev[1] if prev else old_val, new_val)
+
+                changes = [c for c in changes.values() if c[0] not in recompute]
+                n_bangunan = propagate_hsbgn_changes(changes, db.session.connection())
+                db.session.commit()
+                invalidate_aal_cache()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"❌ Gagal update HSBGN: {e}")
+                raise
+
+            recomputed, recompute_error = [], {}
+            for kota in dict.fromkeys(recompute):
+                try:
+                    process_subset(kota=kota)
+                    recomputed.append(kota)
+                except ValueError as ve:
+                    logger.info(f"ℹ️ Lewati hitung ulang kota {kota}: {ve}")
+                except Exception as e:
+                    logger.error(f"❌ Hitung ulang kota {kota} gagal: {e}")
+                    recompute_error[kota] = str(e)
+
+        return {
+            "updated": updated,
+            "not_found": not_found,
+            "scaled_bangunan": n_bangunan,
+            "recomputed_kota": recomputed,
+            "recompute_error": recompute_error or None,
+        }
 
     @staticmethod
     def delete_hsbgn(hsbgn_id):
@@ -0,0 +1,137 @@
+# app/service/service_curve_cache.py
+"""
+Cache kurva referensi (referensi_dmgratio_*) bersama untuk semua request.
+
+Versi tiap bencana = fingerprint isi tabel (repo_visualisasi_kurva.
+reference_fingerprints), dicek ulang paling sering tiap Config.CURVE_CACHE_TTL
+detik. Selama fingerprint sama, kurva hasil parse get_reference_curves_*,
+kurva yang sudah di-fit (FragilityCurve) dan data /api/disaster-curves
+dipakai ulang; begitu baris referensi berubah, entri bencana itu dimuat ulang.
+"""
+
+import time
+import hashlib
+import logging
+import threading
+
+from app.config import Config
+from app.repository.repo_visualisasi_kurva import reference_fingerprints
+from app.repository.repo_kurva_gempa import get_reference_curves_gempa
+from app.repository.repo_kurva_banjir import get_reference_curves_banjir
+from app.repository.repo_kurva_longsor import get_reference_curves_longsor
+from app.repository.repo_kurva_gunungberapi import get_reference_curves_gunungberapi
+from app.service.service_fragility import fit_curves, compile_luts
+from app.service.service_visualisasi_kurva import get_all_disaster_curves
+
+logger = logging.getLogger(__name__)
+
+CURVE_LOADERS = {
+    "gempa":        get_reference_curves_gempa,
+    "banjir":       get_reference_curves_banjir,
+    "longsor":      get_reference_curves_longsor,
+    "gunungberapi": get_reference_curves_gunungberapi,
+}
+
+_LOCK = threading.RLock()
+_FINGERPRINTS = {"checked": None, "values": None}
+# {bencana: {"fingerprint", "curves", "fitted": {mode: {tipe: FragilityCurve}}}}
+_ENTRIES = {}
+# (versi gabungan, data /api/disaster-curves)
+_VISUAL = {"version": None, "data": None}
+
+def _copy(curves):
+    return {t: {"x": list(v["x"]), "y": list(v["y"])} for t, v in curves.items()}
+
+def fingerprints(force=False):
+    """Fingerprint per bencana (dicek ulang setelah CURVE_CACHE_TTL detik)."""
+    now = time.monotonic()
+    with _LOCK:
+        checked, values = _FINGERPRINTS["checked"], _FINGERPRINTS["values"]
+        if not force and values is not None and now - checked < Config.CURVE_CACHE_TTL:
+            return values
+    values = reference_fingerprints()
+    with _LOCK:
+        _FINGERPRINTS.update(checked=now, values=values)
+    return values
+
+def curves_version():
+    """Versi gabungan semua tabel referensi (dipakai sebagai ETag)."""
+    fps = fingerprints()
+    joined = "|".join(f"{k}:{fps[k]}" for k in sorted(fps))
+    return hashlib.sha1(joined.encode("utf-8")).hexdigest()
+
+def _entry(hazard):
+    if hazard not in CURVE_LOADERS:
+        raise ValueError(f"Jenis bencana tidak dikenal: {hazard}")
+    try:
+        fp = fingerprints().get(hazard)
+    except Exception as e:
+        # fingerprint gagal (misal DB bermasalah) → jangan pakai / isi cache
+        logger.warning(f"⚠️ Fingerprint kurva {hazard} gagal, muat langsung: {e}")
+        return {"fingerprint": None, "curves": CURVE_LOADERS[hazard](), "fitted": {}}
+
+    with _LOCK:
+        entry = _ENTRIES.get(hazard)
+        if entry and entry["fingerprint"] == fp:
+            return entry
+    curves = CURVE_LOADERS[hazard]()
+    entry = {"fingerprint": fp, "curves": curves, "fitted": {}}
+    if any(v["x"] for v in curves.values()):
+        # loader mengembalikan {} / kosong saat gagal → tidak di-cache
+        with _LOCK:
+            _ENTRIES[hazard] = entry
+        logger.info(f"🗂️ Cache kurva {hazard} dimuat (versi {fp})")
+    return entry
+
+def get_reference_curves(hazard):
+    """Salinan {tipe: {"x": [...], "y": [...]}} seperti get_reference_curves_<bencana>()."""
+    return _copy(_entry(hazard)["curves"])
+
+def get_fitted_curves(hazard, mode="cubic", observed=None):
+    """
+    {tipe: FragilityCurve} yang sudah di-fit (sekali per versi kurva);
+    tipe tanpa titik dilewati. observed → salinan ber-LUT di rentangnya
+    (kurva di cache tidak pernah diubah, aman untuk request paralel).
+    """
+    entry = _entry(hazard)
+    with _LOCK:
+        fitted = entry["fitted"].get(mode)
+    if fitted is None:
+        fitted = fit_curves(
+            {t: v for t, v in entry["curves"].items() if v["x"]}, mode=mode
+        )
+        with _LOCK:
+            entry["fitted"][mode] = fitted
+    if observed is not None:
+        fitted, _ = compile_luts(fitted, observed)
+    return dict(fitted)
+
+def get_disaster_curves():
+    """(versi, data /api/disaster-curves); data dibangun ulang hanya jika versi berubah."""
+    version = curves_version()
+    with _LOCK:
+        if _VISUAL["version"] == version:
+            return version, _VISUAL["data"]
+    data = get_all_disaster_curves()
+    with _LOCK:
+        _VISUAL.update(version=version, data=data)
+    return version, data
+
+def invalidate(hazard=None):
+    """Buang cache (satu bencana / semua); fingerprint dicek ulang di akses berikutnya."""
+    with _LOCK:
+        if hazard is None:
+            _ENTRIES.clear()
+        else:
+            _ENTRIES.pop(hazard, None)
+        _FINGERPRINTS.update(checked=None, values=None)
+        _VISUAL.update(version=None, data=None)
+
+def warm_curve_cache():
+    """Muat semua kurva saat start (menggantikan preload REFERENCE_CURVES_*)."""
+    for hazard in CURVE_LOADERS:
+        try:
+            n = len(_entry(hazard)["curves"])
+            logger.info(f"✅ {hazard} curves loaded ({n} tipe)")
+        except Exception as e:
+            logger.error(f"❌ Failed to load {hazard} curves: {e}")
@@ -2,15 +2,30 @@
 
 import os
 import sys
-import math
+import threading
 import numpy as np
 import pandas as pd
+import time
 import logging
+import multiprocessing as mp
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 
 from sqlalchemy import text 
 from app.extensions import db
-from app.models.models_database import HasilProsesDirectLoss, HasilAALProvinsi
-from app.repository.repo_directloss import get_bangunan_data, get_all_disaster_data, get_db_connection
+from app.models.models_database import HasilProsesDirectLoss, HasilAALProvinsi, HasilAALBangunan
+from app.config import Config
+from app.hazard_registry import HAZARDS, direct_loss_columns
+from app.service.service_aal import rp_weights, building_aal, invalidate_aal_cache
+from app.repository.repo_directloss import (
+    get_bangunan_data, get_disaster_data, get_db_connection, get_directloss_frame,
+    iter_directloss_input, scope_filter
+)
+from app.repository.repo_hazard_assignment import ensure_assignments, refresh_assignments
+from app.repository.repo_bulk_copy import copy_dataframe, upsert_dataframe
+from app.repository.repo_locks import advisory_lock, RECOMPUTE_LOCK
+from app.repository.repo_shadow_table import (
+    create_shadow, drop_shadow, publish_shadows, rollback_generation, list_generations
+)
 
 # UTF-8 for console/logging
 sys.stdout.reconfigure(encoding='utf-8')
@@ -29,22 +44,136 @@ sh = logging.StreamHandler(sys.stdout)
 sh.setFormatter(formatter)
 logger.addHandler(sh)
 
-def process_all_disasters():
-    logger.debug("=== START process_all_disasters ===")
+def dump_csv_async(df, path, **kwargs):
+    """
+    Tulis CSV debug di thread terpisah (side output, tidak menahan pipeline).
+    Hanya aktif jika Config.DEBUG_CSV_DUMP. Mengembalikan path atau None.
+    """
+    if not Config.DEBUG_CSV_DUMP:
+        return None
+
+    def _write():
+        try:
+            df.to_csv(path, index=False, sep=';', **kwargs)
+            logger.debug(f"📄 CSV debug: {path}")
+        except Exception as e:
+            logger.error(f"❌ Gagal tulis CSV debug {path}: {e}")
+
+    threading.Thread(target=_write, name="csv-dump", daemon=True).start()
+    return path
+
+def noop_progress(stage, hazard=None, percent=None):
+    """Callback progress default untuk pipeline yang dijalankan tanpa job."""
+
+# Waktu (detik) per bencana dari run process_all_disasters terakhir
+LAST_RUN_TIMINGS = {}
+
+def _fill0(arr):
+    return np.where(np.isnan(arr), 0.0, arr)
+
+def compute_hazard_losses(hazard, luas, hsbgn, floors, values):
+    """
+    Hitung direct loss satu bencana (fungsi murni numpy, aman dipanggil dari thread).
+    hazard: Hazard dari registry (menentukan kolom damage ratio).
+    values: {nama kolom nilai_y_*: array} sudah sejajar dengan luas/hsbgn.
+    Mengembalikan {direct_loss_<bencana>_<skala>: array}.
+    """
+    return {
+        hazard.direct_loss_col(s): _fill0(luas * hsbgn * hazard.damage_ratio(values, floors, s))
+        for s in hazard.scales
+    }
 
-    # Clear old
+def loss_executor(workers):
+    """
+    Process pool untuk hitung CPU-berat (simulasi); None (serial) jika dimatikan.
+    Konteks 'forkserver': proses Flask / worker job sudah multithread,
+    fork langsung dari sana berisiko deadlock.
+    """
+    if Config.DIRECTLOSS_LOSS_EXECUTOR != "process":
+        return None
     try:
-        db.session.query(HasilProsesDirectLoss).delete()
-        db.session.query(HasilAALProvinsi).delete()
-        db.session.commit()
-        logger.debug("✅ Cleared DirectLoss & AAL")
-    except Exception as e:
-        db.session.rollback()
-        logger.error(f"❌ Clearing old failed: {e}")
-
-    # 1) Building data (with integer jumlah_lantai)
-    bld = get_bangunan_data()
-    logger.debug(f"📥 Buildings: {len(bld)} rows")
+        return ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("forkserver"))
+    except (OSError, ValueError, AssertionError) as e:
+        # misal di dalam worker daemon (Celery prefork) → hitung serial
+        logger.warning(f"⚠️ Process pool tidak tersedia, hitung loss serial: {e}")
+        return None
+
+def run_hazards_parallel(ids, luas, hsbgn, floors, hazards=None, progress=None,
+                         where="", params=None):
+    """
+    Fan-out per bencana di ThreadPoolExecutor: tiap thread mengambil data
+    satu bencana (get_disaster_data, satu koneksi dari pool engine bersama)
+    lalu langsung menghitung direct loss-nya. Operasi numpy melepas GIL,
+    jadi hitung loss berjalan paralel dengan fetch bencana lain tanpa
+    menyalin array ke proses lain.
+    where/params: filter bangunan yang sama dengan 'ids' (lihat scope_filter).
+    Mengembalikan ({kolom direct_loss: array}, {bencana: timing}).
+    """
+    progress = progress or noop_progress
+    names = list(HAZARDS) if hazards is None else list(hazards)
+    luas  = np.asarray(luas, dtype=float)
+    hsbgn = np.asarray(hsbgn, dtype=float)
+    engine = get_db_connection()
+    workers = max(1, min(Config.DIRECTLOSS_WORKERS, len(names)))
+    timings = {name: {} for name in names}
+    n_cols = sum(len(HAZARDS[n].scales) for n in names)
+
+    def _fetch_and_compute(name):
+        t0 = time.perf_counter()
+        df = get_disaster_data(name, engine, where, params).reindex(ids)   # selaraskan dengan bld
+        values = {c: df[c].to_numpy(dtype=float) for c in df.columns}
+        t1 = time.perf_counter()
+        out = compute_hazard_losses(HAZARDS[name], luas, hsbgn, floors, values)
+        timings[name]["fetch_seconds"] = round(t1 - t0, 4)
+        timings[name]["loss_seconds"] = round(time.perf_counter() - t1, 4)
+        return name, out
+
+    losses = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dl-hazard") as pool:
+        futures = [pool.submit(_fetch_and_compute, n) for n in names]
+        try:
+            for fut in as_completed(futures):
+                name, out = fut.result()
+                losses.update(out)
+                progress("direct_loss", hazard=name, percent=30 + 40 * len(losses) // n_cols)
+        except Exception:
+            for fut in futures:
+                fut.cancel()
+            raise
+
+    for name, t in timings.items():
+        t["total_seconds"] = round(t.get("fetch_seconds", 0) + t.get("loss_seconds", 0), 4)
+        logger.info(f"⏱️ {name}: fetch {t.get('fetch_seconds')}s, loss {t.get('loss_seconds')}s")
+    return losses, timings
+
+def assign_losses(bld, losses):
+    """Pasang kolom direct_loss_* ke bld dengan urutan HAZARDS; kembalikan nama kolomnya."""
+    dl_cols = direct_loss_columns()
+    for col in dl_cols:
+        bld[col] = losses[col]
+    return dl_cols
+
+def _kode_series(bld):
+    """kode_bangunan huruf kecil (fallback: prefiks id_bangunan), sama seperti kolom AAL."""
+    return (
+        bld['kode_bangunan'].fillna(bld['id_bangunan'].astype(str).str.split('_').str[0])
+        .astype(str).str.lower()
+    )
+
+def building_aal_frame(bld):
+    """Baris hasil_aal_bangunan (AAL per bencana + total) dari frame bangunan + direct_loss_*."""
+    out = pd.DataFrame({
+        "id_bangunan":   bld['id_bangunan'].to_numpy(),
+        "provinsi":      bld['provinsi'].to_numpy(),
+        "kota":          bld['kota'].to_numpy(),
+        "kode_bangunan": _kode_series(bld).to_numpy(),
+    })
+    for col, values in building_aal(bld).items():
+        out[col] = values
+    return out
+
+def prepare_buildings(bld):
+    """Rapikan kolom bangunan & hitung adjusted_hsbgn (koefisien jumlah lantai)."""
     if 'kode_bangunan' not in bld.columns or bld['kode_bangunan'].isna().all():
         bld['kode_bangunan'] = (
             bld['id_bangunan'].astype(str)
@@ -64,112 +193,200 @@ def process_all_disasters():
     bld['hsbgn_coeff']     = floors_clipped.map(coeff_map).fillna(1.0)
     bld['adjusted_hsbgn']  = bld['hsbgn'] * bld['hsbgn_coeff']
 
+    return bld
+
+@advisory_lock(RECOMPUTE_LOCK)
+def process_all_disasters(progress=None, streaming=None):
+    """
+    Pipeline direct loss + AAL nasional.
+    progress: callback opsional progress(stage, hazard=None, percent=None),
+              dipakai job runner (boleh raise untuk membatalkan proses).
+    streaming: proses per chunk dengan memori konstan (default
+               Config.DIRECTLOSS_STREAMING), lihat process_all_disasters_streaming.
+    Memegang lock eksklusif RECOMPUTE_LOCK (LockBusy jika sedang dipakai).
+    """
+    progress = progress or noop_progress
+    streaming = Config.DIRECTLOSS_STREAMING if streaming is None else streaming
+    if streaming:
+        return process_all_disasters_streaming(progress)
+    logger.debug("=== START process_all_disasters ===")
+
+    # Hasil lama tetap terbaca selama proses: semua ditulis ke tabel bayangan
+    # lalu diterbitkan bersamaan di akhir (lihat repo_shadow_table)
+    dl_table  = HasilProsesDirectLoss.__tablename__
+    aal_table = HasilAALProvinsi.__tablename__
+    ab_table  = HasilAALBangunan.__tablename__
+
+    # 1) Building data (with integer jumlah_lantai)
+    progress("buildings", percent=0)
+    bld = get_bangunan_data()
+    logger.debug(f"📥 Buildings: {len(bld)} rows")
+    bld = prepare_buildings(bld)
+
     luas    = bld['luas'].to_numpy()
     hsbgn   = bld['adjusted_hsbgn'].to_numpy()
 
-    # 2) Hazard data (reindexed to bld.index!)
-    disaster_data = get_all_disaster_data()
-    for name, df in disaster_data.items():
-        # fill na, then reindex so length==len(bld)
-        df = (
-            df
-            .set_index('id_bangunan')                  # pakai id_bangunan sebagai index
-            .reindex(bld['id_bangunan'], fill_value=0) # selaraskan berdasarkan id_bangunan
-            .reset_index(drop=True)                    # kembalikan index default agar 1-1 dengan bld
-        )
-        disaster_data[name] = df
-        logger.debug(f"📥 {name}: {len(df)} rows (aligned to {len(bld)})")
-
-    # 3) Direct loss calc
-    prefix_map = {"gempa":"mmi","banjir":"depth","longsor":"mflux","gunungberapi":"kpa"}
-    scales_map = {
-      "gempa": ["500","250","100"],
-      "banjir": ["100","50","25"],
-      "longsor": ["5","2"],
-      "gunungberapi": ["250","100","50"]
-    }
-
-    for name, df_raw in disaster_data.items():
-        pre    = prefix_map[name]
-        scales = scales_map[name]
-        if name == "banjir":
-            floors = np.clip(bld['jumlah_lantai'].to_numpy(), 1, 2)
-            for s in scales:
-                y1 = df_raw[f"nilai_y_1_{pre}{s}"].to_numpy()
-                y2 = df_raw[f"nilai_y_2_{pre}{s}"].to_numpy()
-                v = np.where(floors == 1, y1, y2)
-                col = f"direct_loss_{name}_{s}"
-                bld[col] = luas * hsbgn * v
-                bld[col] = bld[col].fillna(0)
-                logger.debug(f"{col} sample: {bld[col].head(3).tolist()}")
-        else:
-            for s in scales:
-                # Mengambil kolom berdasarkan return period dan skala untuk gempa, longsor, dan gunung berapi
-                damage_ratio_col = f"nilai_y_cr_{pre}{s}"  # Misalnya untuk gempa pada skala tertentu
-                if name == "longsor":
-                    damage_ratio_col = f"nilai_y_mur_{pre}{s}"  # Sesuaikan dengan longsor
-                elif name == "gunungberapi":
-                    damage_ratio_col = f"nilai_y_lightwood_{pre}{s}"  # Sesuaikan dengan gunung berapi
-
-                damage_ratio = df_raw[damage_ratio_col].to_numpy()
-                col = f"direct_loss_{name}_{s}"
-                bld[col] = luas * hsbgn * damage_ratio
-                bld[col] = bld[col].fillna(0)
-                logger.debug(f"{col} sample: {bld[col].head(3).tolist()}")
+    # 2+3) Hazard data & direct loss, paralel per bencana di thread pool
+    progress("hazard_join", percent=10)
+    ensure_assignments()
+    floors = bld['jumlah_lantai'].to_numpy()
+    losses, timings = run_hazards_parallel(
+        bld['id_bangunan'], luas, hsbgn, floors, progress=progress
+    )
+    for col in assign_losses(bld, losses):
+        logger.debug(f"{col} sample: {bld[col].head(3).tolist()}")
+    LAST_RUN_TIMINGS.clear()
+    LAST_RUN_TIMINGS.update(timings)
 
     # 4) Save Direct Loss
     dl_cols = [c for c in bld.columns if c.startswith("direct_loss_")]
 
     bld = bld.drop_duplicates(subset='id_bangunan', keep='last')    
 
-    mappings = [
-        {"id_bangunan": row['id_bangunan'], **{c: row[c] for c in dl_cols}}
-        for _, row in bld.iterrows()
-    ]
+    progress("save_directloss", percent=70)
     try:
-        db.session.bulk_insert_mappings(HasilProsesDirectLoss, mappings)
-        db.session.commit()
-        logger.info("✅ Direct Loss saved")
+        copy_dataframe(
+            bld, HasilProsesDirectLoss,
+            columns=["id_bangunan"] + dl_cols,
+            target=create_shadow(dl_table)
+        )
+        logger.info("✅ Direct Loss saved (shadow)")
     except Exception as e:
-        db.session.rollback()
         logger.error(f"❌ Saving Direct Loss failed: {e}")
+        drop_shadow(dl_table)
         raise
 
-    # 5) Dump CSV & 6) AAL
-    csv_path = os.path.join(DEBUG_DIR, "directloss_all.csv")
-    cols_to_dump = ["provinsi", "kode_bangunan"] + dl_cols
-    bld.to_csv(csv_path, index=False, sep=';', columns=cols_to_dump)
-    logger.debug(f"📄 CSV DirectLoss subset for AAL: {csv_path}")
+    # 5) AAL langsung dari frame di memori (CSV debug opsional & asinkron)
+    dl_frame = bld[["provinsi", "kode_bangunan"] + dl_cols]
+    csv_path = dump_csv_async(dl_frame, os.path.join(DEBUG_DIR, "directloss_all.csv"))
 
-    calculate_aal()
+    try:
+        progress("aal", percent=85)
+        calculate_aal(dl_frame, target=create_shadow(aal_table))
+        copy_dataframe(building_aal_frame(bld), HasilAALBangunan, target=create_shadow(ab_table))
+        progress("publish", percent=95)
+        publish_shadows([dl_table, aal_table, ab_table])
+        invalidate_aal_cache()
+    except Exception:
+        drop_shadow(dl_table)
+        drop_shadow(aal_table)
+        drop_shadow(ab_table)
+        raise
+
+    progress("done", percent=100)
     logger.debug("=== END process_all_disasters ===")
     return csv_path
 
-def calculate_aal():
-    path = os.path.join(DEBUG_DIR, "directloss_all.csv")
-    if not os.path.exists(path):
-        logger.error("❌ directloss_all.csv not found")
-        return
+def _loss_chunk(chunk):
+    """Direct loss untuk satu chunk hasil iter_directloss_input (semua bencana)."""
+    chunk = prepare_buildings(chunk)
+    luas   = chunk['luas'].to_numpy(dtype=float)
+    hsbgn  = chunk['adjusted_hsbgn'].to_numpy(dtype=float)
+    floors = chunk['jumlah_lantai'].to_numpy()
+    values = {c: chunk[c].to_numpy(dtype=float) for c in chunk.columns if c.startswith("nilai_y_")}
+    dl_cols = []
+    for hazard in HAZARDS.values():
+        for col, arr in compute_hazard_losses(hazard, luas, hsbgn, floors, values).items():
+            chunk[col] = arr
+            dl_cols.append(col)
+    return chunk, dl_cols
+
+@advisory_lock(RECOMPUTE_LOCK)
+def process_all_disasters_streaming(progress=None):
+    """
+    Mode streaming process_all_disasters untuk inventaris besar:
+     - satu join bangunan + vulnerability dibaca per DIRECTLOSS_CHUNK_SIZE
+       baris lewat server-side cursor (iter_directloss_input)
+     - direct loss dihitung per chunk lalu langsung di-COPY ke tabel bayangan
+     - AAL cukup dari jumlah parsial per (provinsi, kode_bangunan) yang
+       diakumulasi antar chunk
+    Memori puncak sebanding ukuran chunk, bukan jumlah bangunan.
+    """
+    progress = progress or noop_progress
+    logger.debug("=== START process_all_disasters (streaming) ===")
+    LAST_RUN_TIMINGS.clear()
+    dl_table  = HasilProsesDirectLoss.__tablename__
+    aal_table = HasilAALProvinsi.__tablename__
+    ab_table  = HasilAALBangunan.__tablename__
+
+    progress("hazard_join", percent=0)
+    ensure_assignments()
+    dl_shadow = create_shadow(dl_table)
+    ab_shadow = create_shadow(ab_table)
+    partial = None
+    carry = None
+    n_rows = 0
+
+    def _flush(part):
+        nonlocal partial, n_rows
+        part = part.drop_duplicates(subset='id_bangunan', keep='last').copy()
+        part, dl_cols = _loss_chunk(part)
+        copy_dataframe(part, HasilProsesDirectLoss,
+                       columns=["id_bangunan"] + dl_cols, target=dl_shadow)
+        copy_dataframe(building_aal_frame(part), HasilAALBangunan, target=ab_shadow)
+        sums = part.groupby(["provinsi", "kode_bangunan"])[dl_cols].sum()
+        partial = sums if partial is None else partial.add(sums, fill_value=0)
+        n_rows += len(part)
+
+    try:
+        for i, chunk in enumerate(iter_directloss_input(Config.DIRECTLOSS_CHUNK_SIZE)):
+            # id_bangunan duplikat bisa terpotong batas chunk: tahan id terakhir
+            # ke chunk berikutnya supaya drop_duplicates tetap berlaku
+            if carry is not None:
+                chunk = pd.concat([carry, chunk], ignore_index=True)
+            last = chunk['id_bangunan'].iloc[-1]
+            tail = chunk['id_bangunan'] == last
+            carry = chunk[tail]
+            if (~tail).any():
+                _flush(chunk[~tail])
+            progress("direct_loss", percent=min(80, 5 + i))
+            logger.debug(f"📦 chunk {i}: total {n_rows} bangunan")
+        if carry is not None and len(carry):
+            _flush(carry)
+        logger.info(f"✅ Direct Loss saved (shadow, streaming): {n_rows} bangunan")
+
+        progress("aal", percent=85)
+        if partial is None:
+            raise ValueError("Tidak ada data bangunan untuk diproses")
+        calculate_aal(partial.reset_index(), target=create_shadow(aal_table))
+        progress("publish", percent=95)
+        publish_shadows([dl_table, aal_table, ab_table])
+        invalidate_aal_cache()
+    except Exception:
+        drop_shadow(dl_table)
+        drop_shadow(aal_table)
+        drop_shadow(ab_table)
+        raise
+
+    progress("done", percent=100)
+    logger.debug("=== END process_all_disasters (streaming) ===")
+    return None
 
-    df = pd.read_csv(path, delimiter=';').fillna(0)
+AAL_TOTAL_ROW = "Total Keseluruhan"
 
-    periods = {
-      "gempa_500":0.002, "gempa_250":0.004, "gempa_100":0.010,
-      "banjir_100":0.01,"banjir_50":0.02,"banjir_25":0.04,
-      "gunungberapi_250":0.004,"gunungberapi_100":0.01,"gunungberapi_50":0.02,
-      "longsor_5":0.2,"longsor_2":0.5
-    }
+# Bobot AAL per <bencana>_<periode ulang> (kurva EP dari hazard registry,
+# metode Config.AAL_METHOD); AAL = Σ direct_loss × bobot
+AAL_WEIGHTS = rp_weights()
+
+def build_aal_frame(df):
+    """
+    Susun baris hasil_aal_provinsi (per provinsi + baris total) dari frame
+    direct loss (provinsi, kode_bangunan, direct_loss_*).
+    """
+    df = df.fillna(0)
+
+    weights = AAL_WEIGHTS
 
     dl_cols = [c for c in df.columns if c.startswith("direct_loss_")]
     grp = df.groupby(["provinsi", "kode_bangunan"]).sum()[dl_cols]
     logger.debug(f"grp (provinsi,kode_bangunan) shape: {grp.shape}")
 
     aal = pd.DataFrame(index=grp.index)
-    for key, p in periods.items():
+    for key, w in weights.items():
         dis, sc = key.split("_")
         dlc = f"direct_loss_{dis}_{sc}"
         aalc = f"aal_{dis}_{sc}"
-        aal[aalc] = grp[dlc] * p
+        aal[aalc] = grp[dlc] * w
     aal.reset_index(inplace=True)
     aal = aal.fillna(0)
     logger.debug(f"AAL before pivot: {aal.shape}")
@@ -180,7 +397,7 @@ def calculate_aal():
     pivot = pivot.fillna(0)
     logger.debug(f"pivot shape: {pivot.shape}")
 
-    for key in periods.keys():
+    for key in weights.keys():
         pattern = f"aal_{key}_"
         cols = [c for c in pivot.columns if c.startswith(pattern) and not c.endswith("_total")]
         pivot[f"{pattern}total"] = pivot[cols].sum(axis=1)
@@ -188,224 +405,392 @@ def calculate_aal():
     logger.debug(f"pivot with totals shape: {pivot.shape}")
 
     totals = pivot.select_dtypes(include=[np.number]).sum().to_dict()
-    totals["provinsi"] = "Total Keseluruhan"
+    totals["provinsi"] = AAL_TOTAL_ROW
     final = pd.concat([pivot, pd.DataFrame([totals])], ignore_index=True).fillna(0)
 
-    out = os.path.join(DEBUG_DIR, "AAL_per_provinsi_filtered.csv")
-    final.to_csv(out, index=False, sep=';')
-    logger.debug(f"📄 CSV AAL: {out}")
+    dump_csv_async(final, os.path.join(DEBUG_DIR, "AAL_per_provinsi_filtered.csv"))
+
+    aal_cols = [c.name for c in HasilAALProvinsi.__table__.columns]
+    return final.reindex(columns=aal_cols, fill_value=0)
+
+def calculate_aal(df=None, target=None):
+    """
+    Hitung AAL per provinsi × kode_bangunan dari direct loss.
+    df: frame (provinsi, kode_bangunan, direct_loss_*) dari pipeline;
+        jika None, diambil dari hasil_proses_directloss di database.
+    target: nama tabel tujuan (misal tabel bayangan); default tabel aktif.
+    """
+    if df is None:
+        df = get_directloss_frame()
+    final = build_aal_frame(df)
+    try:
+        copy_dataframe(final, HasilAALProvinsi, truncate=True, target=target)
+        logger.info("✅ AAL saved")
+    except Exception as e:
+        logger.error(f"❌ Saving AAL failed: {e}")
+        raise
 
+def _refresh_aal_total(conn):
+    """Hitung ulang baris total hasil_aal_provinsi dari semua baris provinsi."""
+    cols = [c.name for c in HasilAALProvinsi.__table__.columns if c.name != "provinsi"]
+    sums = ", ".join(f"COALESCE(SUM({c}), 0)" for c in cols)
+    sets = ", ".join(f"{c} = EXCLUDED.{c}" for c in cols)
+    conn.execute(text(f"""
+        INSERT INTO hasil_aal_provinsi (provinsi, {", ".join(cols)})
+        SELECT :total, {sums}
+        FROM hasil_aal_provinsi
+        WHERE provinsi <> :total
+        ON CONFLICT (provinsi) DO UPDATE SET {sets}
+    """), {"total": AAL_TOTAL_ROW})
+
+def rebuild_aal_provinces(provinces, conn):
+    """
+    Bangun ulang baris hasil_aal_provinsi untuk 'provinces' dari SEMUA direct
+    loss tersimpan bangunan provinsi tsb, lalu perbarui baris total.
+    Berjalan di koneksi/transaksi pemanggil.
+    """
+    provinces = [p for p in provinces if p is not None]
+    if not provinces:
+        return 0
+    df = get_directloss_frame(
+        "WHERE b.provinsi = ANY(:provs)", {"provs": provinces}, connection=conn
+    )
+    rows = build_aal_frame(df)
+    rows = rows[rows["provinsi"] != AAL_TOTAL_ROW]
+    conn.execute(
+        text("DELETE FROM hasil_aal_provinsi WHERE provinsi = ANY(:provs)"),
+        {"provs": provinces}
+    )
+    copy_dataframe(rows, HasilAALProvinsi, connection=conn)
+    _refresh_aal_total(conn)
+    return len(rows)
+
+@advisory_lock(RECOMPUTE_LOCK, shared=True)
+def process_subset(provinsi=None, kota=None, progress=None):
+    """
+    Hitung ulang direct loss hanya untuk bangunan di provinsi dan/atau kota
+    tertentu (logika sama dengan process_all_disasters, dibatasi WHERE),
+    upsert barisnya ke hasil_proses_directloss, lalu bangun ulang baris
+    hasil_aal_provinsi provinsi yang terdampak. Menulis tabel aktif, jadi
+    ditolak (LockBusy) selama full recompute membangun tabel bayangan.
+    """
+    if not provinsi and not kota:
+        raise ValueError("Parameter provinsi atau kota wajib diisi")
+    progress = progress or noop_progress
+    where, params = scope_filter(provinsi, kota)
+    logger.debug(f"=== START process_subset {params} ===")
+
+    progress("buildings", percent=0)
+    bld = get_bangunan_data(where, params)
+    if bld.empty:
+        raise ValueError(f"Tidak ada bangunan untuk {params}")
+    bld = prepare_buildings(bld).drop_duplicates(subset='id_bangunan', keep='last')
+
+    progress("hazard_join", percent=10)
+    ensure_assignments()
+    losses, timings = run_hazards_parallel(
+        bld['id_bangunan'], bld['luas'].to_numpy(), bld['adjusted_hsbgn'].to_numpy(),
+        bld['jumlah_lantai'].to_numpy(), progress=progress, where=where, params=params
+    )
+    dl_cols = assign_losses(bld, losses)
+    LAST_RUN_TIMINGS.clear()
+    LAST_RUN_TIMINGS.update(timings)
+
+    progress("save_directloss", percent=70)
+    provinces = bld['provinsi'].dropna().unique().tolist()
     try:
-        db.session.query(HasilAALProvinsi).delete()
-        db.session.bulk_insert_mappings(HasilAALProvinsi, final.to_dict('records'))
+        conn = db.session.connection()
+        upsert_dataframe(
+            bld, HasilProsesDirectLoss, ["id_bangunan"],
+            columns=["id_bangunan"] + dl_cols, connection=conn
+        )
+        progress("aal", percent=85)
+        upsert_dataframe(building_aal_frame(bld), HasilAALBangunan, ["id_bangunan"], connection=conn)
+        rebuild_aal_provinces(provinces, conn)
         db.session.commit()
-        logger.info("✅ AAL saved")
+        invalidate_aal_cache()
     except Exception as e:
         db.session.rollback()
-        logger.error(f"❌ Saving AAL failed: {e}")
+        logger.error(f"❌ process_subset {params} gagal: {e}")
+        raise
 
-def recalc_building_directloss_and_aal(bangunan_id: str):
-    logger.debug(f"=== START incremental recalc for {bangunan_id} ===")
+    progress("done", percent=100)
+    logger.info(f"✅ process_subset {params}: {len(bld)} bangunan, provinsi {provinces}")
+    return {"bangunan": int(len(bld)), "provinsi": provinces}
+
+def _aal_kode_list():
+    """Kode bangunan yang punya kolom di hasil_aal_provinsi (aal_<bencana>_<rp>_<kode>)."""
+    key = next(iter(AAL_WEIGHTS))
+    prefix = f"aal_{key}_"
+    return [
+        c.name[len(prefix):] for c in HasilAALProvinsi.__table__.columns
+        if c.name.startswith(prefix) and c.name != f"{prefix}total"
+    ]
 
-    # Ambil data bangunan
-    engine = get_db_connection()
-    with engine.connect() as conn:
-        b_query = text("""
-            SELECT
-              b.geom,
-              b.luas,
-              COALESCE(k.hsbgn, 0) AS hsbgn,
-              COALESCE(b.jumlah_lantai, 0) AS jumlah_lantai,
-              b.provinsi,
-              LOWER(split_part(b.id_bangunan, '_', 1)) AS kode_bangunan
-            FROM bangunan_copy b
-            LEFT JOIN kota k ON b.kota = k.kota
-            WHERE b.id_bangunan = :id
-        """)
-        b = conn.execute(b_query, {"id": bangunan_id}).mappings().first()
-        if not b:
-            raise ValueError(f"Bangunan {bangunan_id} tidak ditemukan")
-
-        geom       = b["geom"]
-        luas_val   = b["luas"]
-        hsbgn_val_raw = b["hsbgn"]
-        raw_floors    = int(b["jumlah_lantai"])
-
-        # lantai banjir 
-        floor_banjir   = int(np.clip(raw_floors, 1, 2))
-        # clip lantai antara 1–8
-        floor_hsbgn    = int(np.clip(raw_floors, 1, 8))
-
-        # peta koefisien HSBGN per lantai
-        coeff_map = {
-            1: 1.000,
-            2: 1.090,
-            3: 1.120,
-            4: 1.135,
-            5: 1.162,
-            6: 1.197,
-            7: 1.236,
-            8: 1.265,
-        }
-
-        # hitung adjusted hsbgn
-        hsbgn_val = hsbgn_val_raw * coeff_map.get(floor_hsbgn, 1.0)
-
-        prov       = b["provinsi"]
-        kode_bgn   = b["kode_bangunan"]
-
-        mapping = {
-            "gempa": {
-                "raw":      "model_intensitas_gempa",
-                "dmgr":     "dmgratio_gempa",
-                "prefix":   "mmi",
-                "scales":   ["500","250","100"],
-                "threshold": 9500,
-                "vcols":    lambda pre,s: [
-                    f"h.dmgratio_cr_{pre}{s}         AS nilai_y_cr_{pre}{s}",
-                    f"h.dmgratio_mcf_{pre}{s}        AS nilai_y_mcf_{pre}{s}",
-                    f"h.dmgratio_mur_{pre}{s}        AS nilai_y_mur_{pre}{s}",
-                    f"h.dmgratio_lightwood_{pre}{s}  AS nilai_y_lightwood_{pre}{s}",
-                ]
-            },
-            "banjir": {
-                "raw":      "model_intensitas_banjir",
-                "dmgr":     "dmgratio_banjir_copy",
-                "prefix":   "depth",
-                "scales":   ["100","50","25"],
-                "threshold": 700,
-                "vcols":    lambda pre,s: [
-                    f"h.dmgratio_1_{pre}{s} AS nilai_y_1_{pre}{s}",
-                    f"h.dmgratio_2_{pre}{s} AS nilai_y_2_{pre}{s}",
-                ]
-            },
-            "longsor": {
-                "raw":      "model_intensitas_longsor",
-                "dmgr":     "dmgratio_longsor",
-                "prefix":   "mflux",
-                "scales":   ["5","2"],
-                "threshold": 700,
-                "vcols":    lambda pre,s: [
-                    f"h.dmgratio_cr_{pre}{s}         AS nilai_y_cr_{pre}{s}",
-                    f"h.dmgratio_mcf_{pre}{s}        AS nilai_y_mcf_{pre}{s}",
-                    f"h.dmgratio_mur_{pre}{s}        AS nilai_y_mur_{pre}{s}",
-                    f"h.dmgratio_lightwood_{pre}{s}  AS nilai_y_lightwood_{pre}{s}",
-                ]
-            },
-            "gunungberapi": {
-                "raw":      "model_intensitas_gunungberapi",
-                "dmgr":     "dmgratio_gunungberapi",
-                "prefix":   "kpa",
-                "scales":   ["250","100","50"],
-                "threshold": 550,
-                "vcols":    lambda pre,s: [
-                    f"h.dmgratio_cr_{pre}{s}         AS nilai_y_cr_{pre}{s}",
-                    f"h.dmgratio_mcf_{pre}{s}        AS nilai_y_mcf_{pre}{s}",
-                    f"h.dmgratio_mur_{pre}{s}        AS nilai_y_mur_{pre}{s}",
-                    f"h.dmgratio_lightwood_{pre}{s}  AS nilai_y_lightwood_{pre}{s}",
-                ]
-            }
-        }
-
-        # 3) Hitung direct_loss per jenis & skala hanya untuk bangunan ini
-        direct_losses = {}
-        for nama, cfg in mapping.items():
-            raw_table  = cfg["raw"]
-            dmgr_table = cfg["dmgr"]
-            pre        = cfg["prefix"]
-            scales     = cfg["scales"]
-            thr        = cfg["threshold"]
-            vcols_fn   = cfg["vcols"]
-
-            # build subquery cols & outer cols
-            subq_parts = []
-            outer_cols = []
-            for s in scales:
-                for expr in vcols_fn(pre, s):
-                    subq_parts.append(expr)
-                    alias = expr.split(" AS ")[1]
-                    outer_cols.append(f"near.{alias}")
-
-            subq_sql  = ", ".join(subq_parts)
-            outer_sql = ", ".join(outer_cols)
-
-            sql = text(f"""
-                SELECT {outer_sql}
-                FROM bangunan_copy b
-                JOIN LATERAL (
-                  SELECT {subq_sql}
-                  FROM {raw_table} r
-                  JOIN {dmgr_table} h USING(id_lokasi)
-                  WHERE ST_DWithin(b.geom::geography, r.geom::geography, {thr})
-                  ORDER BY b.geom::geography <-> r.geom::geography
-                  LIMIT 1
-                ) AS near ON TRUE
-                WHERE b.id_bangunan = :id
-            """)
-
-            near = conn.execute(sql, {"id": bangunan_id}).mappings().first() or {}
-
-            for s in scales:
-                dlc = f"direct_loss_{nama}_{s}"
-                if nama == "banjir":
-                    y1 = near.get(f"nilai_y_1_{pre}{s}", 0)
-                    y2 = near.get(f"nilai_y_2_{pre}{s}", 0)
-                    v  = y1 if floor_banjir == 1 else y2
-                else:
-                    # Sesuaikan perhitungan dengan return period
-                    damage_ratio_col = f"nilai_y_cr_{pre}{s}"  # Misalnya untuk gempa pada skala tertentu
-                    if nama == "longsor":
-                        damage_ratio_col = f"nilai_y_mur_{pre}{s}"  # Sesuaikan dengan longsor
-                    elif nama == "gunungberapi":
-                        damage_ratio_col = f"nilai_y_lightwood_{pre}{s}"  # Sesuaikan dengan gunung berapi
-                    v = near.get(damage_ratio_col, 0)
-
-                if v is None or (isinstance(v, float) and math.isnan(v)):
-                    v = 0.0
-                direct_losses[dlc] = float(luas_val * hsbgn_val * v)
-
-    # 4) Simpan DirectLoss & update AAL seperti semula
-    old = db.session.query(HasilProsesDirectLoss).filter_by(id_bangunan=bangunan_id).one_or_none()
-    old_vals = {c: getattr(old, c) for c in direct_losses} if old else {c: 0 for c in direct_losses}
-
-    if old:
-        db.session.delete(old)
+@advisory_lock(RECOMPUTE_LOCK, shared=True)
+def propagate_hsbgn_changes(changes, conn):
+    """
+    Rambatkan perubahan HSBGN kota ke hasil tersimpan tanpa hitung ulang:
+    direct loss linear terhadap hsbgn, sehingga cukup diskalakan dengan
+    faktor baru/lama. SATU statement SQL untuk semua perubahan (unnest array):
+     - UPDATE hasil_proses_directloss bangunan di kota tsb: kolom × faktor
+     - UPDATE hasil_aal_bangunan bangunan tsb: kolom × faktor
+     - UPDATE hasil_aal_provinsi provinsi terdampak (+ baris total):
+       kolom per kode & total += Σ direct_loss_lama × (faktor − 1) × bobot AAL
+    changes: iterable (kota, hsbgn_lama, hsbgn_baru) dengan hsbgn_lama ≠ 0.
+    Berjalan di koneksi/transaksi pemanggil (sebaiknya memegang lock
+    RECOMPUTE_LOCK shared sampai commit). Mengembalikan jumlah bangunan.
+    """
+    changes = list(changes)
+    if not changes:
+        return 0
+    kodes = _aal_kode_list()
+    dl_cols = [f"direct_loss_{key}" for key in AAL_WEIGHTS]
+
+    set_dl = ", ".join(f"{c} = d.{c} * c.factor" for c in dl_cols)
+    ab_cols = [c.name for c in HasilAALBangunan.__table__.columns if c.name.startswith("aal_")]
+    set_ab = ", ".join(f"{c} = ab.{c} * c.factor" for c in ab_cols)
+    delta_cols, set_aal = [], []
+    for key, w in AAL_WEIGHTS.items():
+        dl = f"o.direct_loss_{key} * (o.factor - 1) * {w}"
+        for kode in kodes:
+            col = f"aal_{key}_{kode}"
+            delta_cols.append(f"SUM(CASE WHEN o.kode = '{kode}' THEN {dl} ELSE 0 END) AS {col}")
+            set_aal.append(f"{col} = COALESCE(a.{col}, 0) + x.{col}")
+        col = f"aal_{key}_total"
+        delta_cols.append(f"SUM({dl}) AS {col}")
+        set_aal.append(f"{col} = COALESCE(a.{col}, 0) + x.{col}")
+    aal_cols = [c.split(" AS ")[1] for c in delta_cols]
+    total_sums = ", ".join(f"COALESCE(SUM({c}), 0)" for c in aal_cols)
+
+    # Semua CTE membaca snapshot yang sama (sebelum UPDATE),
+    # jadi 'old' berisi nilai direct loss lama
+    sql = text(f"""
+        WITH c AS (
+            SELECT * FROM unnest(CAST(:kota AS text[]), CAST(:factor AS float8[]))
+              AS t(kota, factor)
+        ),
+        old AS (
+            SELECT d.*, b.provinsi,
+                   LOWER(COALESCE(b.kode_bangunan, split_part(b.id_bangunan, '_', 1))) AS kode,
+                   c.factor
+            FROM hasil_proses_directloss d
+            JOIN bangunan_copy b USING (id_bangunan)
+            JOIN c ON c.kota = b.kota
+        ),
+        upd_dl AS (
+            UPDATE hasil_proses_directloss d
+            SET {set_dl}
+            FROM bangunan_copy b JOIN c ON c.kota = b.kota
+            WHERE d.id_bangunan = b.id_bangunan
+            RETURNING d.id_bangunan
+        ),
+        upd_ab AS (
+            UPDATE hasil_aal_bangunan ab
+            SET {set_ab}
+            FROM bangunan_copy b JOIN c ON c.kota = b.kota
+            WHERE ab.id_bangunan = b.id_bangunan
+            RETURNING ab.id_bangunan
+        ),
+        delta AS (
+            SELECT o.provinsi, {", ".join(delta_cols)}
+            FROM old o
+            GROUP BY o.provinsi
+        ),
+        delta_all AS (
+            SELECT * FROM delta
+            UNION ALL
+            SELECT CAST(:total AS varchar), {total_sums} FROM delta
+        ),
+        upd_aal AS (
+            UPDATE hasil_aal_provinsi a
+            SET {", ".join(set_aal)}
+            FROM delta_all x
+            WHERE a.provinsi = x.provinsi
+            RETURNING a.provinsi
+        )
+        SELECT (SELECT COUNT(*) FROM upd_dl) AS n_bangunan,
+               (SELECT COUNT(*) FROM upd_ab) AS n_aal_bangunan,
+               (SELECT COUNT(*) FROM upd_aal) AS n_provinsi
+    """)
+    row = conn.execute(sql, {
+        "kota":   [str(k) for k, _, _ in changes],
+        "factor": [float(new) / float(old) for _, old, new in changes],
+        "total":  AAL_TOTAL_ROW,
+    }).mappings().first()
+    logger.info(
+        f"✅ HSBGN diskalakan untuk {len(changes)} kota: "
+        f"{row['n_bangunan']} bangunan, {row['n_provinsi']} baris AAL"
+    )
+    return int(row["n_bangunan"])
+
+def _result_tables():
+    return (HasilProsesDirectLoss.__tablename__, HasilAALProvinsi.__tablename__,
+            HasilAALBangunan.__tablename__)
+
+@advisory_lock(RECOMPUTE_LOCK)
+def rollback_results():
+    """
+    Kembalikan tabel hasil (direct loss, AAL provinsi, AAL bangunan) ke generasi sebelumnya.
+    Tabel yang belum punya generasi (misal hasil_aal_bangunan yang baru dibuat) dilewati.
+    """
+    restored = rollback_generation([t for t in _result_tables() if list_generations(t)])
+    invalidate_aal_cache()
+    return restored
+
+def get_result_generations():
+    """Generasi hasil yang tersimpan per tabel (terbaru dulu)."""
+    return {t: list_generations(t) for t in _result_tables()}
+
+def _apply_aal_deltas(delta, conn):
+    """
+    Tambahkan delta AAL per (provinsi, kode) ke hasil_aal_provinsi + baris total.
+    delta: DataFrame index (provinsi, kode) berisi kolom direct_loss_* (selisih).
+    Provinsi yang belum punya baris dibangun ulang dari direct loss tersimpan.
+    """
+    kodes = set(_aal_kode_list())
+    per_prov = {}
+    for (prov, kode), row in delta.iterrows():
+        cols = per_prov.setdefault(prov, {})
+        for key, w in AAL_WEIGHTS.items():
+            d = float(row.get(f"direct_loss_{key}", 0.0)) * w
+            if kode in kodes:
+                cols[f"aal_{key}_{kode}"] = cols.get(f"aal_{key}_{kode}", 0.0) + d
+            cols[f"aal_{key}_total"] = cols.get(f"aal_{key}_total", 0.0) + d
+
+    missing = []
+    for prov, cols in per_prov.items():
+        sets = ", ".join(f"{c} = COALESCE({c}, 0) + :{c}" for c in cols)
+        hit = conn.execute(
+            text(f"UPDATE hasil_aal_provinsi SET {sets} WHERE provinsi = :provinsi"),
+            {**cols, "provinsi": prov}
+        ).rowcount
+        if not hit:
+            missing.append(prov)
+    if missing:
+        # rebuild_aal_provinces juga menghitung ulang baris total
+        rebuild_aal_provinces(missing, conn)
+    else:
+        totals = {}
+        for cols in per_prov.values():
+            for c, v in cols.items():
+                totals[c] = totals.get(c, 0.0) + v
+        if totals:
+            sets = ", ".join(f"{c} = COALESCE({c}, 0) + :{c}" for c in totals)
+            conn.execute(
+                text(f"UPDATE hasil_aal_provinsi SET {sets} WHERE provinsi = :provinsi"),
+                {**totals, "provinsi": AAL_TOTAL_ROW}
+            )
+    return list(per_prov)
+
+@advisory_lock(RECOMPUTE_LOCK, shared=True)
+def recalc_buildings_directloss_and_aal(bangunan_ids):
+    """
+    Hitung ulang direct loss & AAL untuk sekumpulan bangunan sekaligus:
+     1) refresh hazard_assignment untuk id tsb (satu lookup set-based)
+     2) hitung loss vektor dengan fungsi yang sama seperti process_all_disasters
+     3) dalam satu transaksi: upsert baris hasil_proses_directloss (COPY +
+        ON CONFLICT) dan tambahkan delta AAL teragregasi per
+        (provinsi, kode_bangunan) ke hasil_aal_provinsi
+    Ditolak (LockBusy) selama full recompute berjalan.
+    Mengembalikan {"direct_losses": {id: {kolom: nilai}}, "not_found": [...], "provinsi": [...]}.
+    """
+    ids = list(dict.fromkeys(str(i) for i in bangunan_ids))
+    if not ids:
+        return {"direct_losses": {}, "not_found": [], "provinsi": []}
+    logger.debug(f"=== START recalc {len(ids)} bangunan ===")
+    where, params = "WHERE b.id_bangunan = ANY(:ids)", {"ids": ids}
+
+    bld = get_bangunan_data(where, params)
+    found = set(bld['id_bangunan'])
+    not_found = [i for i in ids if i not in found]
+    if bld.empty:
+        return {"direct_losses": {}, "not_found": not_found, "provinsi": []}
+
+    refresh_assignments(bld['id_bangunan'].tolist())
+    bld = prepare_buildings(bld).drop_duplicates(subset='id_bangunan', keep='last')
+    bld['kode'] = _kode_series(bld)
+    losses, _ = run_hazards_parallel(
+        bld['id_bangunan'], bld['luas'].to_numpy(), bld['adjusted_hsbgn'].to_numpy(),
+        bld['jumlah_lantai'].to_numpy(), where=where, params=params
+    )
+    dl_cols = assign_losses(bld, losses)
+    new = bld.set_index('id_bangunan')
+
+    try:
+        conn = db.session.connection()
+        old = pd.read_sql(
+            text(f"SELECT id_bangunan, {', '.join(dl_cols)} "
+                 "FROM hasil_proses_directloss WHERE id_bangunan = ANY(:ids)"),
+            conn, params=params
+        ).set_index('id_bangunan').reindex(new.index).fillna(0)
+
+        upsert_dataframe(
+            bld, HasilProsesDirectLoss, ["id_bangunan"],
+            columns=["id_bangunan"] + dl_cols, connection=conn
+        )
+        upsert_dataframe(building_aal_frame(bld), HasilAALBangunan, ["id_bangunan"], connection=conn)
+
+        delta = new[dl_cols] - old[dl_cols]
+        delta[['provinsi', 'kode']] = new[['provinsi', 'kode']]
+        delta = delta.groupby(['provinsi', 'kode'])[dl_cols].sum()
+        provinces = _apply_aal_deltas(delta, conn)
         db.session.commit()
-    new_rec = HasilProsesDirectLoss(id_bangunan=bangunan_id, **direct_losses)
-    db.session.add(new_rec)
-    db.session.commit()
-    logger.debug(f"✅ DirectLoss updated for {bangunan_id}")
-
-    periods = {
-      "gempa_500":0.002, "gempa_250":0.004, "gempa_100":0.010,
-      "banjir_100":0.01,"banjir_50":0.02,"banjir_25":0.04,
-      "gunungberapi_250":0.004,"gunungberapi_100":0.01,"gunungberapi_50":0.02,
-      "longsor_5":0.2,"longsor_2":0.5
+        invalidate_aal_cache()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"❌ Recalc bangunan gagal: {e}")
+        raise
+
+    logger.info(f"✅ Direct loss & AAL diperbarui untuk {len(bld)} bangunan ({provinces})")
+    return {
+        "direct_losses": new[dl_cols].to_dict(orient='index'),
+        "not_found": not_found,
+        "provinsi": provinces,
     }
 
-    aal_row = db.session.query(HasilAALProvinsi).filter_by(provinsi=prov).one_or_none()
-    if not aal_row:
-        raise RuntimeError(f"AALProvinsi untuk '{prov}' tidak ditemukan")
+@advisory_lock(RECOMPUTE_LOCK, shared=True)
+def remove_buildings_directloss_and_aal(bangunan_ids, conn):
+    """
+    Sebelum bangunan dihapus: kurangi kontribusinya dari hasil_aal_provinsi
+    (per provinsi & kode, bobot AAL yang sama dengan calculate_aal) dan hapus
+    baris hasil_proses_directloss / hasil_aal_bangunan-nya. Berjalan di
+    koneksi/transaksi pemanggil; pemanggil sebaiknya memegang lock
+    RECOMPUTE_LOCK (shared) sampai commit.
+    """
+    ids = [str(i) for i in bangunan_ids]
+    dl_cols = direct_loss_columns()
+    old = pd.read_sql(
+        text(f"""
+            SELECT b.provinsi,
+                   LOWER(COALESCE(b.kode_bangunan, split_part(b.id_bangunan, '_', 1))) AS kode,
+                   {', '.join('d.' + c for c in dl_cols)}
+            FROM hasil_proses_directloss d
+            JOIN bangunan_copy b USING (id_bangunan)
+            WHERE d.id_bangunan = ANY(:ids)
+        """),
+        conn, params={"ids": ids}
+    )
+    # hapus dulu: provinsi tanpa baris AAL dibangun ulang oleh _apply_aal_deltas
+    # dari direct loss tersimpan, yang tidak boleh lagi memuat bangunan ini
+    conn.execute(
+        text("DELETE FROM hasil_proses_directloss WHERE id_bangunan = ANY(:ids)"),
+        {"ids": ids}
+    )
+    conn.execute(
+        text("DELETE FROM hasil_aal_bangunan WHERE id_bangunan = ANY(:ids)"),
+        {"ids": ids}
+    )
+    provinces = []
+    if not old.empty:
+        old[dl_cols] = old[dl_cols].fillna(0)
+        delta = -old.groupby(['provinsi', 'kode'])[dl_cols].sum()
+        provinces = _apply_aal_deltas(delta, conn)
+    return provinces
 
-    for key, p in periods.items():
-        dis, sc = key.split("_")
-        dlc = f"direct_loss_{dis}_{sc}"
-        delta = direct_losses[dlc] - old_vals.get(dlc, 0)
-        delta_aal = float(delta * p)
-        col_tax = f"aal_{dis}_{sc}_{kode_bgn}"
-        col_tot = f"aal_{dis}_{sc}_total"
-        # update atribut objek dan juga via UPDATE
-        setattr(aal_row, col_tax, float(getattr(aal_row, col_tax, 0)) + delta_aal)
-        setattr(aal_row, col_tot, float(getattr(aal_row, col_tot, 0)) + delta_aal)
-        db.session.query(HasilAALProvinsi)\
-            .filter_by(provinsi=prov)\
-            .update({
-                col_tax: HasilAALProvinsi.__table__.c[col_tax] + delta_aal,
-                col_tot: HasilAALProvinsi.__table__.c[col_tot] + delta_aal
-            })
-
-    db.session.commit()
-    logger.info(f"✅ AAL incremental updated for provinsi {prov}")
-    logger.debug(f"=== END incremental recalc for {bangunan_id} ===")
-
-    return {"direct_losses": direct_losses}
+def recalc_building_directloss_and_aal(bangunan_id: str):
+    """Recalc satu bangunan (delegasi ke recalc_buildings_directloss_and_aal)."""
+    result = recalc_buildings_directloss_and_aal([bangunan_id])
+    if result["not_found"]:
+        raise ValueError(f"Bangunan {bangunan_id} tidak ditemukan")
+    return {"direct_losses": result["direct_losses"][str(bangunan_id)]}
@@ -0,0 +1,203 @@
+# app/service/service_fragility.py
+"""
+Engine kurva fragility (intensitas → damage ratio) bersama.
+
+Kurva referensi di-fit SEKALI lalu dievaluasi untuk seluruh kolom numpy
+dalam satu panggilan; semantik sama dengan interpolasi per sel sebelumnya:
+ - NaN masuk → NaN keluar (disimpan sebagai None / NULL)
+ - hasil di-clamp ke [0, 1]
+ - mode 'cubic'       : CubicSpline(extrapolate=True); jika fit gagal
+                        (x tidak naik, titik < 2, ...) semua nilai NaN
+ - mode 'linear_tail' : < 2 titik → y[0]; di luar [x[0], x[-1]] ekstrapolasi
+                        linear dari dua titik ujung; di dalam CubicSpline
+                        (fallback interpolasi linear jika fit gagal)
+
+Mode LUT (Config.CURVE_LUT_ENABLED): kurva disampel sekali ke grid seragam
+di rentang intensitas teramati, lalu dievaluasi dengan satu np.interp.
+Resolusi awal CURVE_LUT_RESOLUTION digandakan sampai error maksimum
+terhadap spline eksak (diuji di titik tengah sel) ≤ CURVE_LUT_MAX_ERROR.
+Nilai di luar rentang LUT tetap dihitung eksak. LUT di-cache per kurva &
+rentang sehingga run berikutnya tidak menyampel ulang.
+
+FragilityCurve tidak pernah diubah setelah dibuat (aman dibagi antar
+request / thread lewat service_curve_cache): with_lut / compile_luts
+mengembalikan salinan yang membawa LUT-nya sendiri.
+"""
+
+import copy
+import math
+import logging
+import threading
+
+import numpy as np
+from scipy.interpolate import CubicSpline
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+CURVE_MODES = ("cubic", "linear_tail")
+LUT_MAX_POINTS = 1 << 20
+
+# {(mode, x, y, lo, hi, resolusi, error): (grid, tabel, info)}
+_LUT_CACHE = {}
+_LUT_LOCK = threading.Lock()
+
+class FragilityCurve:
+    def __init__(self, x, y, mode="cubic", name=None):
+        if mode not in CURVE_MODES:
+            raise ValueError(f"Mode kurva tidak dikenal: {mode}")
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.mode = mode
+        self.name = name
+        self._spline = None
+        self._lut = None
+        self._fit()
+
+    def _fit(self):
+        if self.mode == "linear_tail" and len(self.x) < 2:
+            return
+        try:
+            self._spline = CubicSpline(self.x, self.y, extrapolate=(self.mode == "cubic"))
+        except Exception as e:
+            logger.error(f"❌ ERROR fit kurva {self.name or ''}: {e}")
+
+    def __call__(self, values):
+        return self.evaluate(values)
+
+    def evaluate(self, values):
+        """Damage ratio untuk array intensitas (NaN tetap NaN), clamp [0, 1]."""
+        v = np.asarray(values, dtype=float)
+        if self._lut is not None:
+            return self._evaluate_lut(v, self._lut)
+        return self.evaluate_exact(v)
+
+    def evaluate_exact(self, values):
+        """Evaluasi spline langsung (tanpa LUT)."""
+        v = np.asarray(values, dtype=float)
+        out = np.full(v.shape, np.nan)
+        ok = ~np.isnan(v)
+        if not ok.any():
+            return out
+        if self.mode == "cubic":
+            if self._spline is not None:
+                out[ok] = self._spline(v[ok])
+        else:
+            out[ok] = self._linear_tail(v[ok])
+        return np.clip(out, 0, 1)
+
+    def _linear_tail(self, v):
+        x, y = self.x, self.y
+        if len(x) < 2:
+            return np.full(v.shape, y[0] if len(y) else np.nan)
+        if self._spline is not None:
+            out = self._spline(v)
+        else:
+            out = np.interp(v, x, y)
+        lo, hi = v < x[0], v > x[-1]
+        out[lo] = y[0] + (y[1] - y[0]) / (x[1] - x[0]) * (v[lo] - x[0])
+        out[hi] = y[-1] + (y[-1] - y[-2]) / (x[-1] - x[-2]) * (v[hi] - x[-1])
+        return out
+
+    # ---------------- LUT ----------------
+    @property
+    def lut_info(self):
+        return self._lut[2] if self._lut is not None else None
+
+    def with_lut(self, lo, hi, resolution=None, max_error=None):
+        """
+        Salinan kurva yang dievaluasi lewat LUT grid seragam [lo, hi]; resolusi
+        digandakan sampai error maks (titik tengah sel vs spline eksak)
+        ≤ max_error. Kurva ini sendiri tidak diubah. Jika LUT tidak berlaku
+        (rentang tidak valid, fit gagal) dikembalikan salinan tanpa LUT.
+        Info LUT: properti lut_info salinan.
+        """
+        bound = copy.copy(self)
+        bound._lut = None
+        resolution = int(resolution or Config.CURVE_LUT_RESOLUTION)
+        max_error = float(Config.CURVE_LUT_MAX_ERROR if max_error is None else max_error)
+        if not (np.isfinite(lo) and np.isfinite(hi)) or hi <= lo:
+            return bound
+        if self.mode == "cubic" and self._spline is None:
+            return bound          # fit gagal: evaluasi eksak sudah NaN semua
+        key = (self.mode, tuple(self.x), tuple(self.y), lo, hi, resolution, max_error)
+        with _LUT_LOCK:
+            hit = _LUT_CACHE.get(key)
+        if hit is None:
+            hit = self._build_lut(lo, hi, resolution, max_error)
+            with _LUT_LOCK:
+                _LUT_CACHE[key] = hit
+        bound._lut = hit
+        return bound
+
+    def _build_lut(self, lo, hi, n, max_error):
+        while True:
+            grid = np.linspace(lo, hi, n)
+            table = self.evaluate_exact(grid)
+            mid = (grid[:-1] + grid[1:]) / 2
+            err = float(np.nanmax(np.abs(self.evaluate_exact(mid) - (table[:-1] + table[1:]) / 2),
+                                  initial=0.0))
+            if err <= max_error or n >= LUT_MAX_POINTS:
+                break
+            n = 2 * n - 1          # titik lama tetap ada di grid baru
+        info = {"lo": lo, "hi": hi, "resolution": n, "max_error": err,
+                "within_bound": err <= max_error}
+        if not info["within_bound"]:
+            logger.warning(f"⚠️ LUT {self.name or ''}: error {err:.2e} > {max_error:.2e} pada {n} titik")
+        return grid, table, info
+
+    def _evaluate_lut(self, v, lut):
+        grid, table, _ = lut
+        out = np.interp(v, grid, table)
+        outside = ~((v >= grid[0]) & (v <= grid[-1]))
+        if outside.any():
+            # NaN ikut di sini → tetap NaN; di luar rentang → eksak
+            out[outside] = self.evaluate_exact(v[outside])
+        return out
+
+def observed_range(values):
+    """Rentang [floor(min), ceil(max)] intensitas teramati (None jika kosong)."""
+    arr = np.asarray(values, dtype=float)
+    arr = arr[np.isfinite(arr)]
+    if not arr.size:
+        return None
+    lo, hi = math.floor(arr.min()), math.ceil(arr.max())
+    return (float(lo), float(hi if hi > lo else lo + 1))
+
+def compile_luts(curves, observed):
+    """
+    LUT semua kurva pada rentang 'observed' jika CURVE_LUT_ENABLED.
+    Mengembalikan (kurva, laporan): dict kurva baru (salinan ber-LUT, kurva
+    masukan tidak diubah) dan {tipe: info LUT}. LUT nonaktif / tidak ada
+    intensitas → (curves, {}).
+    """
+    if not Config.CURVE_LUT_ENABLED:
+        return curves, {}
+    rng = observed_range(observed)
+    if rng is None:
+        return curves, {}
+    bound, report = {}, {}
+    for tipe, curve in curves.items():
+        bound[tipe] = curve.with_lut(*rng)
+        info = bound[tipe].lut_info
+        if info:
+            report[tipe] = info
+            logger.info(
+                f"📐 LUT {tipe}: {info['resolution']} titik [{info['lo']}, {info['hi']}], "
+                f"error maks {info['max_error']:.2e}"
+            )
+    return bound, report
+
+def fit_curves(reference_curves, mode="cubic", observed=None):
+    """
+    {tipe: {"x": [...], "y": [...]}} → {tipe: FragilityCurve} (fit sekali per tipe).
+    observed: intensitas yang akan dievaluasi → LUT di-compile di rentangnya.
+    """
+    curves = {
+        tipe: FragilityCurve(ref["x"], ref["y"], mode=mode, name=tipe)
+        for tipe, ref in reference_curves.items()
+    }
+    if observed is not None:
+        curves, _ = compile_luts(curves, observed)
+    return curves
@@ -0,0 +1,318 @@
+# app/service/service_jobs.py
+
+import uuid
+import logging
+import threading
+from datetime import datetime, timezone
+
+import sqlalchemy as sa
+from flask import current_app
+
+from app.config import Config
+from app.extensions import db
+from app.repository.repo_locks import advisory_lock, LockBusy, RECOMPUTE_LOCK
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class JobCancelled(Exception):
+    """Di-raise dari callback progress saat job diminta berhenti."""
+
+
+class JobConflict(Exception):
+    """Job dengan lock yang sama masih aktif."""
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+# ======================== JOB STORE ========================
+class MemoryJobStore:
+    """Penyimpanan status job di memori proses (untuk broker 'thread' / test)."""
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create_if_free(self, job):
+        with self._lock:
+            for other in self._jobs.values():
+                if other["lock"] == job["lock"] and other["status"] in ACTIVE_STATUSES:
+                    raise JobConflict(other["id"])
+            self._jobs[job["id"]] = dict(job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields, updated_at=_now())
+
+    def list(self, limit=50):
+        with self._lock:
+            jobs = sorted(self._jobs.values(), key=lambda j: j["created_at"], reverse=True)
+            return [dict(j) for j in jobs[:limit]]
+
+
+class SqlJobStore:
+    """Penyimpanan status job di database SQLAlchemy (SQLite / Postgres), dibagi antar proses."""
+
+    def __init__(self, url):
+        url = sa.engine.make_url(url)
+        if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+            # SQLite in-memory: satu koneksi dipakai semua thread (thread job
+            # harus melihat database yang sama dengan thread request)
+            self.engine = sa.create_engine(
+                url, poolclass=sa.pool.StaticPool,
+                connect_args={"check_same_thread": False}
+            )
+        else:
+            self.engine = sa.create_engine(url)
+        self._lock = threading.RLock()
+        meta = sa.MetaData()
+        self.table = sa.Table(
+            "job_runs", meta,
+            sa.Column("id", sa.String(36), primary_key=True),
+            sa.Column("kind", sa.String(64), nullable=False),
+            sa.Column("lock", sa.String(64), nullable=False, index=True),
+            sa.Column("status", sa.String(16), nullable=False),
+            sa.Column("params", sa.JSON),
+            sa.Column("progress", sa.JSON),
+            sa.Column("result", sa.JSON),
+            sa.Column("error", sa.Text),
+            sa.Column("cancel_requested", sa.Boolean, default=False),
+            sa.Column("created_at", sa.String(32)),
+            sa.Column("started_at", sa.String(32)),
+            sa.Column("finished_at", sa.String(32)),
+            sa.Column("updated_at", sa.String(32)),
+        )
+        meta.create_all(self.engine)
+
+    def create_if_free(self, job):
+        t = self.table
+        with self._lock, self.engine.begin() as conn:
+            active = conn.execute(
+                sa.select(t.c.id).where(t.c.lock == job["lock"], t.c.status.in_(ACTIVE_STATUSES))
+            ).first()
+            if active:
+                raise JobConflict(active[0])
+            conn.execute(t.insert().values(**job))
+        return job
+
+    def get(self, job_id):
+        with self._lock, self.engine.connect() as conn:
+            row = conn.execute(sa.select(self.table).where(self.table.c.id == job_id)).mappings().first()
+            return dict(row) if row else None
+
+    def update(self, job_id, **fields):
+        with self._lock, self.engine.begin() as conn:
+            conn.execute(
+                self.table.update().where(self.table.c.id == job_id).values(**fields, updated_at=_now())
+            )
+
+    def list(self, limit=50):
+        t = self.table
+        with self._lock, self.engine.connect() as conn:
+            rows = conn.execute(sa.select(t).order_by(t.c.created_at.desc()).limit(limit)).mappings()
+            return [dict(r) for r in rows]
+
+
+def make_store(url):
+    return MemoryJobStore() if url in (None, "", "memory") else SqlJobStore(url)
+
+
+# ======================== PIPELINE YANG BISA DI-ENQUEUE ========================
+def _run_process_join(progress, **params):
+    from app.service.service_directloss import (
+        process_all_disasters, process_subset, LAST_RUN_TIMINGS
+    )
+    if params.get("provinsi") or params.get("kota"):
+        result = process_subset(params.get("provinsi"), params.get("kota"), progress=progress)
+        return {**result, "timings": dict(LAST_RUN_TIMINGS)}
+    file_path = process_all_disasters(progress=progress, streaming=params.get("streaming"))
+    return {"file_path": file_path, "timings": dict(LAST_RUN_TIMINGS)}
+
+def _run_simulation(progress, **params):
+    from app.service.service_simulation import run_simulation
+    return run_simulation(
+        n_events=params.get("n_events"), seed=params.get("seed"),
+        hazards=params.get("hazards"), provinsi=params.get("provinsi"),
+        return_periods=params.get("return_periods"), progress=progress,
+    )
+
+def _make_kurva_runner(hazard):
+    def _run(progress, **params):
+        from app.controller.controller_kurva import run_kurva_pipeline
+        count = run_kurva_pipeline(hazard, progress=progress)
+        if count is None:
+            raise ValueError(f"Tidak ada data raw untuk {hazard}")
+        return {"processed_data_count": count}
+    return _run
+
+# kind → (fungsi pipeline, nama lock eksklusif)
+JOB_REGISTRY = {
+    "process_join": (_run_process_join, RECOMPUTE_LOCK),
+    "simulate": (_run_simulation, "simulation"),
+}
+for _hazard in ("gempa", "banjir", "longsor", "gunungberapi"):
+    JOB_REGISTRY[f"process_kurva_{_hazard}"] = (_make_kurva_runner(_hazard), f"kurva_{_hazard}")
+
+
+# ======================== BROKER ========================
+class ThreadBroker:
+    """Jalankan job di thread dalam proses Flask yang sama."""
+
+    def submit(self, manager, job_id):
+        app = current_app._get_current_object()
+
+        def _target():
+            with app.app_context():
+                manager.run(job_id)
+
+        threading.Thread(target=_target, name=f"job-{job_id[:8]}", daemon=True).start()
+
+
+class CeleryBroker:
+    """Kirim job ke worker Celery (lihat celery_app di modul ini)."""
+
+    def submit(self, manager, job_id):
+        celery_app.send_task("jobs.run_job", args=[job_id])
+
+
+def make_broker(name, store_url=None):
+    """
+    Broker job. Celery menjalankan job di proses worker lain, jadi status
+    job harus di store bersama: kombinasi dengan store 'memory' ditolak.
+    """
+    if name == "celery":
+        if store_url in (None, "", "memory"):
+            raise RuntimeError("JOB_BROKER=celery butuh JOB_STORE_URL bersama (bukan 'memory')")
+        return CeleryBroker()
+    return ThreadBroker()
+
+
+# ======================== JOB MANAGER ========================
+class JobManager:
+    def __init__(self, store, broker):
+        self.store = store
+        self.broker = broker
+
+    def submit(self, kind, params=None):
+        if kind not in JOB_REGISTRY:
+            raise ValueError(f"Jenis job tidak dikenal: {kind}")
+        _, lock = JOB_REGISTRY[kind]
+        job = {
+            "id": str(uuid.uuid4()),
+            "kind": kind,
+            "lock": lock,
+            "status": "queued",
+            "params": params or {},
+            "progress": {"stage": "queued", "hazard": None, "percent": 0, "hazards": {}},
+            "result": None,
+            "error": None,
+            "cancel_requested": False,
+            "created_at": _now(),
+            "started_at": None,
+            "finished_at": None,
+            "updated_at": _now(),
+        }
+        self.store.create_if_free(job)
+        self.broker.submit(self, job["id"])
+        logger.info(f"📨 Job {kind} di-enqueue: {job['id']}")
+        return job
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def list(self, limit=50):
+        return self.store.list(limit)
+
+    def cancel(self, job_id):
+        job = self.store.get(job_id)
+        if not job:
+            return None
+        if job["status"] == "queued":
+            self.store.update(job_id, status="cancelled", cancel_requested=True, finished_at=_now())
+        elif job["status"] == "running":
+            self.store.update(job_id, cancel_requested=True)
+        return self.store.get(job_id)
+
+    def _progress_callback(self, job_id):
+        state = {"hazards": {}}
+
+        def progress(stage, hazard=None, percent=None):
+            job = self.store.get(job_id)
+            if job and job["cancel_requested"]:
+                raise JobCancelled(job_id)
+            if hazard:
+                state["hazards"][hazard] = stage
+            self.store.update(job_id, progress={
+                "stage": stage, "hazard": hazard, "percent": percent,
+                "hazards": dict(state["hazards"]),
+            })
+        return progress
+
+    def run(self, job_id):
+        """Eksekusi job (dipanggil broker, di thread atau worker Celery)."""
+        job = self.store.get(job_id)
+        if not job or job["status"] != "queued":
+            return
+        fn, lock = JOB_REGISTRY[job["kind"]]
+        self.store.update(job_id, status="running", started_at=_now())
+
+        try:
+            with advisory_lock(lock):
+                self._execute(job_id, job, fn)
+        except LockBusy as e:
+            self.store.update(job_id, status="failed", finished_at=_now(), error=str(e))
+
+    def _execute(self, job_id, job, fn):
+        try:
+            result = fn(self._progress_callback(job_id), **(job["params"] or {}))
+            self.store.update(job_id, status="succeeded", result=result, finished_at=_now())
+            logger.info(f"✅ Job {job['kind']} selesai: {job_id}")
+        except JobCancelled:
+            db.session.rollback()
+            self.store.update(job_id, status="cancelled", finished_at=_now())
+            logger.info(f"🛑 Job {job['kind']} dibatalkan: {job_id}")
+        except Exception as e:
+            db.session.rollback()
+            self.store.update(job_id, status="failed", error=str(e), finished_at=_now())
+            logger.error(f"❌ Job {job['kind']} gagal: {e}")
+
+
+_manager = None
+
+def get_job_manager():
+    global _manager
+    if _manager is None:
+        broker = make_broker(Config.JOB_BROKER, Config.JOB_STORE_URL)
+        _manager = JobManager(make_store(Config.JOB_STORE_URL), broker)
+    return _manager
+
+
+# ======================== CELERY WORKER ========================
+# Worker: celery -A app.service.service_jobs:celery_app worker
+def _make_celery():
+    from celery import Celery
+    celery = Celery("capstone_jobs", broker=Config.CELERY_BROKER_URL)
+    worker_app = {}
+
+    @celery.task(name="jobs.run_job")
+    def run_job(job_id):
+        if "app" not in worker_app:
+            from app import create_app
+            worker_app["app"] = create_app()
+        with worker_app["app"].app_context():
+            get_job_manager().run(job_id)
+
+    return celery
+
+celery_app = _make_celery() if Config.JOB_BROKER == "celery" else None
@@ -0,0 +1,156 @@
+# app/service/service_portfolio.py
+"""
+Agregasi portofolio multi-bencana dengan asumsi korelasi / copula.
+
+Marginal per bencana untuk satu grup (provinsi, nasional, kode_bangunan)
+adalah kurva EP dari jumlah direct loss tersimpan per periode ulang:
+titik (p_i, L_i). Fungsi kuantil Q(u) (u = probabilitas terlampaui):
+ - interpolasi linear terhadap p di antara titik
+ - u < p paling langka → loss periode ulang terbesar (datar)
+ - u > p paling sering → 0
+sama dengan asumsi integral 'trapezoid' di service_aal, sehingga rata-rata
+sampel Q(U) konvergen ke AAL trapesium per bencana.
+
+Sampel U (n × bencana) diambil dari copula:
+ - independent  : U_h saling bebas
+ - comonotonic  : satu U untuk semua bencana (korelasi sempurna)
+ - gaussian     : Φ(Z·Lᵀ), L = Cholesky matriks korelasi
+ - t            : t_ν(Z·Lᵀ / √(W/ν)), W ~ χ²_ν (ketergantungan ekor)
+Total = Σ_h Q_h(U_h); kurva EP gabungan = kuantil empiris total. Sampel
+diproses per chunk dan semua grup dievaluasi sekaligus (searchsorted).
+"""
+
+import logging
+
+import numpy as np
+from scipy.special import ndtr, stdtr
+
+from app.config import Config
+from app.hazard_registry import HAZARDS
+from app.repository.repo_aal import group_direct_losses
+
+logger = logging.getLogger(__name__)
+
+COPULAS = ("independent", "comonotonic", "gaussian", "t")
+LEVELS = {
+    "provinsi":      ["provinsi"],
+    "kode_bangunan": ["kode_bangunan"],
+    "nasional":      [],
+}
+NATIONAL = "Nasional"
+
+def correlation_matrix(correlation, n):
+    """Skalar ρ (semua pasangan) atau matriks n×n → matriks korelasi tervalidasi."""
+    if correlation is None:
+        correlation = Config.PORTFOLIO_CORRELATION
+    if np.isscalar(correlation):
+        corr = np.full((n, n), float(correlation))
+        np.fill_diagonal(corr, 1.0)
+    else:
+        corr = np.asarray(correlation, dtype=float)
+    if corr.shape != (n, n) or not np.allclose(corr, corr.T) or not np.allclose(np.diag(corr), 1):
+        raise ValueError(f"Matriks korelasi harus simetris {n}×{n} dengan diagonal 1")
+    try:
+        np.linalg.cholesky(corr)
+    except np.linalg.LinAlgError:
+        raise ValueError("Matriks korelasi tidak definit positif")
+    return corr
+
+def sample_copula(rng, copula, n, corr, dof=None):
+    """Sampel (n × bencana) probabilitas terlampaui dari copula."""
+    h = corr.shape[0]
+    if copula == "independent":
+        return rng.random((n, h))
+    if copula == "comonotonic":
+        return np.repeat(rng.random((n, 1)), h, axis=1)
+    z = rng.standard_normal((n, h)) @ np.linalg.cholesky(corr).T
+    if copula == "gaussian":
+        return ndtr(z)
+    dof = float(dof or Config.PORTFOLIO_T_DOF)
+    w = rng.chisquare(dof, size=(n, 1)) / dof
+    return stdtr(dof, z / np.sqrt(w))
+
+def marginal_quantiles(p, losses, u):
+    """
+    Q(u) untuk semua grup sekaligus.
+    p: (S,) naik (paling langka dulu); losses: (G, S); u: (n,) → (G, n).
+    """
+    k = np.searchsorted(p, u, side="right")          # jumlah titik dengan p ≤ u
+    lo = np.clip(k - 1, 0, len(p) - 1)
+    hi = np.clip(k, 0, len(p) - 1)
+    span = p[hi] - p[lo]
+    w = np.divide(u - p[lo], span, out=np.zeros_like(u), where=span > 0)
+    q = losses[:, lo] + (losses[:, hi] - losses[:, lo]) * w
+    q[:, k == 0] = losses[:, :1]                      # lebih langka → datar
+    q[:, k >= len(p)] = 0.0                           # lebih sering → 0
+    return q
+
+def _group_frame(level):
+    if level not in LEVELS:
+        raise ValueError(f"Level tidak dikenal: {level} (pilih {', '.join(LEVELS)})")
+    df = group_direct_losses()
+    keys = LEVELS[level]
+    if not keys:
+        df = df.assign(_grup=NATIONAL)
+        keys = ["_grup"]
+    value_cols = [c for c in df.columns if c.startswith("direct_loss_")] + ["jumlah_bangunan"]
+    return df.groupby(keys)[value_cols].sum()
+
+def aggregate_portfolio(level="provinsi", copula=None, correlation=None, dof=None,
+                        samples=None, seed=None, hazards=None, return_periods=None):
+    """
+    Kurva EP gabungan multi-bencana per grup pada 'level'.
+    Mengembalikan {grup: {jumlah_bangunan, aal, aal_by_hazard, ep: [...]}}.
+    """
+    copula = (copula or Config.PORTFOLIO_COPULA).lower()
+    if copula not in COPULAS:
+        raise ValueError(f"Copula tidak dikenal: {copula} (pilih {', '.join(COPULAS)})")
+    names = list(HAZARDS) if hazards is None else list(hazards)
+    unknown = [h for h in names if h not in HAZARDS]
+    if unknown:
+        raise ValueError(f"Jenis bencana tidak dikenal: {', '.join(unknown)}")
+    samples = int(samples or Config.PORTFOLIO_SAMPLES)
+    rps = [int(r) for r in (return_periods or Config.SIM_RETURN_PERIODS)]
+    if samples < 1 or any(r <= 1 for r in rps):
+        raise ValueError("samples harus ≥ 1 dan periode ulang > 1")
+    corr = correlation_matrix(correlation, len(names))
+
+    groups = _group_frame(level)
+    marginals = []
+    for name in names:
+        rps_h = sorted(HAZARDS[name].return_periods, key=lambda rp: rp.probability)
+        p = np.array([rp.probability for rp in rps_h])
+        L = groups[[HAZARDS[name].direct_loss_col(rp.scale) for rp in rps_h]].to_numpy(dtype=float)
+        marginals.append((p, np.nan_to_num(L)))
+
+    rng = np.random.default_rng(Config.SIM_SEED if seed is None else int(seed))
+    n_groups = len(groups)
+    total = np.zeros((n_groups, samples))
+    hazard_sum = np.zeros((n_groups, len(names)))
+    chunk = max(1, Config.PORTFOLIO_CHUNK_SIZE)
+    for s in range(0, samples, chunk):
+        u = sample_copula(rng, copula, min(chunk, samples - s), corr, dof)
+        for j, (p, L) in enumerate(marginals):
+            q = marginal_quantiles(p, L, u[:, j])
+            total[:, s:s + len(u)] += q
+            hazard_sum[:, j] += q.sum(axis=1)
+
+    probs = np.array([1 / r for r in rps])
+    ep_losses = np.quantile(total, 1 - probs, axis=1).T       # (G, len(rps))
+    result = {}
+    for g, key in enumerate(groups.index):
+        label = " / ".join(map(str, key)) if isinstance(key, tuple) else str(key)
+        result[label] = {
+            "jumlah_bangunan": int(groups["jumlah_bangunan"].iloc[g]),
+            "aal": float(total[g].mean()),
+            "aal_by_hazard": {n: float(hazard_sum[g, j] / samples) for j, n in enumerate(names)},
+            "ep": [
+                {"return_period": r, "probability": float(pr), "loss": float(ep_losses[g, i])}
+                for i, (r, pr) in enumerate(zip(rps, probs))
+            ],
+        }
+    logger.info(f"📈 Portofolio {level} ({copula}): {n_groups} grup × {samples} sampel")
+    return {
+        "level": level, "copula": copula, "hazards": names,
+        "correlation": corr.tolist(), "samples": samples, "groups": result,
+    }
@@ -0,0 +1,148 @@
+# app/service/service_scenario.py
+"""
+Loss skenario satu kejadian gempa (footprint real-time).
+
+Footprint MMI di lokasi tiap bangunan diambil dari salah satu:
+ - grid titik MMI (JSON): IDW k tetangga terdekat lewat cKDTree
+ - GeoTIFF MMI: nilai piksel di lokasi bangunan (rasterio)
+ - episenter + magnitudo: atenuasi MMI = a + b·M + c·log10(R) + d·R,
+   R = jarak hiposenter (km)
+Damage ratio dari kurva referensi gempa (vektor, tanpa tabel dmgratio_*),
+loss = luas × adjusted_hsbgn × damage ratio, dijumlah per provinsi & kota.
+"""
+
+import logging
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from app.config import Config
+from app.hazard_registry import HAZARDS
+from app.repository.repo_directloss import get_bangunan_points
+from app.repository.repo_hazard_matcher import GEOD, to_xyz, chord
+from app.service.service_directloss import prepare_buildings
+from app.service.service_fragility import compile_luts
+from app.service.service_simulation import load_curves, damage_ratio_from_intensity
+
+logger = logging.getLogger(__name__)
+
+HAZARD = "gempa"
+MMI_RANGE = (1.0, 12.0)
+
+# ======================== FOOTPRINT → MMI PER BANGUNAN ========================
+def mmi_from_grid(points, lon, lat):
+    """
+    points: [{lon, lat, mmi}, ...]. IDW (1/d²) dari SCENARIO_GRID_NEIGHBORS
+    titik terdekat dalam SCENARIO_GRID_MAX_DISTANCE_M; NaN jika tidak ada.
+    """
+    try:
+        g_lon = np.array([float(p["lon"]) for p in points])
+        g_lat = np.array([float(p["lat"]) for p in points])
+        g_mmi = np.array([float(p["mmi"]) for p in points])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Setiap titik grid wajib punya lon, lat, mmi numerik")
+    if not len(g_mmi):
+        raise ValueError("Grid MMI kosong")
+
+    tree = cKDTree(to_xyz(g_lon, g_lat))
+    k = min(Config.SCENARIO_GRID_NEIGHBORS, tree.n)
+    dist, idx = tree.query(
+        to_xyz(lon, lat), k=k,
+        distance_upper_bound=chord(Config.SCENARIO_GRID_MAX_DISTANCE_M)
+    )
+    dist, idx = dist.reshape(len(lon), k), idx.reshape(len(lon), k)
+    valid = idx < tree.n
+    vals = np.where(valid, g_mmi[np.where(valid, idx, 0)], 0.0)
+    with np.errstate(divide="ignore"):
+        w = np.where(valid, 1.0 / np.maximum(dist, 1e-9) ** 2, 0.0)
+    wsum = w.sum(axis=1)
+    return np.where(wsum > 0, (w * vals).sum(axis=1) / np.where(wsum > 0, wsum, 1), np.nan)
+
+def mmi_from_geotiff(data, lon, lat):
+    """Nilai band 1 GeoTIFF di lokasi bangunan (di luar raster / nodata → NaN)."""
+    from rasterio.io import MemoryFile
+    from rasterio.transform import rowcol
+    from rasterio.warp import transform as warp_transform
+
+    with MemoryFile(data) as mem, mem.open() as src:
+        xs, ys = lon, lat
+        if src.crs and src.crs.to_epsg() != 4326:
+            xs, ys = warp_transform("EPSG:4326", src.crs, lon, lat)
+        rows, cols = (np.asarray(a) for a in rowcol(src.transform, xs, ys))
+        band = src.read(1, masked=True).astype(float).filled(np.nan)
+        inside = (rows >= 0) & (rows < src.height) & (cols >= 0) & (cols < src.width)
+        out = np.full(len(lon), np.nan)
+        out[inside] = band[rows[inside], cols[inside]]
+    return out
+
+def mmi_from_epicenter(epicenter, magnitude, lon, lat, coefficients=None):
+    """Atenuasi MMI = a + b·M + c·log10(R) + d·R, R = √(jarak episenter² + kedalaman²) km."""
+    try:
+        lon0, lat0 = float(epicenter["lon"]), float(epicenter["lat"])
+        depth = float(epicenter.get("depth_km", Config.SCENARIO_DEFAULT_DEPTH_KM))
+        magnitude = float(magnitude)
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("epicenter {lon, lat, depth_km} dan magnitude wajib numerik")
+    coeffs = coefficients or Config.SCENARIO_GMPE_COEFFS
+    if isinstance(coeffs, dict):
+        coeffs = [coeffs.get(c, d) for c, d in zip("abcd", Config.SCENARIO_GMPE_COEFFS)]
+    a, b, c, d = (float(v) for v in coeffs)
+
+    _, _, epi_m = GEOD.inv(np.full(len(lon), lon0), np.full(len(lat), lat0), lon, lat)
+    r_km = np.maximum(np.hypot(np.asarray(epi_m) / 1000.0, depth), 1.0)
+    return np.clip(a + b * magnitude + c * np.log10(r_km) + d * r_km, *MMI_RANGE)
+
+# ======================== LOSS ========================
+def scenario_losses(footprint):
+    """
+    footprint: {"grid": [...]} | {"geotiff": bytes} |
+               {"epicenter": {...}, "magnitude": M, "coefficients": [a,b,c,d]}
+    Mengembalikan total loss, per provinsi dan per kota.
+    """
+    bld = get_bangunan_points()
+    bld = bld[bld["lon"].notna() & bld["lat"].notna()]
+    if bld.empty:
+        raise ValueError("Tidak ada bangunan dengan geometri")
+    bld = prepare_buildings(bld.copy())
+    lon = bld["lon"].to_numpy(dtype=float)
+    lat = bld["lat"].to_numpy(dtype=float)
+
+    if footprint.get("grid") is not None:
+        source, mmi = "grid", mmi_from_grid(footprint["grid"], lon, lat)
+    elif footprint.get("geotiff") is not None:
+        source, mmi = "geotiff", mmi_from_geotiff(footprint["geotiff"], lon, lat)
+    elif footprint.get("epicenter") is not None:
+        source = "epicenter"
+        mmi = mmi_from_epicenter(
+            footprint["epicenter"], footprint.get("magnitude"), lon, lat,
+            footprint.get("coefficients")
+        )
+    else:
+        raise ValueError("Footprint wajib berisi grid, geotiff, atau epicenter + magnitude")
+
+    cfg = HAZARDS[HAZARD]
+    fns = load_curves([HAZARD])[HAZARD]
+    fns, lut = compile_luts(fns, [Config.SCENARIO_MIN_MMI, MMI_RANGE[1]])
+    mmi = np.where(mmi >= Config.SCENARIO_MIN_MMI, mmi, np.nan)
+    dr = np.nan_to_num(damage_ratio_from_intensity(cfg, fns, mmi, bld["jumlah_lantai"].to_numpy()))
+    bld["loss"] = bld["luas"].to_numpy(dtype=float) * bld["adjusted_hsbgn"].to_numpy(dtype=float) * dr
+    bld["terdampak"] = dr > 0
+    bld["provinsi"] = bld["provinsi"].fillna("")
+    bld["kota"] = bld["kota"].fillna("")
+
+    def _totals(keys):
+        g = bld.groupby(keys).agg(loss=("loss", "sum"), jumlah_bangunan=("terdampak", "sum"))
+        g = g[g["jumlah_bangunan"] > 0].sort_values("loss", ascending=False).reset_index()
+        g["jumlah_bangunan"] = g["jumlah_bangunan"].astype(int)
+        return g.to_dict(orient="records")
+
+    logger.info(f"🌐 Skenario gempa ({source}): {int(bld['terdampak'].sum())} bangunan terdampak")
+    return {
+        "source": source,
+        "total_loss": float(bld["loss"].sum()),
+        "jumlah_bangunan_terdampak": int(bld["terdampak"].sum()),
+        "max_mmi": float(np.nanmax(mmi)) if np.isfinite(mmi).any() else None,
+        "lut": lut,
+        "provinsi": _totals(["provinsi"]),
+        "kota": _totals(["provinsi", "kota"]),
+    }
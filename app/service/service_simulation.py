@@ -0,0 +1,276 @@
+# app/service/service_simulation.py
+"""
+Simulasi Monte-Carlo kerugian tahunan di atas model direct loss.
+
+Per tahun simulasi (event) e, provinsi p dan bencana h:
+ - kejadian: u ~ U(0,1) → skenario periode ulang paling langka dengan
+   u < p_RP (probabilitas registry), atau tidak ada kejadian; seluruh
+   bangunan satu provinsi berbagi skenario yang sama
+ - ketidakpastian intensitas: intensitas titik yang ditugaskan ×
+   exp(σ·z), z ~ N(0,1) (median tetap = intensitas model), lalu kurva
+   referensi dievaluasi ulang → damage ratio rata-rata μ
+ - ketidakpastian damage ratio: Beta dengan mean μ dan CoV dari registry
+ - loss = luas × adjusted_hsbgn × damage ratio, dijumlah per provinsi
+
+Bangunan diproses per chunk (Config.SIM_CHUNK_SIZE) dan event per batch
+(Config.SIM_EVENT_BATCH) sehingga memori ~ batch × chunk; task chunk dibuat
+lazy dan dikirim ke process pool dengan antrean terbatas. Skenario kejadian
+tidak ikut dikirim: tiap worker membangkitkannya ulang dari seed. Semua RNG diturunkan dari satu SeedSequence (kejadian: kunci
+(0,), chunk i: kunci (1, i)) sehingga hasil dapat direproduksi untuk seed
+dan ukuran chunk yang sama, berapa pun jumlah worker.
+"""
+
+import os
+import logging
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from app.config import Config
+from app.hazard_registry import HAZARDS
+from app.service.service_fragility import compile_luts
+from app.repository.repo_directloss import get_simulation_input, scope_filter
+from app.service.service_curve_cache import get_fitted_curves
+from app.service.service_directloss import (
+    prepare_buildings, dump_csv_async, loss_executor, noop_progress, DEBUG_DIR
+)
+
+logger = logging.getLogger(__name__)
+
+NATIONAL = "Nasional"
+
+# ======================== KURVA ========================
+def load_curves(names):
+    """{bencana: {kolom vulnerability: FragilityCurve}} dari cache kurva bersama."""
+    curves = {}
+    for name in names:
+        cfg = HAZARDS[name]
+        fitted = {str(k).lower(): v for k, v in get_fitted_curves(name, cfg.curve_mode).items()}
+        missing = [c for c in _curve_columns(cfg) if c not in fitted]
+        if missing:
+            raise ValueError(f"Kurva {name} tidak lengkap: {', '.join(missing)}")
+        curves[name] = {c: fitted[c] for c in _curve_columns(cfg)}
+    return curves
+
+def _curve_columns(cfg):
+    """Kolom vulnerability yang dibutuhkan untuk damage ratio bencana ini."""
+    if cfg.damage_by_floors:
+        return list(cfg.damage_by_floors)
+    cols = list(cfg.vulnerability_columns)
+    if cfg.ordered_columns:
+        # cummax cr ≤ mcf ≤ ... : semua kolom sampai kolom damage ikut dihitung
+        return cols[:cols.index(cfg.damage_column) + 1]
+    return [cfg.damage_column]
+
+def damage_ratio_from_intensity(cfg, fns, intensity, floors):
+    """Damage ratio rata-rata untuk intensitas tersampel (array 1D)."""
+    cols = _curve_columns(cfg)
+    if cfg.damage_by_floors:
+        values = [fns[c](intensity) for c in cols]
+        idx = np.clip(floors, 1, len(values)) - 1
+        return np.choose(idx, values)
+    if cfg.ordered_columns:
+        return np.fmax.reduce([fns[c](intensity) for c in cols])
+    return fns[cols[0]](intensity)
+
+def _sample_beta(rng, mean, cov):
+    """Beta dengan mean 'mean' & CoV 'cov'; mean 0/1/NaN dikembalikan apa adanya."""
+    out = np.nan_to_num(mean)
+    ok = (out > 0) & (out < 1)
+    if not ok.any() or cov <= 0:
+        return out
+    m = out[ok]
+    var = np.minimum((cov * m) ** 2, 0.99 * m * (1 - m))
+    k = m * (1 - m) / var - 1
+    out[ok] = rng.beta(m * k, (1 - m) * k)
+    return out
+
+# ======================== SKENARIO KEJADIAN ========================
+def sample_occurrence(seed, n_events, n_provinces, names):
+    """
+    Indeks skenario per (event, provinsi, bencana): 0 = periode ulang paling
+    langka, dst; -1 = tidak ada kejadian. Kolom intensitas disusun dengan
+    urutan yang sama (rarity_order).
+    """
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(0,)))
+    u = rng.random((n_events, n_provinces, len(names)))
+    scen = np.empty(u.shape, dtype=np.int8)
+    for j, name in enumerate(names):
+        p = np.array([rp.probability for rp in rarity_order(HAZARDS[name])])
+        k = np.searchsorted(p, u[:, :, j], side="right")
+        scen[:, :, j] = np.where(k < len(p), k, -1)
+    return scen
+
+def rarity_order(cfg):
+    return sorted(cfg.return_periods, key=lambda rp: rp.probability)
+
+# ======================== CHUNK (WORKER) ========================
+def simulate_chunk(task):
+    """
+    Kerugian tahunan per (event, provinsi) untuk satu chunk bangunan.
+    Fungsi murni numpy (aman untuk process pool); task berisi:
+    seed, chunk, n_events, names, curves, prov_idx, n_prov, cost, floors,
+    intensity {bencana: (B, S) urut rarity_order}, event_batch, lut_range.
+    Skenario kejadian dibangkitkan ulang dari seed (sample_occurrence),
+    identik untuk semua chunk. Mengembalikan array (n_events, n_prov).
+    """
+    rng = np.random.default_rng(np.random.SeedSequence(task["seed"], spawn_key=(1, task["chunk"])))
+    n_events, n_prov, prov = task["n_events"], task["n_prov"], task["prov_idx"]
+    scenario = sample_occurrence(task["seed"], n_events, n_prov, task["names"])
+    cost, floors = task["cost"], task["floors"]
+    batch = max(1, int(task["event_batch"]))
+    out = np.zeros((n_events, n_prov))
+
+    for j, name in enumerate(task["names"]):
+        cfg = HAZARDS[name]
+        fns = task["curves"][name]
+        sigma = Config.SIM_INTENSITY_SIGMA if cfg.intensity_sigma is None else cfg.intensity_sigma
+        fns, _ = compile_luts(fns, task["lut_range"][name])
+        cov = Config.SIM_DAMAGE_COV if cfg.damage_cov is None else cfg.damage_cov
+        inten = task["intensity"][name]
+        exposed = ~np.isnan(inten).all(axis=1)
+        if not exposed.any():
+            continue
+
+        for e0 in range(0, n_events, batch):
+            sc = scenario[e0:e0 + batch, :, j][:, prov]          # (E, B)
+            ev, b = np.nonzero((sc >= 0) & exposed)
+            if not len(ev):
+                continue
+            base = inten[b, sc[ev, b]]
+            hit = ~np.isnan(base)
+            ev, b, base = ev[hit], b[hit], base[hit]
+            sampled = base * np.exp(sigma * rng.standard_normal(len(base)))
+            dr = _sample_beta(rng, damage_ratio_from_intensity(cfg, fns, sampled, floors[b]), cov)
+            flat = ev * n_prov + prov[b]
+            out[e0:e0 + batch] += np.bincount(
+                flat, weights=cost[b] * dr, minlength=sc.shape[0] * n_prov
+            ).reshape(sc.shape[0], n_prov)
+    return out
+
+# ======================== STATISTIK ========================
+def loss_statistics(year_loss, return_periods):
+    """mean, std, max, PML (kuantil 1 − 1/RP) & TVaR (rata-rata ekor ≥ PML)."""
+    losses = np.sort(np.asarray(year_loss, dtype=float))
+    stats = {
+        "mean": float(losses.mean()),
+        "std":  float(losses.std(ddof=1)) if len(losses) > 1 else 0.0,
+        "max":  float(losses[-1]),
+        "pml":  {},
+        "tvar": {},
+    }
+    for rp in return_periods:
+        q = float(np.quantile(losses, 1 - 1 / rp))
+        stats["pml"][str(rp)] = q
+        stats["tvar"][str(rp)] = float(losses[losses >= q].mean())
+    return stats
+
+# ======================== PIPELINE ========================
+def _map_bounded(executor, fn, tasks, window):
+    """
+    Seperti executor.map (urutan hasil sama), tetapi task diambil dari
+    iterator sedikit demi sedikit: paling banyak 'window' task di antrean.
+    """
+    pending = deque()
+    for task in tasks:
+        pending.append(executor.submit(fn, task))
+        if len(pending) >= max(1, window):
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def run_simulation(n_events=None, seed=None, hazards=None, provinsi=None,
+                   return_periods=None, progress=None):
+    """
+    Jalankan simulasi untuk semua bangunan (opsional satu provinsi).
+    Mengembalikan ringkasan per provinsi + nasional: mean (AAL simulasi),
+    std, max, PML & TVaR per periode ulang.
+    """
+    progress = progress or noop_progress
+    n_events = int(n_events or Config.SIM_EVENTS)
+    seed = Config.SIM_SEED if seed is None else int(seed)
+    names = list(HAZARDS) if hazards is None else list(hazards)
+    unknown = [h for h in names if h not in HAZARDS]
+    if unknown:
+        raise ValueError(f"Jenis bencana tidak dikenal: {', '.join(unknown)}")
+    rps = [int(r) for r in (return_periods or Config.SIM_RETURN_PERIODS)]
+    if n_events < 1 or any(r <= 1 for r in rps):
+        raise ValueError("n_events harus ≥ 1 dan periode ulang > 1")
+
+    progress("load", percent=0)
+    where, params = scope_filter(provinsi)
+    bld = get_simulation_input(names, where, params)
+    if bld.empty:
+        raise ValueError("Tidak ada bangunan untuk disimulasikan")
+    bld = prepare_buildings(bld)
+    curves = load_curves(names)
+
+    prov_idx, provinces = pd.factorize(bld["provinsi"].fillna(""), sort=True)
+    cost = (bld["luas"] * bld["adjusted_hsbgn"]).to_numpy(dtype=float)
+    floors = bld["jumlah_lantai"].to_numpy()
+    intensity = {
+        name: bld[[f"intensitas_{name}_{rp.scale}" for rp in rarity_order(HAZARDS[name])]]
+              .to_numpy(dtype=float)
+        for name in names
+    }
+
+    # rentang LUT: intensitas model × exp(±4σ) (sampel lognormal hampir selalu di dalamnya)
+    lut_range = {}
+    for name, arr in intensity.items():
+        cfg = HAZARDS[name]
+        sigma = Config.SIM_INTENSITY_SIGMA if cfg.intensity_sigma is None else cfg.intensity_sigma
+        finite = arr[np.isfinite(arr)]
+        lut_range[name] = (
+            [finite.min() * np.exp(-4 * sigma), finite.max() * np.exp(4 * sigma)] if finite.size else []
+        )
+
+    size = max(1, Config.SIM_CHUNK_SIZE)
+    n_chunks = -(-len(bld) // size)
+    tasks = (
+        {
+            "seed": seed, "chunk": i, "n_events": n_events, "names": names,
+            "curves": curves, "prov_idx": prov_idx[s:s + size],
+            "n_prov": len(provinces), "cost": cost[s:s + size],
+            "floors": floors[s:s + size],
+            "intensity": {k: v[s:s + size] for k, v in intensity.items()},
+            "event_batch": Config.SIM_EVENT_BATCH,
+            "lut_range": lut_range,
+        }
+        for i, s in enumerate(range(0, len(bld), size))
+    )
+    logger.info(f"🎲 Simulasi {n_events} event × {len(bld)} bangunan ({n_chunks} chunk, seed {seed})")
+
+    progress("simulate", percent=5)
+    year_loss = np.zeros((n_events, len(provinces)))
+    executor = loss_executor(Config.DIRECTLOSS_WORKERS) if n_chunks > 1 else None
+    if executor:
+        results = _map_bounded(executor, simulate_chunk, tasks, 2 * Config.DIRECTLOSS_WORKERS)
+    else:
+        results = map(simulate_chunk, tasks)
+    try:
+        for i, partial in enumerate(results, 1):
+            year_loss += partial
+            progress("simulate", percent=5 + int(85 * i / n_chunks))
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+
+    progress("statistics", percent=92)
+    summary = {prov: loss_statistics(year_loss[:, k], rps) for k, prov in enumerate(provinces)}
+    summary[NATIONAL] = loss_statistics(year_loss.sum(axis=1), rps)
+
+    table = pd.DataFrame(year_loss, columns=list(provinces))
+    table.insert(0, "event", np.arange(n_events))
+    csv_path = dump_csv_async(table, os.path.join(DEBUG_DIR, f"simulasi_loss_{seed}.csv"))
+
+    progress("done", percent=100)
+    return {
+        "n_events": n_events,
+        "seed": seed,
+        "hazards": names,
+        "n_bangunan": int(len(bld)),
+        "return_periods": rps,
+        "provinsi": summary,
+        "file_path": csv_path,
+    }
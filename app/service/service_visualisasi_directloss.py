@@ -25,6 +25,10 @@ class GedungService:
     def get_aal_data(provinsi):
         return GedungRepository.fetch_aal_data(provinsi)
 
+    @staticmethod
+    def get_aal_kota(provinsi=None, kota=None):
+        return GedungRepository.fetch_aal_kota(provinsi, kota)
+
     # ————————————————
     # Service untuk CSV
     @staticmethod
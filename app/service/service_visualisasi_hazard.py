@@ -19,13 +19,13 @@ class RasterService:
     def generate_raster_from_points(bencana, kolom):
         logger.info(f"📥 Mulai generate raster untuk {bencana} - {kolom}")
         points = IntensitasRepo.get_points_by_bencana(bencana, kolom)
-        if not points:
+        if points.empty:
             logger.warning("⚠️ Tidak ada data titik ditemukan.")
             return None, "No data found"
 
-        xs = np.array([p['x'] for p in points])
-        ys = np.array([p['y'] for p in points])
-        zs = np.array([p.get(kolom) if p.get(kolom) is not None else 0 for p in points])
+        xs = points['x'].to_numpy(dtype=float)
+        ys = points['y'].to_numpy(dtype=float)
+        zs = points[kolom].fillna(0).to_numpy(dtype=float)
         logger.info(f"✅ Jumlah titik: {len(points)}")
 
         pixel_size = 0.01
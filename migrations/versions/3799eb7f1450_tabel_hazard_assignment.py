@@ -0,0 +1,39 @@
+"""tabel hazard_assignment
+
+Revision ID: 3799eb7f1450
+Revises: 7201c9b561ab
+Create Date: 2026-10-18 09:12:40.512337
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3799eb7f1450'
+down_revision = '7201c9b561ab'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # instalasi lama sudah membuat tabel ini saat runtime → lewati jika ada
+    if not sa.inspect(op.get_bind()).has_table('hazard_assignment'):
+        op.create_table('hazard_assignment',
+        sa.Column('id_bangunan', sa.String(length=50), nullable=False),
+        sa.Column('hazard', sa.String(length=20), nullable=False),
+        sa.Column('id_lokasi', sa.Integer(), nullable=False),
+        sa.Column('distance_m', sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint('id_bangunan', 'hazard')
+        )
+    op.create_index(op.f('ix_hazard_assignment_id_lokasi'), 'hazard_assignment',
+                    ['id_lokasi'], unique=False, if_not_exists=True)
+    # rebuild / DELETE per bencana
+    op.create_index('ix_hazard_assignment_hazard', 'hazard_assignment',
+                    ['hazard'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_hazard_assignment_hazard', table_name='hazard_assignment')
+    op.drop_index(op.f('ix_hazard_assignment_id_lokasi'), table_name='hazard_assignment')
+    op.drop_table('hazard_assignment')
@@ -0,0 +1,43 @@
+"""tabel hasil_aal_bangunan
+
+Revision ID: 539e9e932415
+Revises: 3799eb7f1450
+Create Date: 2026-10-18 09:41:07.281965
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '539e9e932415'
+down_revision = '3799eb7f1450'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # instalasi lama sudah membuat tabel ini saat start aplikasi → lewati jika ada
+    if not sa.inspect(op.get_bind()).has_table('hasil_aal_bangunan'):
+        op.create_table('hasil_aal_bangunan',
+        sa.Column('id_bangunan', sa.String(length=50), nullable=False),
+        sa.Column('provinsi', sa.String(length=255), nullable=True),
+        sa.Column('kota', sa.String(length=255), nullable=True),
+        sa.Column('kode_bangunan', sa.String(length=20), nullable=True),
+        sa.Column('aal_gempa', sa.Float(), nullable=True),
+        sa.Column('aal_banjir', sa.Float(), nullable=True),
+        sa.Column('aal_longsor', sa.Float(), nullable=True),
+        sa.Column('aal_gunungberapi', sa.Float(), nullable=True),
+        sa.Column('aal_total', sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint('id_bangunan')
+        )
+    op.create_index(op.f('ix_hasil_aal_bangunan_provinsi'), 'hasil_aal_bangunan',
+                    ['provinsi'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_hasil_aal_bangunan_kota'), 'hasil_aal_bangunan',
+                    ['kota'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_hasil_aal_bangunan_kota'), table_name='hasil_aal_bangunan')
+    op.drop_index(op.f('ix_hasil_aal_bangunan_provinsi'), table_name='hasil_aal_bangunan')
+    op.drop_table('hasil_aal_bangunan')
@@ -0,0 +1,42 @@
+"""index wilayah ternormalisasi hasil_aal_bangunan
+
+Revision ID: 8d2b6f0e4a71
+Revises: cf7f66d847c8
+Create Date: 2026-10-18 13:12:40.518302
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2b6f0e4a71'
+down_revision = 'cf7f66d847c8'
+branch_labels = None
+depends_on = None
+
+# fetch_aal_kota memfilter TRIM(LOWER(provinsi/kota)); index btree biasa
+# dari 539e9e932415 tidak terpakai untuk ekspresi tsb
+PLAIN_INDEXES = [
+    ('ix_hasil_aal_bangunan_provinsi', '(provinsi)'),
+    ('ix_hasil_aal_bangunan_kota', '(kota)'),
+]
+INDEXES = [
+    ('idx_hasil_aal_bangunan_provinsi_norm', '(TRIM(LOWER(provinsi)))'),
+    ('idx_hasil_aal_bangunan_kota_norm', '(TRIM(LOWER(kota)))'),
+]
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, definition in INDEXES:
+            op.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON hasil_aal_bangunan {definition}')
+        for name, _ in PLAIN_INDEXES:
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, definition in PLAIN_INDEXES:
+            op.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON hasil_aal_bangunan {definition}')
+        for name, _ in reversed(INDEXES):
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
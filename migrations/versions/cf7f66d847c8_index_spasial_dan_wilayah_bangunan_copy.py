@@ -0,0 +1,36 @@
+"""index spasial dan wilayah bangunan_copy
+
+Revision ID: cf7f66d847c8
+Revises: 539e9e932415
+Create Date: 2026-10-18 10:05:52.904118
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'cf7f66d847c8'
+down_revision = '539e9e932415'
+branch_labels = None
+depends_on = None
+
+# (nama index, definisi) untuk /api/aal, /api/aal/aggregate & filter provinsi/kota
+INDEXES = [
+    ('idx_bangunan_copy_geom', 'USING GIST (geom)'),
+    ('idx_bangunan_copy_kota_norm', '(TRIM(LOWER(kota)))'),
+    ('idx_bangunan_copy_provinsi_norm', '(TRIM(LOWER(provinsi)))'),
+]
+
+
+def upgrade():
+    # CONCURRENTLY: bangunan_copy tetap bisa ditulis selama index dibangun;
+    # tidak boleh di dalam transaksi → autocommit_block
+    with op.get_context().autocommit_block():
+        for name, definition in INDEXES:
+            op.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON bangunan_copy {definition}')
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(INDEXES):
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
@@ -0,0 +1,78 @@
+# scripts/benchmark_matchers.py
+"""
+Benchmark matcher bangunan → titik intensitas: PostGIS (LATERAL KNN) vs cKDTree
+pada sampel bangunan yang sama, memakai database dari Config.
+
+    python -m scripts.benchmark_matchers --sample 1000 --hazard gempa,banjir
+"""
+
+import json
+import time
+import argparse
+
+import pandas as pd
+from sqlalchemy import text
+
+from app import create_app
+from app.hazard_registry import HAZARDS
+from app.repository.repo_db_pool import timed_connect
+from app.repository.repo_directloss import get_db_connection
+from app.repository.repo_hazard_matcher import (
+    match_kdtree, match_postgis, load_building_coords, get_tree, reset_tree_cache
+)
+
+def benchmark_matchers(sample=1000, hazards=None):
+    """Waktu eksekusi kedua jalur dan kecocokan id_lokasi / distance_m."""
+    with timed_connect(get_db_connection()) as conn:
+        ids = pd.read_sql(
+            text("SELECT id_bangunan FROM bangunan_copy ORDER BY random() LIMIT :n"),
+            conn, params={"n": int(sample)}
+        )["id_bangunan"].tolist()
+
+    t0 = time.perf_counter()
+    sql_df = match_postgis(ids, hazards)
+    t_sql = time.perf_counter() - t0
+
+    reset_tree_cache(hazards)
+    t0 = time.perf_counter()
+    coords = load_building_coords(ids)
+    for name in (list(HAZARDS) if hazards is None else hazards):
+        get_tree(name)
+    t_build = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    kd_df = match_kdtree(coords, hazards)
+    t_query = time.perf_counter() - t0
+
+    merged = sql_df.merge(
+        kd_df, on=["id_bangunan", "hazard"], how="outer",
+        suffixes=("_sql", "_kdtree"), indicator=True
+    )
+    both = merged[merged["_merge"] == "both"]
+    same = both["id_lokasi_sql"].astype(int) == both["id_lokasi_kdtree"].astype(int)
+    dist_diff = (both["distance_m_sql"] - both["distance_m_kdtree"]).abs()
+
+    return {
+        "sample_bangunan":   len(ids),
+        "postgis_seconds":   round(t_sql, 4),
+        "kdtree_build_seconds": round(t_build, 4),
+        "kdtree_query_seconds": round(t_query, 4),
+        "matches_postgis":   int(len(sql_df)),
+        "matches_kdtree":    int(len(kd_df)),
+        "only_postgis":      int((merged["_merge"] == "left_only").sum()),
+        "only_kdtree":       int((merged["_merge"] == "right_only").sum()),
+        "same_id_lokasi":    int(same.sum()),
+        "max_distance_diff_m": float(dist_diff.max()) if len(dist_diff) else 0.0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sample", type=int, default=1000, help="jumlah bangunan acak")
+    parser.add_argument("--hazard", default=None, help="daftar bencana, misal gempa,banjir")
+    args = parser.parse_args()
+    hazards = [h.strip() for h in args.hazard.split(",")] if args.hazard else None
+
+    with create_app().app_context():
+        print(json.dumps(benchmark_matchers(args.sample, hazards), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# tests/test_directloss_parallel.py
+"""Fan-out per bencana (run_hazards_parallel) tanpa database: hitung loss di thread I/O."""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+from app.hazard_registry import HAZARDS
+from app.service import service_directloss
+from app.service.service_directloss import compute_hazard_losses, run_hazards_parallel
+
+IDS = pd.Series(["BMN_1", "FS_2", "FD_3", "BMN_4"])
+
+
+def _fake_values(name):
+    cfg = HAZARDS[name]
+    rng = np.random.default_rng(len(name))
+    return {
+        f"nilai_y_{c}_{cfg.prefix}{s}": rng.uniform(0, 1, len(IDS))
+        for c in cfg.vulnerability_columns for s in cfg.scales
+    }
+
+
+def test_losses_computed_in_io_threads(monkeypatch):
+    threads = {}
+
+    def _get_disaster_data(name, engine, where, params):
+        threads[name] = threading.current_thread().name
+        df = pd.DataFrame(_fake_values(name), index=IDS.to_numpy())
+        df.iloc[1] = np.nan                          # titik tanpa damage ratio → loss 0
+        return df.iloc[::-1]                         # urutan beda: harus di-reindex
+
+    monkeypatch.setattr(service_directloss, "get_disaster_data", _get_disaster_data)
+    monkeypatch.setattr(service_directloss, "get_db_connection", lambda: None)
+    monkeypatch.setattr(service_directloss, "ProcessPoolExecutor", None)   # tidak boleh dipakai
+
+    luas, hsbgn = np.array([100.0, 50.0, 20.0, 10.0]), np.array([1e6, 2e6, 3e6, 4e6])
+    floors = np.array([1, 2, 3, 4])
+    seen = []
+    losses, timings = run_hazards_parallel(
+        IDS, luas, hsbgn, floors, progress=lambda stage, hazard=None, percent=None: seen.append(hazard)
+    )
+
+    for name, cfg in HAZARDS.items():
+        values = _fake_values(name)
+        for col in values:
+            values[col][1] = np.nan
+        expected = compute_hazard_losses(cfg, luas, hsbgn, floors, values)
+        for col, arr in expected.items():
+            np.testing.assert_allclose(losses[col], arr)
+            assert losses[col][1] == 0.0
+        assert threads[name].startswith("dl-hazard")
+        assert {"fetch_seconds", "loss_seconds", "total_seconds"} <= set(timings[name])
+    assert sorted(seen) == sorted(HAZARDS)
@@ -0,0 +1,257 @@
+# tests/test_fragility.py
+"""Engine kurva fragility (service_fragility) dan cache kurva bersama."""
+
+import math
+import threading
+
+import numpy as np
+import pytest
+from scipy.interpolate import CubicSpline
+
+from app.config import Config
+from app.service import service_curve_cache
+from app.service.service_fragility import FragilityCurve, compile_luts
+
+MMI_X = [5.0, 6.0, 7.0, 8.0, 9.0, 10.0]
+MMI_Y = [0.0, 0.03, 0.12, 0.35, 0.62, 0.85]
+# kurva longsor: naik tajam → ekor linear keluar dari [0, 1]
+MFLUX_X = [0.5, 1.0, 2.0, 4.0, 8.0]
+MFLUX_Y = [0.02, 0.1, 0.3, 0.6, 0.95]
+
+
+# Rumus per sel lama (service_kurva_*.interpolate_spline dan
+# service_kurva_longsor.interpolate_cubic_with_linear_extrap) sebagai acuan
+def _old_interpolate_spline(x, y, xi):
+    if xi is None or math.isnan(xi):
+        return None
+    try:
+        spline = CubicSpline(x, y, extrapolate=True)
+        val = spline(float(xi))
+        return float(max(0, min(val, 1)))
+    except Exception:
+        return None
+
+
+def _old_interpolate_cubic_with_linear_extrap(xs, ys, xi):
+    if xi is None or math.isnan(xi):
+        return None
+    if len(xs) < 2:
+        val = ys[0] if ys else None
+    elif xi < xs[0]:
+        val = ys[0] + (ys[1] - ys[0]) / (xs[1] - xs[0]) * (xi - xs[0])
+    elif xi > xs[-1]:
+        val = ys[-1] + (ys[-1] - ys[-2]) / (xs[-1] - xs[-2]) * (xi - xs[-1])
+    else:
+        val = float(CubicSpline(xs, ys, extrapolate=False)(float(xi)))
+    return float(max(0, min(val, 1))) if val is not None else None
+
+
+def _old_column(fn, x, y, values):
+    """Terapkan rumus lama per sel; None → NaN agar bisa dibandingkan array."""
+    out = [fn(x, y, v) for v in values]
+    return np.array([np.nan if o is None else o for o in out], dtype=float)
+
+
+@pytest.fixture
+def lut_enabled(monkeypatch):
+    monkeypatch.setattr(Config, "CURVE_LUT_ENABLED", True)
+
+
+@pytest.fixture
+def curve_cache(monkeypatch):
+    """Cache kurva dengan loader & fingerprint lokal (tanpa database)."""
+    reference = {"CR": {"x": MMI_X, "y": MMI_Y}, "MCF": {"x": MMI_X, "y": [v * 0.9 for v in MMI_Y]}}
+    monkeypatch.setattr(service_curve_cache, "reference_fingerprints", lambda: {"gempa": "v1"})
+    monkeypatch.setitem(service_curve_cache.CURVE_LOADERS, "gempa", lambda: reference)
+    service_curve_cache.invalidate()
+    yield service_curve_cache
+    service_curve_cache.invalidate()
+
+
+# ======================== SAMA DENGAN RUMUS PER SEL LAMA ========================
+def test_cubic_matches_old_formula():
+    values = np.concatenate([
+        np.linspace(3.0, 12.0, 181),          # ekstrapolasi kiri, interior, kanan
+        MMI_X,                                # tepat di titik referensi
+        [np.nan, np.nan],
+    ])
+    curve = FragilityCurve(MMI_X, MMI_Y, mode="cubic")
+    np.testing.assert_allclose(
+        curve.evaluate(values),
+        _old_column(_old_interpolate_spline, MMI_X, MMI_Y, values),
+        rtol=0, atol=1e-12, equal_nan=True,
+    )
+
+
+def test_cubic_extrapolates_and_clamps():
+    curve = FragilityCurve(MMI_X, MMI_Y, mode="cubic")
+    raw = CubicSpline(MMI_X, MMI_Y, extrapolate=True)(np.array([4.0, 11.0]))
+    out = curve.evaluate([4.0, 11.0])
+    assert raw[0] < 0 and out[0] == 0.0             # ekstrapolasi kiri < 0 → clamp
+    # ekstrapolasi kubik, bukan ditahan di nilai ujung
+    assert out[1] == pytest.approx(raw[1])
+    assert out[1] > MMI_Y[-1]
+
+    steep = FragilityCurve([0.0, 1.0, 2.0, 3.0], [0.0, 0.1, 0.4, 0.9], mode="cubic")
+    assert steep.evaluate([4.0])[0] == 1.0          # ekstrapolasi kanan > 1 → clamp
+
+
+def test_cubic_fit_failure_gives_nan():
+    x, y = [1.0, 1.0, 2.0], [0.1, 0.2, 0.3]       # x tidak naik → CubicSpline gagal
+    values = [0.5, 1.5, np.nan]
+    curve = FragilityCurve(x, y, mode="cubic")
+    expected = _old_column(_old_interpolate_spline, x, y, values)
+    assert np.isnan(expected).all()
+    assert np.isnan(curve.evaluate(values)).all()
+
+
+def test_linear_tail_matches_old_formula():
+    values = np.concatenate([
+        np.linspace(-2.0, 12.0, 281),
+        MFLUX_X,
+        [np.nan],
+    ])
+    curve = FragilityCurve(MFLUX_X, MFLUX_Y, mode="linear_tail")
+    np.testing.assert_allclose(
+        curve.evaluate(values),
+        _old_column(_old_interpolate_cubic_with_linear_extrap, MFLUX_X, MFLUX_Y, values),
+        rtol=0, atol=1e-12, equal_nan=True,
+    )
+
+
+def test_linear_tails_use_end_slopes():
+    curve = FragilityCurve(MFLUX_X, MFLUX_Y, mode="linear_tail")
+    lo_slope = (MFLUX_Y[1] - MFLUX_Y[0]) / (MFLUX_X[1] - MFLUX_X[0])
+    hi_slope = (MFLUX_Y[-1] - MFLUX_Y[-2]) / (MFLUX_X[-1] - MFLUX_X[-2])
+    out = curve.evaluate([0.4, 8.5, 0.0, 20.0])
+    assert out[0] == pytest.approx(MFLUX_Y[0] + lo_slope * (0.4 - MFLUX_X[0]))
+    assert out[1] == pytest.approx(MFLUX_Y[-1] + hi_slope * (8.5 - MFLUX_X[-1]))
+    assert out[2] == 0.0            # ekor kiri < 0 → clamp
+    assert out[3] == 1.0            # ekor kanan > 1 → clamp
+
+
+@pytest.mark.parametrize("x, y", [([3.0], [0.4]), ([3.0], [1.7]), ([], [])])
+def test_linear_tail_single_point(x, y):
+    values = [0.0, 3.0, 10.0, np.nan]
+    curve = FragilityCurve(x, y, mode="linear_tail")
+    np.testing.assert_allclose(
+        curve.evaluate(values),
+        _old_column(_old_interpolate_cubic_with_linear_extrap, x, y, values),
+        equal_nan=True,
+    )
+
+
+@pytest.mark.parametrize("mode", ["cubic", "linear_tail"])
+def test_nan_passthrough_and_shape(mode):
+    curve = FragilityCurve(MFLUX_X, MFLUX_Y, mode=mode)
+    values = np.array([[np.nan, 1.5], [3.0, np.nan]])
+    out = curve.evaluate(values)
+    assert out.shape == values.shape
+    assert np.isnan(out[0, 0]) and np.isnan(out[1, 1])
+    assert np.isfinite(out[0, 1]) and np.isfinite(out[1, 0])
+    assert np.isnan(curve.evaluate([np.nan] * 3)).all()
+
+
+def test_unknown_mode_rejected():
+    with pytest.raises(ValueError):
+        FragilityCurve(MMI_X, MMI_Y, mode="quadratic")
+
+
+# ======================== LUT VS EVALUASI EKSAK ========================
+@pytest.mark.parametrize("mode, x, y, observed", [
+    ("cubic", MMI_X, MMI_Y, [5.3, 9.6]),
+    ("cubic", MMI_X, MMI_Y, [2.0, 12.0]),
+    ("linear_tail", MFLUX_X, MFLUX_Y, [0.1, 7.9]),
+    ("linear_tail", MFLUX_X, MFLUX_Y, [0.0, 15.0]),
+])
+def test_lut_within_max_error(lut_enabled, mode, x, y, observed):
+    curves, report = compile_luts({"k": FragilityCurve(x, y, mode=mode)}, observed)
+    curve = curves["k"]
+    assert report["k"]["within_bound"]
+    assert report["k"]["max_error"] <= Config.CURVE_LUT_MAX_ERROR
+
+    rng = np.random.default_rng(7)
+    lo, hi = observed
+    values = np.concatenate([
+        rng.uniform(lo, hi, 5000),
+        [lo - 3.0, hi + 3.0, np.nan],        # di luar LUT → eksak, NaN tetap NaN
+    ])
+    np.testing.assert_allclose(
+        curve.evaluate(values), curve.evaluate_exact(values),
+        rtol=0, atol=Config.CURVE_LUT_MAX_ERROR, equal_nan=True,
+    )
+
+
+def test_lut_refines_until_bound(lut_enabled, monkeypatch):
+    monkeypatch.setattr(Config, "CURVE_LUT_RESOLUTION", 9)
+    curve = FragilityCurve(MMI_X, MMI_Y).with_lut(5.0, 10.0)
+    info = curve.lut_info
+    assert info["resolution"] > 9
+    assert (info["resolution"] - 1) % 8 == 0          # 2n − 1: grid lama tetap ada
+    assert info["max_error"] <= Config.CURVE_LUT_MAX_ERROR
+
+
+# ======================== LUT TIDAK MENGUBAH KURVA BERSAMA ========================
+def test_with_lut_returns_copy(lut_enabled):
+    curve = FragilityCurve(MMI_X, MMI_Y, name="cr")
+    bound = curve.with_lut(5.0, 10.0)
+
+    assert bound is not curve
+    assert curve.lut_info is None
+    assert bound.lut_info["within_bound"]
+    v = np.linspace(5.0, 10.0, 101)
+    np.testing.assert_allclose(curve(v), curve.evaluate_exact(v))
+
+
+def test_compile_luts_leaves_input_untouched(lut_enabled):
+    curves = {"cr": FragilityCurve(MMI_X, MMI_Y, name="cr")}
+    bound, report = compile_luts(curves, [5.5, 8.2])
+
+    assert curves["cr"].lut_info is None
+    assert bound["cr"].lut_info == report["cr"]
+    assert (report["cr"]["lo"], report["cr"]["hi"]) == (5.0, 9.0)
+
+
+def test_compile_luts_disabled_returns_same_curves():
+    curves = {"cr": FragilityCurve(MMI_X, MMI_Y, name="cr")}
+    bound, report = compile_luts(curves, [5.5, 8.2])
+    assert bound is curves and report == {}
+
+
+def test_invalid_range_gives_exact_copy(lut_enabled):
+    curve = FragilityCurve(MMI_X, MMI_Y)
+    for lo, hi in [(7.0, 7.0), (8.0, 6.0), (np.nan, 9.0)]:
+        bound = curve.with_lut(lo, hi)
+        assert bound is not curve and bound.lut_info is None
+
+
+def test_cached_curves_stay_immutable_under_concurrent_ranges(lut_enabled, curve_cache):
+    ranges = [(5.0, 6.0), (5.0, 10.0), (7.0, 9.0), (6.0, 8.0)] * 4
+    errors = []
+
+    def _worker(lo, hi):
+        try:
+            observed = np.array([lo, hi])
+            for _ in range(5):
+                curves = curve_cache.get_fitted_curves("gempa", observed=observed)
+                assert curves["CR"].lut_info["lo"] == lo
+                assert curves["CR"].lut_info["hi"] == hi
+                v = np.linspace(lo, hi, 257)
+                np.testing.assert_allclose(
+                    curves["CR"](v), curves["CR"].evaluate_exact(v),
+                    rtol=0, atol=Config.CURVE_LUT_MAX_ERROR
+                )
+        except Exception as e:             # dilaporkan di thread utama
+            errors.append(e)
+
+    threads = [threading.Thread(target=_worker, args=r) for r in ranges]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    shared = curve_cache.get_fitted_curves("gempa")
+    assert all(c.lut_info is None for c in shared.values())
+    # fit sekali per versi: objek kurva yang sama untuk setiap pemanggil
+    assert curve_cache.get_fitted_curves("gempa")["CR"] is shared["CR"]
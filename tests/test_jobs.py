@@ -0,0 +1,250 @@
+# tests/test_jobs.py
+"""
+Subsistem job (service_jobs) berjalan in-process: MemoryJobStore dan
+SqlJobStore("sqlite://") dengan ThreadBroker, tanpa Postgres / Celery.
+"""
+
+import time
+import threading
+
+import pytest
+from flask import Flask
+
+from app.extensions import db
+from app.repository.repo_locks import advisory_lock, LockBusy
+from app.service.service_jobs import (
+    JOB_REGISTRY, JobCancelled, JobConflict, JobManager,
+    MemoryJobStore, SqlJobStore, ThreadBroker, make_broker
+)
+
+TIMEOUT = 5
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI="sqlite://")
+    db.init_app(app)
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request):
+    return MemoryJobStore() if request.param == "memory" else SqlJobStore("sqlite://")
+
+
+@pytest.fixture
+def manager(app, store):
+    return JobManager(store, ThreadBroker())
+
+
+@pytest.fixture
+def register(monkeypatch):
+    """Daftarkan pipeline test sebagai jenis job (dibersihkan otomatis)."""
+    def _register(kind, fn, lock="test_lock"):
+        monkeypatch.setitem(JOB_REGISTRY, kind, (fn, lock))
+    return _register
+
+
+class _HeldBroker:
+    """Broker yang tidak menjalankan apa pun (job tetap 'queued')."""
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, manager, job_id):
+        self.submitted.append(job_id)
+
+
+def _wait_for(manager, job_id, statuses):
+    deadline = time.monotonic() + TIMEOUT
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.01)
+    pytest.fail(f"job {job_id} tidak mencapai {statuses}: {manager.get(job_id)}")
+
+
+def _blocking_job(started, release):
+    def _run(progress, **params):
+        progress("step", hazard="banjir", percent=40)
+        started.set()
+        assert release.wait(TIMEOUT)
+        return {"ok": True}
+    return _run
+
+
+def test_submit_runs_job_and_stores_result(manager, register):
+    def _run(progress, n):
+        progress("load", percent=0)
+        progress("work", hazard="gempa", percent=50)
+        return {"n": n}
+    register("test_submit", _run)
+
+    job = manager.submit("test_submit", {"n": 3})
+    assert job["status"] == "queued"
+
+    done = _wait_for(manager, job["id"], ("succeeded", "failed"))
+    assert done["status"] == "succeeded", done["error"]
+    assert done["result"] == {"n": 3}
+    assert done["progress"] == {
+        "stage": "work", "hazard": "gempa", "percent": 50, "hazards": {"gempa": "work"}
+    }
+    assert done["started_at"] and done["finished_at"]
+    assert manager.list()[0]["id"] == job["id"]
+
+
+def test_progress_visible_while_running(manager, register):
+    started, release = threading.Event(), threading.Event()
+    register("test_progress", _blocking_job(started, release))
+
+    job = manager.submit("test_progress")
+    assert started.wait(TIMEOUT)
+    running = manager.get(job["id"])
+    assert running["status"] == "running"
+    assert running["progress"]["stage"] == "step"
+    assert running["progress"]["percent"] == 40
+    assert running["progress"]["hazards"] == {"banjir": "step"}
+
+    release.set()
+    assert _wait_for(manager, job["id"], ("succeeded",))["result"] == {"ok": True}
+
+
+def test_cancel_running_job_raises_job_cancelled(manager, register):
+    started = threading.Event()
+    seen = []
+
+    def _run(progress, **params):
+        started.set()
+        deadline = time.monotonic() + TIMEOUT
+        try:
+            while time.monotonic() < deadline:
+                progress("loop", percent=10)
+                time.sleep(0.01)
+        except JobCancelled as e:
+            seen.append(e)
+            raise
+        return {"ok": True}
+    register("test_cancel", _run)
+
+    job = manager.submit("test_cancel")
+    assert started.wait(TIMEOUT)
+    assert manager.cancel(job["id"])["cancel_requested"]
+
+    done = _wait_for(manager, job["id"], ("cancelled", "succeeded", "failed"))
+    assert done["status"] == "cancelled"
+    assert done["finished_at"]
+    assert len(seen) == 1
+
+
+def test_cancel_queued_job_never_runs(app, store, register):
+    calls = []
+    register("test_queued", lambda progress, **params: calls.append(1))
+    broker = _HeldBroker()
+    manager = JobManager(store, broker)
+
+    job = manager.submit("test_queued")
+    assert broker.submitted == [job["id"]]
+    assert manager.cancel(job["id"])["status"] == "cancelled"
+
+    manager.run(job["id"])           # broker terlambat: job tidak dijalankan lagi
+    assert calls == []
+    assert manager.get(job["id"])["status"] == "cancelled"
+
+
+def test_cancel_unknown_job(manager):
+    assert manager.cancel("tidak-ada") is None
+
+
+def test_duplicate_running_job_returns_409(app, manager, register, monkeypatch):
+    from app.controller import controller_jobs
+
+    started, release = threading.Event(), threading.Event()
+    register("test_dup", _blocking_job(started, release), lock="dup_lock")
+    monkeypatch.setattr(controller_jobs, "get_job_manager", lambda: manager)
+
+    first = manager.submit("test_dup")
+    assert started.wait(TIMEOUT)
+    with pytest.raises(JobConflict) as exc:
+        manager.submit("test_dup")
+    assert str(exc.value) == first["id"]
+
+    with app.test_request_context("/api/jobs/test_dup", method="POST"):
+        resp, code = controller_jobs.enqueue_job("test_dup")
+    assert code == 409
+    assert resp.get_json()["job_id"] == first["id"]
+
+    release.set()
+    _wait_for(manager, first["id"], ("succeeded",))
+    # lock bebas lagi setelah job selesai
+    with app.test_request_context("/api/jobs/test_dup", method="POST"):
+        resp, code = controller_jobs.enqueue_job("test_dup")
+    assert code == 202
+    release.set()
+    _wait_for(manager, resp.get_json()["job_id"], ("succeeded",))
+
+
+def test_unknown_kind_rejected(manager):
+    with pytest.raises(ValueError):
+        manager.submit("tidak_ada")
+
+
+def test_job_fails_while_sync_path_holds_lock(manager, register):
+    calls = []
+    register("test_locked", lambda progress, **params: calls.append(1), lock="sync_lock")
+
+    with advisory_lock("sync_lock"):
+        job = manager.submit("test_locked")
+        done = _wait_for(manager, job["id"], ("succeeded", "failed"))
+    assert done["status"] == "failed"
+    assert "sync_lock" in done["error"]
+    assert calls == []
+
+
+def test_advisory_lock_shared_exclusive_and_reentrant(app):
+    held, release = threading.Event(), threading.Event()
+
+    def _hold(shared):
+        with app.app_context(), advisory_lock("lock_test", shared=shared):
+            held.set()
+            assert release.wait(TIMEOUT)
+
+    # eksklusif di thread lain → shared maupun eksklusif ditolak
+    t = threading.Thread(target=_hold, args=(False,))
+    t.start()
+    assert held.wait(TIMEOUT)
+    for shared in (False, True):
+        with pytest.raises(LockBusy):
+            with advisory_lock("lock_test", shared=shared):
+                pass
+    release.set()
+    t.join()
+
+    # shared di thread lain → shared boleh, eksklusif ditolak
+    held.clear()
+    release.clear()
+    t = threading.Thread(target=_hold, args=(True,))
+    t.start()
+    assert held.wait(TIMEOUT)
+    with advisory_lock("lock_test", shared=True):
+        pass
+    with pytest.raises(LockBusy):
+        with advisory_lock("lock_test"):
+            pass
+    release.set()
+    t.join()
+
+    # re-entrant di thread yang sama (job → pipeline yang mengambil lock lagi)
+    with advisory_lock("lock_test"):
+        with advisory_lock("lock_test"), advisory_lock("lock_test", shared=True):
+            pass
+    with advisory_lock("lock_test"):     # sudah dilepas seluruhnya
+        pass
+
+
+def test_celery_broker_requires_shared_store():
+    with pytest.raises(RuntimeError):
+        make_broker("celery", "memory")
+    assert isinstance(make_broker("thread", "memory"), ThreadBroker)